@@ -0,0 +1,59 @@
+"""
+Management command to (re)build DailyMetric rollups from existing data.
+Run with: python manage.py backfill_admin_rollups [--days 7]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from adminpanel.models import DailyMetric
+from adminpanel.rollups import SOURCE_METRICS, day_bounds, refresh_rollups
+from bookings.models import Booking
+from payments.models import Payment
+from samagri.models import ShopOrder
+from users.models import User
+
+# source -> (queryset, date field) whose distinct local days need a rollup
+SOURCE_DATES = {
+    'users': (User.objects.all(), 'date_joined'),
+    'bookings_created': (Booking.objects.all(), 'created_at'),
+    'bookings_scheduled': (Booking.objects.all(), 'booking_date'),
+    'payments': (Payment.objects.all(), 'created_at'),
+    'shop_orders': (ShopOrder.objects.all(), 'created_at'),
+}
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily admin metric rollups (all history by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Only rebuild the last N days, e.g. from a nightly cron to catch bulk updates'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.localdate() - timedelta(days=options['days'])
+
+        total_days = 0
+        for source, (queryset, field) in SOURCE_DATES.items():
+            stored = DailyMetric.objects.filter(metric__in=SOURCE_METRICS[source])
+            if since is not None:
+                lower = since if field == 'booking_date' else day_bounds(since)[0]
+                queryset = queryset.filter(**{f'{field}__gte': lower})
+                stored = stored.filter(date__gte=since)
+
+            if field == 'booking_date':
+                days = set(queryset.dates(field, 'day'))
+            else:
+                days = {d.date() for d in queryset.datetimes(field, 'day')}
+            # Days that only have stale rows left (e.g. after deletes) are cleared too
+            days |= set(stored.values_list('date', flat=True).distinct())
+            refresh_rollups(source, days)
+            total_days += len(days)
+            self.stdout.write(f"{source}: {len(days)} days")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt admin rollups: days={total_days}"))
@@ -48,3 +48,27 @@ class ActivityLog(models.Model):
     def __str__(self):
         actor = self.user.full_name if self.user else "System"
         return f"{actor} - {self.action_type} at {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+class DailyMetric(models.Model):
+    """
+    Per-day rollup of one admin dashboard metric, optionally broken down by
+    `key` (a pandit id, puja name, location...). Maintained by
+    adminpanel/signals.py and rebuilt with `manage.py backfill_admin_rollups`.
+    """
+    date = models.DateField()
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True, default='')
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'metric', 'key')
+        indexes = [
+            models.Index(fields=['metric', 'date']),
+        ]
+
+    def __str__(self):
+        suffix = f"[{self.key}]" if self.key else ""
+        return f"{self.date} {self.metric}{suffix}: {self.count} / {self.amount}"
@@ -0,0 +1,204 @@
+"""
+Admin Rollups - Daily metric tables behind the admin dashboards.
+
+Each source model owns a fixed set of metrics, bucketed by the local date of
+one of its fields. When a row changes, adminpanel/signals.py recomputes that
+source's metrics for the affected day(s) only, so a refresh touches one day
+of data and the dashboards read a number of DailyMetric rows that grows with
+days and categories rather than with users, bookings or orders.
+
+Monthly figures are sums over the day rows of that month.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStatus
+from pandits.models import PanditUser
+from payments.models import Payment
+from samagri.models import ShopOrder
+from users.models import User
+from vendors.models import Vendor
+from .models import DailyMetric
+
+SHOP_REVENUE_STATUSES = ['PAID', 'SHIPPED', 'DELIVERED']
+
+# source -> metrics it writes; a refresh replaces exactly these rows for a day
+SOURCE_METRICS = {
+    'users': ['users_joined', 'pandits_joined', 'vendors_joined'],
+    'bookings_created': ['bookings_created', 'bookings_by_puja', 'bookings_by_location', 'pandit_bookings'],
+    'bookings_scheduled': ['bookings_scheduled', 'bookings_completed', 'pandit_revenue'],
+    'payments': ['payments_completed'],
+    'shop_orders': ['shop_orders_created', 'shop_revenue', 'shop_paid'],
+}
+
+
+def local_day(value):
+    """Local calendar date of a datetime, date or ISO date string."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _joined(model, day):
+    start, end = day_bounds(day)
+    return model.objects.filter(date_joined__gte=start, date_joined__lt=end).count()
+
+
+def _rows_users(day):
+    return [
+        ('users_joined', '', _joined(User, day), 0),
+        ('pandits_joined', '', _joined(PanditUser, day), 0),
+        ('vendors_joined', '', _joined(Vendor, day), 0),
+    ]
+
+
+def _rows_bookings_created(day):
+    start, end = day_bounds(day)
+    bookings = Booking.objects.filter(created_at__gte=start, created_at__lt=end)
+    rows = [('bookings_created', '', bookings.count(), 0)]
+    for metric, field in (
+        ('bookings_by_puja', 'service_name'),
+        ('bookings_by_location', 'service_location'),
+        ('pandit_bookings', 'pandit_id'),
+    ):
+        for entry in bookings.values(field).annotate(n=Count('id')).order_by():
+            if entry[field] is not None:
+                rows.append((metric, str(entry[field]), entry['n'], 0))
+    return rows
+
+
+def _rows_bookings_scheduled(day):
+    bookings = Booking.objects.filter(booking_date=day)
+    completed = Q(status=BookingStatus.COMPLETED)
+    summary = bookings.aggregate(
+        scheduled=Count('id'),
+        completed=Count('id', filter=completed),
+        revenue=Sum('total_fee', filter=completed),
+    )
+    rows = [
+        ('bookings_scheduled', '', summary['scheduled'], 0),
+        ('bookings_completed', '', summary['completed'], summary['revenue'] or 0),
+    ]
+    per_pandit = (
+        bookings.filter(completed, pandit__isnull=False)
+        .values('pandit_id')
+        .annotate(n=Count('id'), revenue=Sum('total_fee'))
+        .order_by()
+    )
+    for entry in per_pandit:
+        rows.append(('pandit_revenue', str(entry['pandit_id']), entry['n'], entry['revenue'] or 0))
+    return rows
+
+
+def _rows_payments(day):
+    start, end = day_bounds(day)
+    summary = Payment.objects.filter(
+        created_at__gte=start, created_at__lt=end, status='COMPLETED'
+    ).aggregate(n=Count('id'), total=Sum('amount'))
+    return [('payments_completed', '', summary['n'], summary['total'] or 0)]
+
+
+def _rows_shop_orders(day):
+    start, end = day_bounds(day)
+    summary = ShopOrder.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        n=Count('id'),
+        revenue_n=Count('id', filter=Q(status__in=SHOP_REVENUE_STATUSES)),
+        revenue=Sum('total_amount', filter=Q(status__in=SHOP_REVENUE_STATUSES)),
+        paid_n=Count('id', filter=Q(status='PAID')),
+        paid=Sum('total_amount', filter=Q(status='PAID')),
+    )
+    return [
+        ('shop_orders_created', '', summary['n'], 0),
+        ('shop_revenue', '', summary['revenue_n'], summary['revenue'] or 0),
+        ('shop_paid', '', summary['paid_n'], summary['paid'] or 0),
+    ]
+
+
+SOURCE_BUILDERS = {
+    'users': _rows_users,
+    'bookings_created': _rows_bookings_created,
+    'bookings_scheduled': _rows_bookings_scheduled,
+    'payments': _rows_payments,
+    'shop_orders': _rows_shop_orders,
+}
+
+
+def refresh_rollups(source, days):
+    """
+    Recompute a source's DailyMetric rows for the given days from the base
+    tables. Empty rows are not stored.
+    """
+    days = sorted({local_day(d) for d in days if d})
+    metrics = SOURCE_METRICS[source]
+    build = SOURCE_BUILDERS[source]
+    for day in days:
+        rows = [
+            DailyMetric(date=day, metric=metric, key=key, count=count, amount=amount)
+            for metric, key, count, amount in build(day)
+            if count or amount
+        ]
+        with transaction.atomic():
+            DailyMetric.objects.filter(date=day, metric__in=metrics).delete()
+            DailyMetric.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['date', 'metric', 'key'],
+                update_fields=['count', 'amount', 'updated_at'],
+            )
+
+
+# --- Readers ---
+
+def totals(metrics, start=None, end=None):
+    """
+    {metric: {"count", "amount"}} summed over [start, end] (inclusive dates,
+    open-ended when None), in one query. Missing metrics read as zero.
+    """
+    rows = DailyMetric.objects.filter(metric__in=metrics)
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    result = {metric: {"count": 0, "amount": Decimal('0')} for metric in metrics}
+    for entry in rows.values('metric').annotate(count=Sum('count'), amount=Sum('amount')).order_by():
+        result[entry['metric']] = {"count": entry['count'] or 0, "amount": entry['amount'] or Decimal('0')}
+    return result
+
+
+def by_key(metric, keys=None, limit=None):
+    """[(key, count, amount)] for a keyed metric over all days, largest count first."""
+    rows = DailyMetric.objects.filter(metric=metric)
+    if keys is not None:
+        rows = rows.filter(key__in=[str(k) for k in keys])
+    grouped = (
+        rows.values('key')
+        .annotate(count=Sum('count'), amount=Sum('amount'))
+        .order_by('-count', 'key')
+    )
+    if limit:
+        grouped = grouped[:limit]
+    return [(entry['key'], entry['count'], entry['amount']) for entry in grouped]
+
+
+def monthly(metric, limit=12):
+    """[(month_start, count, amount)] for a metric, oldest month first."""
+    grouped = (
+        DailyMetric.objects.filter(metric=metric)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(count=Sum('count'), amount=Sum('amount'))
+        .order_by('month')
+    )
+    return [(entry['month'], entry['count'], entry['amount']) for entry in grouped[:limit]]
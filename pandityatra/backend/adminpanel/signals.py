@@ -0,0 +1,96 @@
+import logging
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bookings.models import Booking
+from pandits.models import PanditUser
+from payments.models import Payment
+from samagri.models import ShopOrder
+from users.models import User
+from vendors.models import Vendor
+from .models import DailyMetric
+from .rollups import local_day, refresh_rollups
+
+# Booking fields feeding the rollups
+BOOKING_ROLLUP_FIELDS = {
+    'pandit', 'pandit_id', 'service_name', 'service_location',
+    'booking_date', 'status', 'total_fee',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule_refresh(source, days):
+    def _refresh():
+        try:
+            refresh_rollups(source, days)
+        except Exception as e:
+            logger.error(f"Failed to refresh {source} rollups for {days}: {e}")
+
+    transaction.on_commit(_refresh)
+
+
+# Signals are sent with the concrete class, so each user subclass is listed
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=PanditUser)
+@receiver(post_save, sender=Vendor)
+def refresh_user_rollups(sender, instance, created, **kwargs):
+    # Logins and profile edits save users constantly; only sign-ups move the counts
+    if created:
+        _schedule_refresh('users', [instance.date_joined])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=PanditUser)
+@receiver(post_delete, sender=Vendor)
+def clear_user_rollups(sender, instance, **kwargs):
+    _schedule_refresh('users', [instance.date_joined])
+
+
+@receiver(post_save, sender=Booking)
+def refresh_booking_rollups(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not BOOKING_ROLLUP_FIELDS.intersection(update_fields):
+        return
+    _schedule_refresh('bookings_created', [instance.created_at])
+    days = [instance.booking_date]
+    # (pandit_id, booking_date) before this save, set by bookings/signals.py
+    previous = getattr(instance, '_previous_slot', None)
+    if previous and previous[1] != local_day(instance.booking_date):
+        days.append(previous[1])
+    _schedule_refresh('bookings_scheduled', days)
+
+
+@receiver(post_delete, sender=Booking)
+def clear_booking_rollups(sender, instance, **kwargs):
+    _schedule_refresh('bookings_created', [instance.created_at])
+    _schedule_refresh('bookings_scheduled', [instance.booking_date])
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_payment_rollups(sender, instance, **kwargs):
+    _schedule_refresh('payments', [instance.created_at])
+
+
+@receiver(post_save, sender=ShopOrder)
+@receiver(post_delete, sender=ShopOrder)
+def refresh_shop_order_rollups(sender, instance, **kwargs):
+    _schedule_refresh('shop_orders', [instance.created_at])
+
+
+def backfill_empty_rollups(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Build the rollups from existing data once DailyMetric is migrated but still
+    empty, so the admin charts do not start from zero. Connected to post_migrate
+    in AdminpanelConfig.ready, when every app's tables are up to date.
+    """
+    if DailyMetric.objects.using(using).exists():
+        return
+    try:
+        call_command('backfill_admin_rollups', stdout=StringIO())
+    except Exception as e:
+        logger.error(f"Failed to backfill admin rollups after migrate: {e}")
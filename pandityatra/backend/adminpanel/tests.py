@@ -1,3 +1,114 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking, BookingStatus
+from pandits.models import PanditUser
+from payments.models import Payment
+from samagri.models import ShopOrder
+from users.models import User
+from .models import DailyMetric
+from .rollups import by_key, totals
+
+
+class AdminRollupTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin = User.objects.create_user(
+                username='rollupadmin', email='rollupadmin@t.com', password='p', role='admin', is_staff=True
+            )
+            self.customer = User.objects.create_user(
+                username='rollupcust', email='rollupcust@t.com', password='p', role='user'
+            )
+            self.pandit = PanditUser.objects.create_user(
+                username='rolluppandit', email='rolluppandit@t.com', password='p', role='pandit',
+                is_verified=True, rating=Decimal('4.80')
+            )
+            self.completed = self._book(self.today, BookingStatus.COMPLETED, fee=1500)
+            self.pending = self._book(self.today + timedelta(days=3), BookingStatus.PENDING, fee=900)
+            Payment.objects.create(
+                booking=self.completed, user=self.customer, payment_method='KHALTI',
+                amount=Decimal('1500'), status='COMPLETED'
+            )
+            ShopOrder.objects.create(
+                user=self.customer, total_amount=Decimal('250'), status='PAID',
+                full_name='C', phone_number='1', shipping_address='KTM', city='KTM'
+            )
+        self.client.force_authenticate(user=self.admin)
+
+    def _book(self, day, status_value, fee):
+        return Booking.objects.create(
+            user=self.customer, pandit=self.pandit, service_name='Ganesh Puja',
+            booking_date=day, booking_time=time(10, 0), status=status_value, total_fee=Decimal(fee)
+        )
+
+    def test_admin_stats_read_rollups(self):
+        with self.assertNumQueries(8):
+            response = self.client.get('/api/users/admin/stats/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_users'], 3)
+        self.assertEqual(data['total_pandits'], 1)
+        self.assertEqual(data['total_bookings'], 2)
+        self.assertEqual(data['total_shop_orders'], 1)
+        self.assertEqual(data['revenue_this_month'], 1750.0)
+        self.assertEqual(data['todays_pujas_count'], 1)
+
+    def test_deep_analytics_read_rollups(self):
+        response = self.client.get('/api/admin/analytics/deep/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['overview']['totalBookings'], 1)
+        self.assertEqual(data['overview']['totalRevenue'], 1750.0)
+        self.assertEqual(data['bookingAnalytics']['byPuja'][0], {"puja": "Ganesh Puja", "count": 2, "popularity": 20})
+        top = data['panditPerformance']['topPandits'][0]
+        self.assertEqual((top['bookings'], top['revenue']), (2, 1500.0))
+
+    def test_status_change_and_reschedule_update_rollups(self):
+        self.pending.status = BookingStatus.COMPLETED
+        self.pending.booking_date = self.today
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            self.pending.save()
+        for callback in callbacks:
+            callback()
+        # Slot bitmaps and admin rollups share one lookup of the stored row
+        lookups = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(lookups), 1, lookups)
+
+        day = totals(['bookings_completed', 'bookings_scheduled'], start=self.today, end=self.today)
+        self.assertEqual(day['bookings_completed']['amount'], Decimal('2400'))
+        self.assertEqual(day['bookings_scheduled']['count'], 2)
+        later = self.today + timedelta(days=3)
+        self.assertEqual(totals(['bookings_scheduled'], start=later, end=later)['bookings_scheduled']['count'], 0)
+
+    def test_backfill_rebuilds_rollups(self):
+        DailyMetric.objects.all().delete()
+        # Rows changed without signals are picked up too
+        Booking.objects.filter(pk=self.pending.pk).update(service_location='HOME')
+
+        call_command('backfill_admin_rollups', stdout=StringIO())
+
+        self.assertEqual(totals(['bookings_created'])['bookings_created']['count'], 2)
+        locations = {key: count for key, count, _ in by_key('bookings_by_location')}
+        self.assertEqual(locations, {'ONLINE': 1, 'HOME': 1})
+
+    def test_empty_rollups_are_backfilled_after_migrate(self):
+        from django.apps import apps
+        from .signals import backfill_empty_rollups
+
+        DailyMetric.objects.all().delete()
+        backfill_empty_rollups(apps.get_app_config('adminpanel'))
+        self.assertEqual(totals(['bookings_created'])['bookings_created']['count'], 2)
 
-# Create your tests here.
+        # Existing rollups are left to the signals and the backfill command
+        with self.assertNumQueries(1):
+            backfill_empty_rollups(apps.get_app_config('adminpanel'))
@@ -145,12 +145,8 @@ def admin_activity_logs(request):
 
     return Response(data)
 
-from django.db.models.functions import TruncMonth
-from django.db.models import Count, Avg, Sum
-from samagri.models import ShopOrder
-from pandits.models import PanditUser
-from users.models import User
-from bookings.models import Booking, BookingStatus
+from django.db.models import Avg
+from adminpanel import rollups
 
 @extend_schema(summary="Admin: Deep Platform Analytics")
 @api_view(["GET"])
@@ -164,53 +160,46 @@ def admin_analytics_deep(request):
     if not (user.is_staff or user.is_superuser or getattr(user, "role", "") == "admin"):
         return Response({"detail": "Admin only"}, status=403)
 
-    # 1. Overview Stats
-    total_users = User.objects.count()
-    total_bookings = Booking.objects.filter(status=BookingStatus.COMPLETED).count()
-    total_revenue_bookings = Booking.objects.filter(status=BookingStatus.COMPLETED).aggregate(total=Sum('total_fee'))['total'] or 0
-    total_revenue_orders = ShopOrder.objects.filter(status='PAID').aggregate(total=Sum('total_amount'))['total'] or 0
-    total_revenue = float(total_revenue_bookings + total_revenue_orders)
+    # 1. Overview Stats (from the daily rollups, see adminpanel/rollups.py)
+    overview = rollups.totals(['users_joined', 'bookings_completed', 'shop_paid'])
+    total_users = overview['users_joined']['count']
+    total_bookings = overview['bookings_completed']['count']
+    total_revenue = float(overview['bookings_completed']['amount'] + overview['shop_paid']['amount'])
     
-    avg_rating = Pandit.objects.filter(is_verified=True).aggregate(avg=Avg('rating'))['avg'] or 4.5
+    avg_rating = PanditUser.objects.filter(is_verified=True).aggregate(avg=Avg('rating'))['avg'] or 4.5
 
     # 2. Revenue Analytics (Monthly)
-    monthly_revenue = Booking.objects.filter(status=BookingStatus.COMPLETED) \
-        .annotate(month=TruncMonth('booking_date')) \
-        .values('month') \
-        .annotate(revenue=Sum('total_fee'), bookings=Count('id')) \
-        .order_by('month')[:12]
-
-    # Convert to frontend format
     monthly_data = []
-    for entry in monthly_revenue:
+    for month, bookings, revenue in rollups.monthly('bookings_completed'):
         monthly_data.append({
-            "month": entry['month'].strftime('%b'),
-            "revenue": float(entry['revenue']),
-            "bookings": entry['bookings']
+            "month": month.strftime('%b'),
+            "revenue": float(revenue),
+            "bookings": bookings
         })
 
     # 3. Popular Pujas
-    popular_pujas = Booking.objects.values('service_name') \
-        .annotate(count=Count('id')) \
-        .order_by('-count')[:5]
-    
     puja_data = []
-    for p in popular_pujas:
+    for puja, count, _ in rollups.by_key('bookings_by_puja', limit=5):
         puja_data.append({
-            "puja": p['service_name'],
-            "count": p['count'],
-            "popularity": min(100, (p['count'] * 10))
+            "puja": puja,
+            "count": count,
+            "popularity": min(100, (count * 10))
         })
 
+    locations = {key: count for key, count, _ in rollups.by_key('bookings_by_location', keys=['ONLINE', 'HOME'])}
+
     # 4. Pandit Performance
-    top_pandits = PanditUser.objects.filter(is_verified=True).order_by('-rating')[:5]
+    top_pandits = list(PanditUser.objects.filter(is_verified=True).order_by('-rating')[:5])
+    pandit_ids = [p.id for p in top_pandits]
+    bookings_by_pandit = {key: count for key, count, _ in rollups.by_key('pandit_bookings', keys=pandit_ids)}
+    revenue_by_pandit = {key: amount for key, _, amount in rollups.by_key('pandit_revenue', keys=pandit_ids)}
     pandit_perf = []
     for p in top_pandits:
         pandit_perf.append({
             "name": p.full_name or p.username,
-            "bookings": Booking.objects.filter(pandit=p).count(),
+            "bookings": bookings_by_pandit.get(str(p.id), 0),
             "rating": float(p.rating),
-            "revenue": float(Booking.objects.filter(pandit=p, status=BookingStatus.COMPLETED).aggregate(total=Sum('total_fee'))['total'] or 0)
+            "revenue": float(revenue_by_pandit.get(str(p.id), 0))
         })
 
     return Response({
@@ -228,8 +217,8 @@ def admin_analytics_deep(request):
         "bookingAnalytics": {
             "byPuja": puja_data,
             "byLocation": [
-                {"location": "ONLINE", "count": Booking.objects.filter(service_location="ONLINE").count(), "revenue": 0},
-                {"location": "HOME", "count": Booking.objects.filter(service_location="HOME").count(), "revenue": 0}
+                {"location": "ONLINE", "count": locations.get("ONLINE", 0), "revenue": 0},
+                {"location": "HOME", "count": locations.get("HOME", 0), "revenue": 0}
             ]
         },
         "panditPerformance": {
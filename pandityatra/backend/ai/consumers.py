@@ -0,0 +1,65 @@
+import json
+import logging
+from types import SimpleNamespace
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.streaming import STREAM_ERROR_DETAIL
+from kundali.services.ai import stream_kundali_prediction
+from .service import AIOrchestrator
+
+logger = logging.getLogger(__name__)
+
+
+class AIStreamConsumer(AsyncWebsocketConsumer):
+    """
+    Streams AI guide and Kundali answers token by token.
+
+    Client sends one of:
+      {"action": "guide", "message": "...", "request_id": "..."}
+      {"action": "kundali", "data": {...}, "messages": [...], "kundali_id": 1, "request_id": "..."}
+    and receives "token" events followed by a "done" (or "error") event,
+    each echoing request_id.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get("user") or AnonymousUser()
+        await self.accept()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "{}")
+        except ValueError:
+            await self._send_event({"type": "error", "detail": "Invalid JSON"}, None)
+            return
+
+        request_id = data.get("request_id")
+        action = data.get("action", "guide")
+
+        if action == "kundali":
+            events = stream_kundali_prediction(
+                self.user,
+                data.get("data") or {},
+                history=data.get("messages", []),
+                kundali_id=data.get("kundali_id"),
+            )
+        else:
+            message = str(data.get("message", "")).strip()
+            if not message:
+                await self._send_event({"type": "error", "detail": "Message is required"}, request_id)
+                return
+            # Tools only need .user; image URLs stay relative without a host
+            request = SimpleNamespace(user=self.user, build_absolute_uri=lambda url: url)
+            events = AIOrchestrator().astream(request, message)
+
+        try:
+            async for event in events:
+                await self._send_event(event, request_id)
+        except Exception:
+            logger.exception("AI stream failed for action %s", action)
+            await self._send_event({"type": "error", "detail": STREAM_ERROR_DETAIL}, request_id)
+
+    async def _send_event(self, event, request_id):
+        await self.send(text_data=json.dumps({**event, "request_id": request_id}, cls=DjangoJSONEncoder))
@@ -1,19 +1,114 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
 from django.conf import settings
-from groq import Groq
+from groq import AsyncGroq, Groq
+
+
+def _timeout():
+    return float(getattr(settings, "GROQ_TIMEOUT_SECONDS", 20))
+
+
+def _max_retries():
+    return int(getattr(settings, "GROQ_MAX_RETRIES", 2))
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=int(getattr(settings, "GROQ_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(getattr(settings, "GROQ_MAX_KEEPALIVE", 10)),
+    )
+
+
+def _build_payload(model, messages, tools, tool_choice, max_tokens):
+    payload = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+    }
+    if tools is not None:
+        payload["tools"] = tools
+        payload["tool_choice"] = tool_choice
+    return payload
+
+
+# One pooled sync client per process; httpx.Client is thread-safe.
+_sync_client = None
+_sync_lock = threading.Lock()
+
+
+def _get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                _sync_client = Groq(
+                    api_key=settings.GROQ_API_KEY,
+                    timeout=_timeout(),
+                    max_retries=_max_retries(),
+                    http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+                )
+    return _sync_client
+
+
+# httpx.AsyncClient is bound to the loop it was first used on, so keep one per loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=_timeout(),
+            max_retries=_max_retries(),
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        )
+        _async_clients[loop] = client
+    return client
 
 
 class GroqClient:
     def __init__(self):
         self.model = getattr(settings, "GROQ_MODEL", "llama-3.1-8b-instant")
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-
-    def chat(self, messages, tools=None, tool_choice="auto", max_tokens=500):
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-        }
-        if tools is not None:
-            payload["tools"] = tools
-            payload["tool_choice"] = tool_choice
+        self.client = _get_sync_client()
+
+    def chat(self, messages, tools=None, tool_choice="auto", max_tokens=500, timeout=None):
+        payload = _build_payload(self.model, messages, tools, tool_choice, max_tokens)
+        if timeout is not None:
+            payload["timeout"] = timeout
         return self.client.chat.completions.create(**payload)
+
+
+class AsyncGroqClient:
+    """
+    Async counterpart of GroqClient for ASGI views.
+    Uses a pooled httpx.AsyncClient per event loop; `timeout` is a per-call
+    deadline in seconds and retries are handled by the Groq SDK.
+    """
+
+    def __init__(self):
+        self.model = getattr(settings, "GROQ_MODEL", "llama-3.1-8b-instant")
+
+    async def chat(self, messages, tools=None, tool_choice="auto", max_tokens=500, timeout=None):
+        payload = _build_payload(self.model, messages, tools, tool_choice, max_tokens)
+        client = _get_async_client()
+        deadline = timeout if timeout is not None else _timeout()
+        # The SDK timeout applies per attempt; wait_for bounds the whole call including retries.
+        return await asyncio.wait_for(
+            client.chat.completions.create(**payload),
+            timeout=deadline * (_max_retries() + 1),
+        )
+
+    async def stream(self, messages, tools=None, tool_choice="auto", max_tokens=500):
+        """Yield completion chunks as the model generates them."""
+        payload = _build_payload(self.model, messages, tools, tool_choice, max_tokens)
+        payload["stream"] = True
+        client = _get_async_client()
+        # Bound the wait for the first byte; the SDK read timeout covers gaps between chunks.
+        response = await asyncio.wait_for(client.chat.completions.create(**payload), timeout=_timeout())
+        async for chunk in response:
+            yield chunk
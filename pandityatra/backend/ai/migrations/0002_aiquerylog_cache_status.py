@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiquerylog',
+            name='cache_status',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
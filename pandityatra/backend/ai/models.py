@@ -20,6 +20,8 @@ class AIQueryLog(models.Model):
 	tool_log = models.JSONField(default=list, blank=True)
 	error = models.TextField(blank=True, default="")
 	latency_ms = models.IntegerField(default=0)
+	# Response cache outcome: "hit", "miss", "bypass" or empty when not consulted
+	cache_status = models.CharField(max_length=10, blank=True, default="")
 	created_at = models.DateTimeField(auto_now_add=True)
 
 	class Meta:
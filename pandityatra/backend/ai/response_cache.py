@@ -0,0 +1,155 @@
+"""
+AI Response Cache - Reuses AI guide answers for near-identical questions.
+
+Messages are normalized to an intent string (case, punctuation, stop words,
+Devanagari and Roman spelling variants) and looked up in the `ai_responses`
+cache alias, which applies the TTL and LRU eviction.
+
+An entry stores the tool calls the model made and a fingerprint of their
+results. On lookup the tools are re-run (cheap DB reads) and the cached
+answer is used only if the fingerprint still matches, so the effective key
+is intent + non-personal tool results and product/pandit cards stay fresh.
+
+Answers that used personal tools are never cached, and authenticated users
+get their own partition keyed on their booking context, because the system
+prompt carries the user's name and recent bookings.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+
+from django.core.cache import caches
+
+from .constants import TOOL_NAMES
+
+CACHE_ALIAS = "ai_responses"
+KEY_VERSION = "v1"
+
+# Tools whose results depend on the requesting user or change their state
+PERSONAL_TOOLS = {
+    TOOL_NAMES["GET_BOOKING_STATUS"],
+    TOOL_NAMES["LIST_MY_BOOKINGS"],
+    TOOL_NAMES["ADD_TO_CART_INTENT"],
+    TOOL_NAMES["SWITCH_TO_REALTIME_CHAT"],
+}
+
+DEVANAGARI_WORDS = {
+    "पूजा": "puja", "पुजा": "puja",
+    "सामग्री": "samagri", "समाग्री": "samagri",
+    "पण्डित": "pandit", "पंडित": "pandit", "पण्डितजी": "pandit",
+    "कुण्डली": "kundali", "कुंडली": "kundali", "चिना": "kundali",
+    "बुकिङ": "booking", "बुक": "book",
+    "सत्यनारायण": "satyanarayan", "व्रतबन्ध": "bratabandha", "ब्रतबन्ध": "bratabandha",
+    "विवाह": "bibaha", "बिबाह": "bibaha", "पास्नी": "pasni",
+    "के": "what", "कसरी": "how", "कति": "price",
+}
+
+ROMAN_VARIANTS = {
+    "pooja": "puja", "poojas": "puja", "pujas": "puja", "pujaa": "puja",
+    "samagree": "samagri", "saamagri": "samagri", "samagry": "samagri", "samgri": "samagri",
+    "pandits": "pandit", "panditji": "pandit", "pundit": "pandit", "priest": "pandit", "priests": "pandit",
+    "kundli": "kundali", "kundly": "kundali", "kundalee": "kundali",
+    "satyanarayana": "satyanarayan", "satyanarayn": "satyanarayan",
+    "vivah": "bibaha", "vivaha": "bibaha", "bibah": "bibaha", "biwaha": "bibaha",
+    "bratabanda": "bratabandha", "vratabandha": "bratabandha", "bratbandha": "bratabandha",
+    "ke": "what", "k": "what", "kasari": "how", "kasri": "how",
+    "booking": "book", "bookings": "book",
+}
+
+# Joined before tokenizing so "satya narayan" and "satyanarayan" match
+ROMAN_PHRASES = {
+    "satya narayan": "satyanarayan",
+    "brata bandha": "bratabandha",
+    "janam patri": "kundali",
+    "birth chart": "kundali",
+}
+
+STOP_WORDS = {
+    "a", "an", "the", "for", "do", "does", "i", "we", "please", "pls", "is", "are",
+    "of", "to", "in", "on", "can", "could", "you", "me", "tell", "about",
+    "ji", "hai", "ho", "cha", "chha", "xa", "la", "lai", "ko", "ma",
+}
+
+
+def normalize_message(text: str) -> str:
+    """Reduce a message to a canonical, order-independent intent string."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    # Drop punctuation and symbols (incl. the Devanagari danda) but keep
+    # combining vowel signs, which \w would strip from Devanagari words.
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+    text = re.sub(r"\s+", " ", text).strip()
+    for phrase, canonical in ROMAN_PHRASES.items():
+        text = text.replace(phrase, canonical)
+
+    tokens = set()
+    for token in text.split():
+        token = DEVANAGARI_WORDS.get(token, token)
+        token = ROMAN_VARIANTS.get(token, token)
+        if token not in STOP_WORDS:
+            tokens.add(token)
+    return " ".join(sorted(tokens))
+
+
+def cache_partition(user, booking_context: str = "") -> str:
+    if not user or not getattr(user, "is_authenticated", False):
+        return "anon"
+    context_hash = hashlib.sha1(booking_context.encode("utf-8")).hexdigest()[:12]
+    return f"user{user.id}:{context_hash}"
+
+
+def make_key(user_message: str, user, booking_context: str = "") -> str | None:
+    intent = normalize_message(user_message)
+    if not intent:
+        return None
+    digest = hashlib.sha256(intent.encode("utf-8")).hexdigest()[:32]
+    return f"{KEY_VERSION}:{cache_partition(user, booking_context)}:{digest}"
+
+
+def fingerprint(results) -> str:
+    """Stable hash of tool results, ignoring per-request URLs."""
+    rows = [
+        {
+            "ok": r.ok,
+            "type": r.type,
+            "message": r.message,
+            "data": _strip_images(r.data),
+        }
+        for r in results
+    ]
+    raw = json.dumps(rows, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _strip_images(value):
+    if isinstance(value, dict):
+        return {k: _strip_images(v) for k, v in value.items() if k != "image"}
+    if isinstance(value, list):
+        return [_strip_images(v) for v in value]
+    return value
+
+
+def is_cacheable(tool_names, results) -> bool:
+    if any(name in PERSONAL_TOOLS for name in tool_names):
+        return False
+    return all(r.ok for r in results)
+
+
+def get_entry(key):
+    if not key:
+        return None
+    return caches[CACHE_ALIAS].get(key)
+
+
+def set_entry(key, tool_calls, results, reply: str):
+    """
+    Store an answer. `tool_calls` are (name, raw_arguments) pairs in call
+    order; an empty list means the answer came from the no-tool path.
+    """
+    if not key:
+        return
+    caches[CACHE_ALIAS].set(key, {
+        "tool_calls": [{"name": name, "arguments": arguments} for name, arguments in tool_calls],
+        "fingerprint": fingerprint(results),
+        "reply": reply,
+    })
@@ -1,13 +1,20 @@
+import asyncio
 import time
 import uuid
 import re
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.db import connection
 
 from bookings.models import Booking
 from services.models import Puja
+from . import response_cache
 from .models import AIQueryLog
-from .constants import RESPONSE_TYPES
+from .constants import RESPONSE_TYPES, TOOL_NAMES
 from .schemas import AIResponse
-from .groq_client import GroqClient
+from .groq_client import AsyncGroqClient, GroqClient
 from .prompt_builder import build_booking_context, build_system_prompt
 from .tool_registry import get_tool_specs
 from .tool_router import ToolRouter
@@ -17,6 +24,7 @@ from .formatters.response_formatter import merge_tool_result, to_payload
 class AIOrchestrator:
     def __init__(self):
         self.groq = GroqClient()
+        self.async_groq = AsyncGroqClient()
         self.router = ToolRouter()
 
     def _get_user_booking_context(self, user) -> str:
@@ -252,108 +260,126 @@ class AIOrchestrator:
             "Namaste! 🕉️"
         )
 
-    def run(self, request, user_message: str) -> dict:
-        start = time.time()
-        trace_id = uuid.uuid4().hex
-        tool_log = []
-        ai_resp = AIResponse(reply="", response_type=RESPONSE_TYPES["TEXT"])
-
-        user = request.user if hasattr(request, 'user') else None
+    # ── Shared steps for run() / arun() ────────────────────────────────
+    # Read-only tools that touch no shared request state; several calls to
+    # these in one model turn are executed concurrently.
+    PARALLEL_SAFE_TOOLS = {
+        TOOL_NAMES["SEARCH_SAMAGRI"],
+        TOOL_NAMES["FIND_PANDITS"],
+        TOOL_NAMES["LIST_MY_BOOKINGS"],
+        TOOL_NAMES["GET_BOOKING_STATUS"],
+        TOOL_NAMES["HOW_TO_BOOK"],
+        TOOL_NAMES["HOW_KUNDALI_WORKS"],
+    }
+    MAX_TOOL_WORKERS = 4
 
-        # ── 1. Greeting check ──
+    def _quick_reply(self, user_message: str, user) -> str | None:
+        """Greeting, thank-you and rule-based answers that skip the LLM."""
         if self._match_greeting(user_message):
-            ai_resp.reply = self._get_greeting_reply(user_message, user)
-            latency_ms = int((time.time() - start) * 1000)
-            AIQueryLog.objects.create(
-                user=user if getattr(user, "is_authenticated", False) else None,
-                trace_id=trace_id,
-                mode="guide",
-                user_message=user_message,
-                ai_reply=ai_resp.reply,
-                response_type=ai_resp.response_type,
-                tool_log=tool_log,
-                latency_ms=latency_ms,
-            )
-            payload = to_payload(ai_resp)
-            payload["trace_id"] = trace_id
-            return payload
-
-        # ── 2. Thank-you check ──
+            return self._get_greeting_reply(user_message, user)
         if self._match_thanks(user_message):
-            ai_resp.reply = self._get_thanks_reply(user)
-            latency_ms = int((time.time() - start) * 1000)
-            AIQueryLog.objects.create(
-                user=user if getattr(user, "is_authenticated", False) else None,
-                trace_id=trace_id,
-                mode="guide",
-                user_message=user_message,
-                ai_reply=ai_resp.reply,
-                response_type=ai_resp.response_type,
-                tool_log=tool_log,
-                latency_ms=latency_ms,
-            )
-            payload = to_payload(ai_resp)
-            payload["trace_id"] = trace_id
-            return payload
-
-        # ── 3. Rule-based knowledge check ──
-        rule_reply = self._match_rule_based(user_message)
-        if rule_reply:
-            ai_resp.reply = rule_reply
-            latency_ms = int((time.time() - start) * 1000)
-            AIQueryLog.objects.create(
-                user=user if getattr(user, "is_authenticated", False) else None,
-                trace_id=trace_id,
-                mode="guide",
-                user_message=user_message,
-                ai_reply=ai_resp.reply,
-                response_type=ai_resp.response_type,
-                tool_log=tool_log,
-                latency_ms=latency_ms,
-            )
-            payload = to_payload(ai_resp)
-            payload["trace_id"] = trace_id
-            return payload
-
-        booking_context = self._get_user_booking_context(request.user)
-        system_prompt = build_system_prompt(request.user, booking_context)
+            return self._get_thanks_reply(user)
+        return self._match_rule_based(user_message)
 
+    def _prepare(self, user, user_message: str):
+        """Build the LLM messages and look up a cached answer for this intent."""
+        booking_context = self._get_user_booking_context(user)
+        system_prompt = build_system_prompt(user, booking_context)
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message},
         ]
+        cache_key = response_cache.make_key(user_message, user, booking_context)
+        return messages, cache_key, response_cache.get_entry(cache_key)
+
+    @staticmethod
+    def _replay_calls(entry) -> list:
+        return [
+            SimpleNamespace(id="", function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+            for c in entry["tool_calls"]
+        ]
 
-        response = self.groq.chat(messages=messages, tools=get_tool_specs(), tool_choice="auto", max_tokens=400)
-        response_message = response.choices[0].message
-        tool_calls = response_message.tool_calls or []
-        ai_resp.reply = response_message.content or ""
-
+    def _use_cached(self, entry, calls, results, ai_resp, tool_log) -> bool:
+        """Apply a cached answer if the re-run tools still return the same data."""
+        if response_cache.fingerprint(results) != entry["fingerprint"]:
+            return False
+        for call, result in zip(calls, results):
+            self._record_tool(ai_resp, tool_log, call.function.name, result)
+        ai_resp.reply = entry["reply"]
+        return True
+
+    def _store_answer(self, cache_key, tool_calls, results, reply: str) -> str:
+        tool_names = [c.function.name for c in tool_calls]
+        if not cache_key or not reply or not response_cache.is_cacheable(tool_names, results):
+            return "bypass"
+        response_cache.set_entry(
+            cache_key,
+            [(c.function.name, c.function.arguments) for c in tool_calls],
+            results,
+            reply,
+        )
+        return "miss"
+
+    def _record_tool(self, ai_resp, tool_log, tool_name, result, fallback=False):
+        tool_entry = {"tool": tool_name, "ok": result.ok, "message": result.message}
+        if fallback:
+            tool_entry["fallback"] = True
+        ai_resp.tool_log.append(tool_entry)
+        tool_log.append(tool_entry)
+        merge_tool_result(ai_resp, result)
+
+    def _can_run_parallel(self, tool_calls) -> bool:
+        return len(tool_calls) > 1 and all(c.function.name in self.PARALLEL_SAFE_TOOLS for c in tool_calls)
+
+    def _execute_tool(self, request, call):
+        args = self.router.safe_parse_arguments(call.function.arguments)
+        return self.router.execute(request, call.function.name, args)
+
+    def _execute_tool_in_worker(self, request, call):
+        # Worker threads open their own DB connection; release it when done.
+        try:
+            return self._execute_tool(request, call)
+        finally:
+            connection.close()
+
+    def _execute_tool_calls(self, request, tool_calls) -> list:
+        """Run the model's tool calls, concurrently when they are all read-only."""
+        if not self._can_run_parallel(tool_calls):
+            return [self._execute_tool(request, call) for call in tool_calls]
+        workers = min(len(tool_calls), self.MAX_TOOL_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda call: self._execute_tool_in_worker(request, call), tool_calls))
+
+    async def _aexecute_tool_calls(self, request, tool_calls) -> list:
+        if not self._can_run_parallel(tool_calls):
+            execute = sync_to_async(self._execute_tool)
+            return [await execute(request, call) for call in tool_calls]
+        execute = sync_to_async(self._execute_tool_in_worker, thread_sensitive=False)
+        return list(await asyncio.gather(*(execute(request, call) for call in tool_calls)))
+
+    def _apply_tool_results(self, ai_resp, tool_log, messages, tool_calls, results):
+        # Results are merged in call order so cards stay deterministic
+        for call, result in zip(tool_calls, results):
+            tool_name = call.function.name
+            self._record_tool(ai_resp, tool_log, tool_name, result)
+            messages.append({
+                "tool_call_id": call.id,
+                "role": "tool",
+                "name": tool_name,
+                "content": result.message,
+            })
+
+    def _apply_fallbacks(self, request, ai_resp, tool_log, user_message: str):
+        """Guard fallbacks for when the model answered without calling a tool."""
         lowered = user_message.lower()
-        puja_hint = Puja.objects.filter(name__icontains=user_message).first() or Puja.objects.filter(name__icontains=lowered).first()
         product_intent = any(k in lowered for k in ["buy", "need", "find", "search", "book", "murti", "idol", "samagri", "agarbatti", "diya", "gita", "ramayan"])
+        wants_kit = any(k in lowered for k in ["samagri", "items", "kit", "materials", "required", "recommend"])
 
-        if tool_calls:
-            messages.append(response_message)
-            for call in tool_calls:
-                tool_name = call.function.name
-                args = self.router.safe_parse_arguments(call.function.arguments)
-                result = self.router.execute(request, tool_name, args)
-
-                tool_entry = {"tool": tool_name, "ok": result.ok, "message": result.message}
-                ai_resp.tool_log.append(tool_entry)
-                tool_log.append(tool_entry)
-                merge_tool_result(ai_resp, result)
-
-                messages.append({
-                    "tool_call_id": call.id,
-                    "role": "tool",
-                    "name": tool_name,
-                    "content": result.message,
-                })
+        puja_hint = None
+        if wants_kit:
+            puja_hint = Puja.objects.filter(name__icontains=user_message).first() or Puja.objects.filter(name__icontains=lowered).first()
 
-            final = self.groq.chat(messages=messages, max_tokens=350)
-            ai_resp.reply = final.choices[0].message.content or ai_resp.reply or "Namaste 🙏 How can I help next?"
-        elif puja_hint and any(k in lowered for k in ["samagri", "items", "kit", "materials", "required", "recommend"]):
+        if puja_hint:
             result = self.router.execute(
                 request,
                 "recommend_puja_samagri",
@@ -366,10 +392,7 @@ class AIOrchestrator:
                     "limit": 12,
                 }
             )
-            tool_entry = {"tool": "recommend_puja_samagri", "ok": result.ok, "message": result.message, "fallback": True}
-            ai_resp.tool_log.append(tool_entry)
-            tool_log.append(tool_entry)
-            merge_tool_result(ai_resp, result)
+            self._record_tool(ai_resp, tool_log, "recommend_puja_samagri", result, fallback=True)
             if result.data.get("products"):
                 ai_resp.reply = (
                     f"I prepared puja-specific samagri for {puja_hint.name} and added best alternatives for missing items. "
@@ -378,20 +401,14 @@ class AIOrchestrator:
         elif product_intent:
             # Guard fallback: ensure user still gets product cards if tool call was skipped
             result = self.router.execute(request, "search_samagri", {"query": user_message, "limit": 5})
-            tool_entry = {"tool": "search_samagri", "ok": result.ok, "message": result.message, "fallback": True}
-            ai_resp.tool_log.append(tool_entry)
-            tool_log.append(tool_entry)
-            merge_tool_result(ai_resp, result)
+            self._record_tool(ai_resp, tool_log, "search_samagri", result, fallback=True)
             if result.data.get("products"):
                 ai_resp.reply = "I found some matching items 🙏 You can add them to cart directly from below."
 
-        if not ai_resp.reply:
-            ai_resp.reply = "Namaste 🙏 How can I help you today?"
-
+    def _finish(self, ai_resp, tool_log, trace_id, user, user_message: str, start: float, cache_status: str = "") -> dict:
         latency_ms = int((time.time() - start) * 1000)
-
         AIQueryLog.objects.create(
-            user=request.user if getattr(request.user, "is_authenticated", False) else None,
+            user=user if getattr(user, "is_authenticated", False) else None,
             trace_id=trace_id,
             mode="guide",
             user_message=user_message,
@@ -399,8 +416,217 @@ class AIOrchestrator:
             response_type=ai_resp.response_type,
             tool_log=tool_log,
             latency_ms=latency_ms,
+            cache_status=cache_status,
         )
-
         payload = to_payload(ai_resp)
         payload["trace_id"] = trace_id
         return payload
+
+    def run(self, request, user_message: str) -> dict:
+        start = time.time()
+        trace_id = uuid.uuid4().hex
+        tool_log = []
+        ai_resp = AIResponse(reply="", response_type=RESPONSE_TYPES["TEXT"])
+
+        user = request.user if hasattr(request, 'user') else None
+
+        # ── 1-3. Greeting / thank-you / rule-based knowledge ──
+        quick_reply = self._quick_reply(user_message, user)
+        if quick_reply:
+            ai_resp.reply = quick_reply
+            return self._finish(ai_resp, tool_log, trace_id, user, user_message, start)
+
+        messages, cache_key, entry = self._prepare(user, user_message)
+
+        # ── 4. Response cache ──
+        if entry:
+            calls = self._replay_calls(entry)
+            results = self._execute_tool_calls(request, calls)
+            if self._use_cached(entry, calls, results, ai_resp, tool_log):
+                if not calls:
+                    self._apply_fallbacks(request, ai_resp, tool_log, user_message)
+                return self._finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status="hit")
+
+        response = self.groq.chat(messages=messages, tools=get_tool_specs(), tool_choice="auto", max_tokens=400)
+        response_message = response.choices[0].message
+        tool_calls = response_message.tool_calls or []
+        ai_resp.reply = response_message.content or ""
+        results = []
+
+        if tool_calls:
+            messages.append(response_message)
+            results = self._execute_tool_calls(request, tool_calls)
+            self._apply_tool_results(ai_resp, tool_log, messages, tool_calls, results)
+
+            final = self.groq.chat(messages=messages, max_tokens=350)
+            ai_resp.reply = final.choices[0].message.content or ai_resp.reply or "Namaste 🙏 How can I help next?"
+            cache_status = self._store_answer(cache_key, tool_calls, results, ai_resp.reply)
+        else:
+            # Fallback cards are recomputed on every hit, so cache the model's own reply
+            cache_status = self._store_answer(cache_key, tool_calls, results, ai_resp.reply)
+            self._apply_fallbacks(request, ai_resp, tool_log, user_message)
+
+        if not ai_resp.reply:
+            ai_resp.reply = "Namaste 🙏 How can I help you today?"
+
+        return self._finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status=cache_status)
+
+    async def arun(self, request, user_message: str) -> dict:
+        """
+        Async variant of run() for ASGI views. Groq calls are awaited on the
+        pooled async client and ORM work is pushed to threads, so the event
+        loop is never blocked while the model is responding.
+        """
+        start = time.time()
+        trace_id = uuid.uuid4().hex
+        tool_log = []
+        ai_resp = AIResponse(reply="", response_type=RESPONSE_TYPES["TEXT"])
+
+        user = getattr(request, "user", None)
+        finish = sync_to_async(self._finish)
+
+        quick_reply = self._quick_reply(user_message, user)
+        if quick_reply:
+            ai_resp.reply = quick_reply
+            return await finish(ai_resp, tool_log, trace_id, user, user_message, start)
+
+        messages, cache_key, entry = await sync_to_async(self._prepare)(user, user_message)
+        apply_fallbacks = sync_to_async(self._apply_fallbacks)
+        store_answer = sync_to_async(self._store_answer)
+
+        if entry:
+            calls = self._replay_calls(entry)
+            results = await self._aexecute_tool_calls(request, calls)
+            if self._use_cached(entry, calls, results, ai_resp, tool_log):
+                if not calls:
+                    await apply_fallbacks(request, ai_resp, tool_log, user_message)
+                return await finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status="hit")
+
+        response = await self.async_groq.chat(messages=messages, tools=get_tool_specs(), tool_choice="auto", max_tokens=400)
+        response_message = response.choices[0].message
+        tool_calls = response_message.tool_calls or []
+        ai_resp.reply = response_message.content or ""
+        results = []
+
+        if tool_calls:
+            messages.append(response_message)
+            results = await self._aexecute_tool_calls(request, tool_calls)
+            self._apply_tool_results(ai_resp, tool_log, messages, tool_calls, results)
+
+            final = await self.async_groq.chat(messages=messages, max_tokens=350)
+            ai_resp.reply = final.choices[0].message.content or ai_resp.reply or "Namaste 🙏 How can I help next?"
+            cache_status = await store_answer(cache_key, tool_calls, results, ai_resp.reply)
+        else:
+            cache_status = await store_answer(cache_key, tool_calls, results, ai_resp.reply)
+            await apply_fallbacks(request, ai_resp, tool_log, user_message)
+
+        if not ai_resp.reply:
+            ai_resp.reply = "Namaste 🙏 How can I help you today?"
+
+        return await finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status=cache_status)
+
+    # ── Streaming ──────────────────────────────────────────────────────
+    async def _astream_reply(self, messages, tool_calls_out: list, **kwargs):
+        """Yield content deltas; streamed tool call fragments are assembled into tool_calls_out."""
+        partial = {}
+        async for chunk in self.async_groq.stream(messages=messages, **kwargs):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for fragment in delta.tool_calls or []:
+                slot = partial.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+                if fragment.id:
+                    slot["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    slot["name"] = fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    slot["arguments"] += fragment.function.arguments
+            if delta.content:
+                yield delta.content
+
+        for index in sorted(partial):
+            slot = partial[index]
+            tool_calls_out.append(
+                SimpleNamespace(id=slot["id"], function=SimpleNamespace(name=slot["name"], arguments=slot["arguments"]))
+            )
+
+    @staticmethod
+    def _assistant_message(content: str, tool_calls) -> dict:
+        return {
+            "role": "assistant",
+            "content": content or None,
+            "tool_calls": [
+                {
+                    "id": c.id,
+                    "type": "function",
+                    "function": {"name": c.function.name, "arguments": c.function.arguments},
+                }
+                for c in tool_calls
+            ],
+        }
+
+    async def astream(self, request, user_message: str):
+        """
+        Streaming variant of arun(). Yields {"type": "token", "text": ...}
+        events as the model generates text, then {"type": "done", "payload": ...}
+        with the same payload arun() returns. The final payload is
+        authoritative: fallbacks may replace the streamed text.
+        """
+        start = time.time()
+        trace_id = uuid.uuid4().hex
+        tool_log = []
+        ai_resp = AIResponse(reply="", response_type=RESPONSE_TYPES["TEXT"])
+
+        user = getattr(request, "user", None)
+        finish = sync_to_async(self._finish)
+
+        quick_reply = self._quick_reply(user_message, user)
+        if quick_reply:
+            ai_resp.reply = quick_reply
+            yield {"type": "token", "text": quick_reply}
+            yield {"type": "done", "payload": await finish(ai_resp, tool_log, trace_id, user, user_message, start)}
+            return
+
+        messages, cache_key, entry = await sync_to_async(self._prepare)(user, user_message)
+        apply_fallbacks = sync_to_async(self._apply_fallbacks)
+        store_answer = sync_to_async(self._store_answer)
+
+        if entry:
+            calls = self._replay_calls(entry)
+            results = await self._aexecute_tool_calls(request, calls)
+            if self._use_cached(entry, calls, results, ai_resp, tool_log):
+                if not calls:
+                    await apply_fallbacks(request, ai_resp, tool_log, user_message)
+                yield {"type": "token", "text": ai_resp.reply}
+                payload = await finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status="hit")
+                yield {"type": "done", "payload": payload}
+                return
+
+        content = ""
+        tool_calls = []
+        async for text in self._astream_reply(messages, tool_calls, tools=get_tool_specs(), tool_choice="auto", max_tokens=400):
+            content += text
+            yield {"type": "token", "text": text}
+        ai_resp.reply = content
+        results = []
+
+        if tool_calls:
+            messages.append(self._assistant_message(content, tool_calls))
+            results = await self._aexecute_tool_calls(request, tool_calls)
+            self._apply_tool_results(ai_resp, tool_log, messages, tool_calls, results)
+
+            final_text = ""
+            async for text in self._astream_reply(messages, [], max_tokens=350):
+                final_text += text
+                yield {"type": "token", "text": text}
+            ai_resp.reply = final_text or ai_resp.reply or "Namaste 🙏 How can I help next?"
+            cache_status = await store_answer(cache_key, tool_calls, results, ai_resp.reply)
+        else:
+            cache_status = await store_answer(cache_key, tool_calls, results, ai_resp.reply)
+            await apply_fallbacks(request, ai_resp, tool_log, user_message)
+
+        if not ai_resp.reply:
+            ai_resp.reply = "Namaste 🙏 How can I help you today?"
+
+        payload = await finish(ai_resp, tool_log, trace_id, user, user_message, start, cache_status=cache_status)
+        yield {"type": "done", "payload": payload}
@@ -1,3 +1,269 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
 from django.test import TestCase
 
-# Create your tests here.
+from samagri.models import PujaSamagriRequirement, SamagriCategory, SamagriItem
+from samagri.search_index import get_search_index
+from services.models import Puja
+from . import response_cache
+from .constants import RESPONSE_TYPES
+from .models import AIQueryLog
+from .schemas import ToolExecutionResult
+from .service import AIOrchestrator
+from .tools import recommend_puja_samagri
+
+
+def _tool_call(call_id, name, args):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def _completion(content="", tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class AIOrchestratorTestCase(TestCase):
+    def setUp(self):
+        caches[response_cache.CACHE_ALIAS].clear()
+        self.request = SimpleNamespace(user=AnonymousUser())
+        self.orchestrator = AIOrchestrator()
+        self.tool_calls = [
+            _tool_call("c1", "search_samagri", {"query": "diya"}),
+            _tool_call("c2", "find_pandits", {"language": "Nepali"}),
+        ]
+        self.thread_ids = []
+
+        def fake_execute(request, tool_name, args):
+            self.thread_ids.append(threading.get_ident())
+            time.sleep(0.05)
+            if tool_name == "search_samagri":
+                return ToolExecutionResult(
+                    ok=True, type=RESPONSE_TYPES["PRODUCT_LIST"],
+                    data={"products": [{"id": 1}]}, message="found products",
+                )
+            return ToolExecutionResult(
+                ok=True, type=RESPONSE_TYPES["PANDIT_LIST"],
+                data={"pandits": [{"id": 2}]}, message="found pandits",
+            )
+
+        self.orchestrator.router.execute = fake_execute
+
+    def test_quick_reply_skips_llm(self):
+        self.orchestrator.groq = mock.Mock()
+        payload = self.orchestrator.run(self.request, "namaste")
+        self.assertIn("Namaste", payload["reply"])
+        self.orchestrator.groq.chat.assert_not_called()
+        self.assertTrue(AIQueryLog.objects.filter(trace_id=payload["trace_id"]).exists())
+
+    def test_run_executes_independent_tools_in_parallel(self):
+        self.orchestrator.groq = mock.Mock()
+        self.orchestrator.groq.chat.side_effect = [
+            _completion(tool_calls=self.tool_calls),
+            _completion(content="Here you go"),
+        ]
+
+        payload = self.orchestrator.run(self.request, "need diya plus a pandit for griha pravesh")
+
+        self.assertEqual(payload["reply"], "Here you go")
+        self.assertEqual([t["tool"] for t in payload["tool_log"]], ["search_samagri", "find_pandits"])
+        self.assertEqual(payload["products"], [{"id": 1}])
+        self.assertEqual(payload["pandits"], [{"id": 2}])
+        self.assertEqual(len(set(self.thread_ids)), 2)
+
+        # Tool results are fed back to the model in call order
+        followup = self.orchestrator.groq.chat.call_args_list[1].kwargs["messages"]
+        self.assertEqual([m["tool_call_id"] for m in followup[-2:]], ["c1", "c2"])
+
+    def test_unsafe_tools_run_serially(self):
+        calls = [
+            _tool_call("c1", "search_samagri", {"query": "diya"}),
+            _tool_call("c2", "add_to_cart_intent", {"product_id": 1}),
+        ]
+        self.orchestrator._execute_tool_calls(self.request, calls)
+        self.assertEqual(set(self.thread_ids), {threading.get_ident()})
+
+    def test_arun_awaits_async_client(self):
+        self.orchestrator.async_groq = mock.Mock()
+        self.orchestrator.async_groq.chat = mock.AsyncMock(side_effect=[
+            _completion(tool_calls=self.tool_calls),
+            _completion(content="Async reply"),
+        ])
+
+        payload = async_to_sync(self.orchestrator.arun)(self.request, "need diya plus a pandit for griha pravesh")
+
+        self.assertEqual(payload["reply"], "Async reply")
+        self.assertEqual(payload["pandits"], [{"id": 2}])
+        self.assertEqual(self.orchestrator.async_groq.chat.await_count, 2)
+        self.assertTrue(AIQueryLog.objects.filter(trace_id=payload["trace_id"]).exists())
+
+
+class AIResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches[response_cache.CACHE_ALIAS].clear()
+        self.request = SimpleNamespace(user=AnonymousUser())
+        self.orchestrator = AIOrchestrator()
+        self.orchestrator.groq = mock.Mock()
+        self.products = [{"id": 1, "name": "Diya"}]
+
+        def fake_execute(request, tool_name, args):
+            if tool_name == "list_my_bookings":
+                return ToolExecutionResult(ok=True, type=RESPONSE_TYPES["BOOKING_LIST"], message="2 bookings")
+            return ToolExecutionResult(
+                ok=True, type=RESPONSE_TYPES["PRODUCT_LIST"],
+                data={"products": list(self.products)}, message=f"{len(self.products)} items",
+            )
+
+        self.orchestrator.router.execute = fake_execute
+
+    def _script(self, tool_name="search_samagri"):
+        self.orchestrator.groq.chat.side_effect = [
+            _completion(tool_calls=[_tool_call("c1", tool_name, {"query": "satyanarayan"})]),
+            _completion(content="Here is the samagri list"),
+        ]
+
+    def test_normalize_message_variants(self):
+        roman = response_cache.normalize_message("What Samagri for Satya Narayan Pooja?")
+        self.assertEqual(roman, response_cache.normalize_message("satyanarayan puja samagri - what"))
+        self.assertEqual(roman, response_cache.normalize_message("सत्यनारायण पूजा सामग्री के ।"))
+
+    def test_repeat_question_is_served_from_cache(self):
+        self._script()
+        first = self.orchestrator.run(self.request, "samagri list for satyanarayan puja")
+        second = self.orchestrator.run(self.request, "Satyanarayan pooja samagri list?")
+
+        self.assertEqual(self.orchestrator.groq.chat.call_count, 2)
+        self.assertEqual(second["reply"], first["reply"])
+        self.assertEqual(second["products"], self.products)
+        statuses = dict(AIQueryLog.objects.values_list("trace_id", "cache_status"))
+        self.assertEqual(statuses[first["trace_id"]], "miss")
+        self.assertEqual(statuses[second["trace_id"]], "hit")
+
+    def test_changed_tool_results_invalidate_entry(self):
+        self._script()
+        self.orchestrator.run(self.request, "samagri list for satyanarayan puja")
+        self.products.append({"id": 2, "name": "Ghee"})
+        self._script()
+        payload = self.orchestrator.run(self.request, "samagri list for satyanarayan puja")
+
+        self.assertEqual(self.orchestrator.groq.chat.call_count, 4)
+        self.assertEqual(AIQueryLog.objects.get(trace_id=payload["trace_id"]).cache_status, "miss")
+
+    def test_personal_tools_bypass_cache(self):
+        self._script(tool_name="list_my_bookings")
+        payload = self.orchestrator.run(self.request, "list bookings")
+        self.assertEqual(AIQueryLog.objects.get(trace_id=payload["trace_id"]).cache_status, "bypass")
+        self._script(tool_name="list_my_bookings")
+        self.orchestrator.run(self.request, "list bookings")
+        self.assertEqual(self.orchestrator.groq.chat.call_count, 4)
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _fragment(index, call_id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class AIStreamTestCase(TestCase):
+    def setUp(self):
+        caches[response_cache.CACHE_ALIAS].clear()
+        self.request = SimpleNamespace(user=AnonymousUser())
+        self.orchestrator = AIOrchestrator()
+        self.orchestrator.router.execute = lambda request, tool_name, args: ToolExecutionResult(
+            ok=True, type=RESPONSE_TYPES["PANDIT_LIST"], data={"pandits": [dict(args)]}, message="1 pandit",
+        )
+        self.streams = []
+
+        async def fake_stream(messages, **kwargs):
+            for chunk in self.streams.pop(0):
+                yield chunk
+
+        self.orchestrator.async_groq = SimpleNamespace(stream=fake_stream)
+
+    def _collect(self, message):
+        async def run():
+            return [event async for event in self.orchestrator.astream(self.request, message)]
+        return async_to_sync(run)()
+
+    def test_tokens_stream_and_tool_calls_are_assembled(self):
+        self.streams = [
+            [
+                _chunk(tool_calls=[_fragment(0, "c1", "find_pandits", '{"language": ')]),
+                _chunk(tool_calls=[_fragment(0, arguments='"Nepali"}')]),
+            ],
+            [_chunk("Two "), _chunk("pandits "), _chunk("found")],
+        ]
+
+        events = self._collect("need a pandit for griha pravesh")
+
+        self.assertEqual([e["text"] for e in events if e["type"] == "token"], ["Two ", "pandits ", "found"])
+        done = events[-1]
+        self.assertEqual(done["type"], "done")
+        self.assertEqual(done["payload"]["reply"], "Two pandits found")
+        self.assertEqual(done["payload"]["pandits"], [{"language": "Nepali"}])
+        log = AIQueryLog.objects.get(trace_id=done["payload"]["trace_id"])
+        self.assertEqual(log.ai_reply, "Two pandits found")
+
+    def test_quick_reply_is_single_token(self):
+        events = self._collect("namaste")
+        self.assertEqual([e["type"] for e in events], ["token", "done"])
+
+    def test_mid_stream_errors_are_logged_not_sent(self):
+        from core.streaming import STREAM_ERROR_DETAIL, sse_response
+
+        async def events():
+            yield {"type": "token", "text": "Namaste"}
+            raise RuntimeError("groq: invalid api key sk-123")
+
+        async def run():
+            return [frame.decode() async for frame in sse_response(events()).streaming_content]
+
+        with self.assertLogs("core.streaming", level="ERROR"):
+            frames = async_to_sync(run)()
+        self.assertIn(STREAM_ERROR_DETAIL, frames[-1])
+        self.assertNotIn("sk-123", frames[-1])
+
+
+class RecommendPujaSamagriTestCase(TestCase):
+    def setUp(self):
+        lamps = SamagriCategory.objects.create(name='Lamps', slug='lamps')
+        basics = SamagriCategory.objects.create(name='Basics', slug='basics')
+        self.diya = SamagriItem.objects.create(name='Diya', category=lamps, price=50, stock_quantity=0)
+        self.lamp = SamagriItem.objects.create(name='Clay Diya Lamp', category=lamps, price=300, stock_quantity=4)
+        self.ghee = SamagriItem.objects.create(name='Cow Ghee', category=basics, price=400, stock_quantity=9)
+        self.rice = SamagriItem.objects.create(name='Rice', category=basics, price=90, stock_quantity=9)
+        self.puja = Puja.objects.create(name='Tihar Puja', description='d')
+
+    def test_pattern_items_resolve_in_fixed_queries(self):
+        get_search_index()
+        with self.assertNumQueries(3):
+            result = recommend_puja_samagri(None, self.puja.id)
+
+        product_ids = [p["id"] for p in result.data["products"]]
+        self.assertIn(self.ghee.id, product_ids)
+        self.assertIn(self.rice.id, product_ids)
+        self.assertEqual(len(product_ids), len(set(product_ids)))
+        diya_missing = [m for m in result.data["missing_items"] if m["name"] == "Diya"]
+        self.assertEqual(diya_missing[0]["reason"], "out_of_stock")
+        self.assertIn(self.lamp.id, [a["id"] for a in result.data["suggested_alternatives"]])
+
+    def test_requirements_resolve_with_alternatives(self):
+        puja = Puja.objects.create(name='Rudri', description='d')
+        PujaSamagriRequirement.objects.create(puja=puja, samagri_item=self.diya, quantity=2)
+        PujaSamagriRequirement.objects.create(puja=puja, samagri_item=self.ghee)
+        get_search_index()
+        with self.assertNumQueries(3):
+            result = recommend_puja_samagri(None, puja.id)
+
+        self.assertEqual(result.data["context"]["requirements_count"], 2)
+        self.assertEqual(result.data["suggested_alternatives"][0]["id"], self.lamp.id)
+        self.assertEqual(result.data["suggested_alternatives"][0]["for_item"], "Diya")
@@ -1,6 +1,6 @@
-from django.db.models import Q
 from bookings.models import Booking
 from samagri.models import SamagriItem, PujaSamagriRequirement
+from samagri.search_index import get_search_index
 from pandits.models import PanditUser
 from chat.models import ChatRoom
 from services.models import Puja
@@ -294,39 +294,19 @@ def _apply_do_not_cross_puja_guard(
     return allowed_products, filtered_actions, missing_items, filtered_alternatives, blocked
 
 
+def _fetch_items_in_order(ids):
+    """Load SamagriItems for ranked ids in one query, keeping the ranking."""
+    if not ids:
+        return []
+    by_id = SamagriItem.objects.select_related("category").in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
+
+
 def _find_db_item_by_name_or_alias(name: str):
     if not name:
         return None
-
-    alias_map = {
-        "janai": ["sacred thread", "thread"],
-        "lakshmi idol": ["laxmi idol", "idol", "murti"],
-        "modak": ["laddu", "sweet"],
-        "incense sticks": ["agarbatti", "dhup", "incense"],
-        "red flowers": ["flowers"],
-        "white flowers": ["flowers"],
-        "lotus flowers": ["flowers", "lotus"],
-        "rangoli items": ["rangoli", "color powder"],
-        "tika": ["vermilion", "kumkum"],
-    }
-
-    qs = SamagriItem.objects.filter(is_active=True).select_related("category")
-    candidate = qs.filter(name__icontains=name).order_by("-created_at").first()
-    if candidate:
-        return candidate
-
-    for token in name.lower().replace("-", " ").split():
-        if len(token) >= 3:
-            candidate = qs.filter(Q(name__icontains=token) | Q(description__icontains=token)).order_by("-created_at").first()
-            if candidate:
-                return candidate
-
-    for alias in alias_map.get(name.lower(), []):
-        candidate = qs.filter(Q(name__icontains=alias) | Q(description__icontains=alias)).order_by("-created_at").first()
-        if candidate:
-            return candidate
-
-    return None
+    matches = _fetch_items_in_order(get_search_index().search(name, limit=1))
+    return matches[0] if matches else None
 
 
 def _abs_image_url(request, image_field):
@@ -341,34 +321,12 @@ def _abs_image_url(request, image_field):
 
 
 def search_samagri(request, query: str, limit: int = 5) -> ToolExecutionResult:
-    normalized = (query or "").strip().lower()
-
-    alias_map = {
-        "murti": ["idol", "statue", "ganesh", "ganesha", "moorti"],
-        "ganesh": ["ganesha", "ganpati", "vinayak"],
-        "book": ["granth", "gita", "ramayan", "mahabharat"],
-        "samagri": ["puja", "ritual", "aarti"],
-    }
-
-    qs = SamagriItem.objects.filter(
-        Q(name__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query),
-        is_active=True,
-    ).select_related("category").distinct()[: max(1, min(limit, 10))]
-
-    if not qs.exists() and normalized:
-        tokens = [t for t in normalized.replace("-", " ").split() if len(t) >= 3]
-        q_obj = Q()
-        for token in tokens:
-            q_obj |= Q(name__icontains=token) | Q(description__icontains=token) | Q(category__name__icontains=token)
-            for alias in alias_map.get(token, []):
-                q_obj |= Q(name__icontains=alias) | Q(description__icontains=alias) | Q(category__name__icontains=alias)
-
-        if q_obj:
-            qs = SamagriItem.objects.filter(q_obj, is_active=True).select_related("category").distinct()[: max(1, min(limit, 10))]
+    limit = max(1, min(limit, 10))
+    qs = _fetch_items_in_order(get_search_index().search(query, limit=limit))
 
     # Last fallback: popular active items so chat UI still shows actionable cards
-    if not qs.exists():
-        qs = SamagriItem.objects.filter(is_active=True).select_related("category").order_by("-created_at")[: max(1, min(limit, 10))]
+    if not qs:
+        qs = SamagriItem.objects.filter(is_active=True).select_related("category").order_by("-created_at")[:limit]
 
     products = [
         {
@@ -389,24 +347,70 @@ def search_samagri(request, query: str, limit: int = 5) -> ToolExecutionResult:
     )
 
 
-def _find_alternative_item(base_item: SamagriItem | None, fallback_name: str = "", used_ids: set[int] | None = None):
-    qs = SamagriItem.objects.filter(is_active=True, stock_quantity__gt=0).select_related("category")
-    if used_ids:
-        qs = qs.exclude(id__in=list(used_ids))
+def _alternative_id(index, category_id, fallback_name: str, exclude_ids: set[int]):
+    """Newest in-stock item of the same category, else the best in-stock name match."""
+    ids = []
+    if category_id:
+        ids = index.search(category_id=category_id, in_stock=True, exclude_ids=exclude_ids, limit=1)
+    if not ids and fallback_name:
+        ids = index.search(fallback_name, in_stock=True, exclude_ids=exclude_ids, limit=1)
+    # Important: avoid random unrelated fallback (e.g. same Kumkum for everything)
+    return ids[0] if ids else None
+
+
+def _resolve_samagri_batch(requested):
+    """
+    Resolve a whole recommendation list in one pass.
+
+    `requested` is a list of (name, item) pairs: `item` is a preloaded
+    SamagriItem (DB requirements) or None to match by name. Entries are
+    decided in order against the in-memory search index, each product used
+    at most once, and an in-stock alternative is picked for anything that
+    cannot be used. All chosen products are then loaded with one query.
+
+    Returns (item, reason, alternative) per entry; reason is None when
+    `item` is usable, otherwise "not_available" or "out_of_stock".
+    """
+    index = get_search_index()
+    used_ids = set()
+    decisions = []
+
+    for name, item in requested:
+        if item is None:
+            found = index.search(name, limit=1) if name else []
+            item_id = found[0] if found else None
+            is_active = item_id is not None
+            stock = index.stock_of(item_id)
+            category_id = index.category_of(item_id)
+        else:
+            item_id = item.id
+            is_active = item.is_active
+            stock = item.stock_quantity
+            category_id = item.category_id
+
+        if is_active and stock > 0 and item_id not in used_ids:
+            used_ids.add(item_id)
+            decisions.append((item_id, None, None))
+            continue
 
-    if base_item and base_item.category_id:
-        candidate = qs.filter(category=base_item.category).exclude(id=base_item.id).order_by("-created_at").first()
-        if candidate:
-            return candidate
+        reason = "out_of_stock" if is_active and stock <= 0 else "not_available"
+        exclude_ids = used_ids | ({item_id} if item_id else set())
+        alt_id = _alternative_id(index, category_id, name, exclude_ids)
+        if alt_id:
+            used_ids.add(alt_id)
+        decisions.append((item_id, reason, alt_id))
 
-    for token in (fallback_name or "").lower().replace("-", " ").split():
-        if len(token) >= 3:
-            candidate = qs.filter(Q(name__icontains=token) | Q(description__icontains=token)).order_by("-created_at").first()
-            if candidate:
-                return candidate
+    wanted = {i for item_id, _, alt_id in decisions for i in (item_id, alt_id) if i}
+    fetched = SamagriItem.objects.select_related("category").in_bulk(wanted) if wanted else {}
 
-    # Important: avoid random unrelated fallback (e.g. same Kumkum for everything)
-    return None
+    resolved = []
+    for (name, item), (item_id, reason, alt_id) in zip(requested, decisions):
+        db_item = item or fetched.get(item_id)
+        if reason is None and db_item is None:
+            # Deleted since the index was built
+            reason = "not_available"
+        resolved.append((db_item, reason, fetched.get(alt_id)))
+    return resolved
 
 
 def recommend_puja_samagri(
@@ -427,24 +431,24 @@ def recommend_puja_samagri(
             message="Puja not found.",
         )
 
-    requirements = PujaSamagriRequirement.objects.filter(puja=puja).select_related("samagri_item__category")
-    if not requirements.exists():
+    requirements = list(PujaSamagriRequirement.objects.filter(puja=puja).select_related("samagri_item__category"))
+    if not requirements:
         pattern_items = _pattern_for_puja_name(puja.name)
 
         products = []
         actions = []
         missing_items = []
         suggested_alternatives = []
-        used_product_ids = set()
 
         if pattern_items:
-            for p_item in pattern_items[: max(1, min(int(limit), 30))]:
+            selected = pattern_items[: max(1, min(int(limit), 30))]
+            resolved = _resolve_samagri_batch([(p_item.get("name"), None) for p_item in selected])
+            for p_item, (db_item, reason, alt) in zip(selected, resolved):
                 item_name = p_item.get("name")
                 qty = int(p_item.get("quantity", 1))
                 unit = p_item.get("unit", "pcs")
 
-                db_item = _find_db_item_by_name_or_alias(item_name)
-                if db_item and db_item.stock_quantity > 0 and db_item.id not in used_product_ids:
+                if reason is None:
                     card = {
                         "id": db_item.id,
                         "name": db_item.name,
@@ -458,7 +462,6 @@ def recommend_puja_samagri(
                         "source": "puja_pattern_db_match",
                     }
                     products.append(card)
-                    used_product_ids.add(db_item.id)
                     actions.append({
                         "type": "ADD_TO_CART",
                         "product": {
@@ -475,11 +478,10 @@ def recommend_puja_samagri(
                     "name": item_name,
                     "quantity": qty,
                     "unit": unit,
-                    "reason": "not_available" if not db_item else "out_of_stock",
+                    "reason": reason,
                 })
 
-                alt = _find_alternative_item(db_item, fallback_name=item_name, used_ids=used_product_ids)
-                if not alt or alt.id in used_product_ids:
+                if not alt:
                     continue
 
                 alt_card = {
@@ -498,7 +500,6 @@ def recommend_puja_samagri(
                 }
                 suggested_alternatives.append(alt_card)
                 products.append(alt_card)
-                used_product_ids.add(alt.id)
 
                 if auto_add_alternatives:
                     actions.append({
@@ -568,16 +569,16 @@ def recommend_puja_samagri(
     actions = []
     missing_items = []
     suggested_alternatives = []
-    used_product_ids = set()
 
     effective_limit = max(1, min(int(limit), 30))
+    selected = requirements[:effective_limit]
+    resolved = _resolve_samagri_batch([(req.samagri_item.name, req.samagri_item) for req in selected])
 
-    for req in requirements[:effective_limit]:
-        item = req.samagri_item
+    for req, (item, reason, alt) in zip(selected, resolved):
         quantity = int(req.quantity or 1)
         unit = req.unit or item.unit or "pcs"
 
-        if item and item.is_active and item.stock_quantity > 0 and item.id not in used_product_ids:
+        if reason is None:
             product = {
                 "id": item.id,
                 "name": item.name,
@@ -591,7 +592,6 @@ def recommend_puja_samagri(
                 "source": "puja_requirement",
             }
             products.append(product)
-            used_product_ids.add(item.id)
             actions.append({
                 "type": "ADD_TO_CART",
                 "product": {
@@ -604,7 +604,6 @@ def recommend_puja_samagri(
             })
             continue
 
-        reason = "out_of_stock" if item and item.is_active and item.stock_quantity <= 0 else "not_available"
         missing_name = item.name if item else "Unknown item"
         missing_items.append({
             "name": missing_name,
@@ -613,8 +612,7 @@ def recommend_puja_samagri(
             "reason": reason,
         })
 
-        alt = _find_alternative_item(item, fallback_name=missing_name, used_ids=used_product_ids)
-        if not alt or alt.id in used_product_ids:
+        if not alt:
             continue
 
         alt_obj = {
@@ -633,7 +631,6 @@ def recommend_puja_samagri(
         }
         suggested_alternatives.append(alt_obj)
         products.append(alt_obj)
-        used_product_ids.add(alt.id)
 
         if auto_add_alternatives:
             actions.append({
@@ -670,7 +667,7 @@ def recommend_puja_samagri(
                 "location": location,
                 "budget_preference": budget_preference,
                 "notes": user_notes,
-                "requirements_count": requirements.count(),
+                "requirements_count": len(requirements),
                 "blocked_out_of_pattern_count": len(blocked_items),
             },
         },
@@ -783,10 +780,7 @@ def add_to_cart_intent(product_id: int | None = None, product_name: str | None =
     if product_id is not None:
         item = SamagriItem.objects.filter(id=product_id, is_active=True).first()
     elif product_name:
-        item = SamagriItem.objects.filter(
-            Q(name__icontains=product_name) | Q(description__icontains=product_name),
-            is_active=True,
-        ).order_by("-created_at").first()
+        item = _find_db_item_by_name_or_alias(product_name)
 
     if not item:
         return ToolExecutionResult(ok=False, type=RESPONSE_TYPES["TEXT"], message="Product not found. Please share a clearer item name.")
@@ -4,5 +4,7 @@ from . import views
 urlpatterns = [
     path("guide/", views.ai_guide),
     path("chat/", views.AIChatView.as_view()),
+    path("chat/async/", views.ai_chat_async),
+    path("chat/stream/", views.ai_chat_stream),
     path("puja-samagri/", views.AIPujaSamagriView.as_view()),
 ]
@@ -1,3 +1,9 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -7,6 +13,7 @@ from .service import AIOrchestrator
 from .tool_router import ToolRouter
 from .constants import TOOL_NAMES
 from drf_spectacular.utils import extend_schema
+from core.streaming import aauthenticate, sse_response
 
 
 class AIChatView(APIView):
@@ -25,6 +32,56 @@ class AIChatView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def _read_message(request):
+    """Parse the JSON body and authenticate; returns (message, error_response)."""
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None, JsonResponse({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+    message = str(data.get("message", "")).strip()
+    if not message:
+        return None, JsonResponse({"error": "Message is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        request.user = await aauthenticate(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({"detail": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    return message, None
+
+
+@csrf_exempt
+@require_POST
+async def ai_chat_async(request):
+    """
+    Native async variant of AIChatView for ASGI deployments.
+    The Groq round-trips are awaited instead of holding a worker thread.
+    """
+    message, error = await _read_message(request)
+    if error:
+        return error
+
+    try:
+        payload = await AIOrchestrator().arun(request, message)
+        return JsonResponse(payload)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def ai_chat_stream(request):
+    """
+    Server-Sent Events variant of the AI chat.
+    Emits "token" events as the model generates text and a final "done"
+    event carrying the same payload as /api/ai/chat/.
+    """
+    message, error = await _read_message(request)
+    if error:
+        return error
+    return sse_response(AIOrchestrator().astream(request, message))
+
+
 class AIPujaSamagriView(APIView):
     permission_classes = [AllowAny]
 
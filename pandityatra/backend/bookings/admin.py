@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.db import transaction
+
 from .models import Booking, BookingStatus
+from .signals import refresh_after_bulk_update
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -20,5 +23,8 @@ class BookingAdmin(admin.ModelAdmin):
     @admin.action(description='Cancel Selected Bookings & Initiate Refund')
     def cancel_booking(self, request, queryset):
         # This is a simplified action. In prod, you'd trigger the refund logic here.
+        bookings = list(queryset.only('id', 'pandit_id', 'booking_date'))
         updated = queryset.update(status=BookingStatus.CANCELLED)
+        # update() skips the Booking save signals
+        transaction.on_commit(lambda: refresh_after_bulk_update(bookings))
         self.message_user(request, f"{updated} bookings marked as CANCELLED.")
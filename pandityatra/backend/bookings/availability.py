@@ -0,0 +1,230 @@
+"""
+Availability Engine - Free slot lookup for pandits over one or more days.
+
+Busy time comes from active bookings (PENDING/ACCEPTED) and manual
+PanditAvailability blocks. Both are loaded once for the whole date range,
+converted to minutes-from-midnight per day, then sorted and merged so each
+candidate slot is checked with a binary search instead of a scan.
+
+The same intervals are also materialized as a 48-bit half-hour bitmap per
+pandit per day (PanditSlotBitmap) so "who is free at this time" can be
+answered for every pandit with a single query.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, BookingStatus, PanditSlotBitmap
+
+
+DAY_START = time(8, 0)   # First bookable slot
+DAY_END = time(20, 0)    # Slots must finish by this time
+SLOT_STEP_MINUTES = 30
+DEFAULT_DURATION_MINUTES = 60
+MAX_RANGE_DAYS = 31
+
+ACTIVE_BOOKING_STATUSES = [BookingStatus.PENDING, BookingStatus.ACCEPTED]
+
+BITMAP_SLOT_MINUTES = 30
+BITMAP_SLOTS_PER_DAY = 24 * 60 // BITMAP_SLOT_MINUTES  # 48 bits
+
+
+def _as_date(value):
+    """Accept date objects or "YYYY-MM-DD" strings (as passed to Booking.objects.create)."""
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _merge(intervals):
+    """Sort and merge overlapping/adjacent (start, end) minute intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def interval_mask(start_minute, end_minute):
+    """Bitmap with every half-hour slot touched by [start_minute, end_minute) set."""
+    if end_minute <= start_minute:
+        return 0
+    first = max(start_minute, 0) // BITMAP_SLOT_MINUTES
+    last = min((end_minute - 1) // BITMAP_SLOT_MINUTES, BITMAP_SLOTS_PER_DAY - 1)
+    if last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+class AvailabilityIndex:
+    """
+    Sorted, merged busy intervals for a single pandit keyed by date.
+
+    Intervals are stored as minutes from local midnight so a day can be
+    queried without touching datetimes.
+    """
+
+    def __init__(self, busy_by_day):
+        self._busy = {}
+        self._starts = {}
+        for day, intervals in busy_by_day.items():
+            merged = _merge(intervals)
+            self._busy[day] = merged
+            self._starts[day] = [start for start, _ in merged]
+
+    @classmethod
+    def build(cls, pandit, start_date, end_date):
+        """Load bookings and manual blocks for [start_date, end_date] in two queries."""
+        busy_by_day = defaultdict(list)
+
+        bookings = Booking.objects.filter(
+            pandit=pandit,
+            booking_date__gte=start_date,
+            booking_date__lte=end_date,
+            status__in=ACTIVE_BOOKING_STATUSES,
+        ).select_related('service').only(
+            'booking_date', 'booking_time', 'service__base_duration_minutes'
+        )
+        for b in bookings:
+            duration = b.service.base_duration_minutes if b.service else DEFAULT_DURATION_MINUTES
+            cls._add_span(
+                busy_by_day,
+                datetime.combine(b.booking_date, b.booking_time),
+                timedelta(minutes=duration or DEFAULT_DURATION_MINUTES),
+            )
+
+        # Manual unavailability blocks overlapping the range (local time)
+        from pandits.models import PanditAvailability
+        range_start = timezone.make_aware(datetime.combine(start_date, time.min))
+        range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        blocks = PanditAvailability.objects.filter(
+            pandit=pandit,
+            start_time__lt=range_end,
+            end_time__gt=range_start,
+        ).only('start_time', 'end_time')
+        for block in blocks:
+            start = timezone.localtime(block.start_time).replace(tzinfo=None)
+            end = timezone.localtime(block.end_time).replace(tzinfo=None)
+            if end > start:
+                cls._add_span(busy_by_day, start, end - start)
+
+        return cls(busy_by_day)
+
+    @staticmethod
+    def _add_span(busy_by_day, start, length):
+        """Split a naive datetime span into per-day minute intervals."""
+        end = start + length
+        day = start.date()
+        while datetime.combine(day, time.min) < end:
+            day_start = datetime.combine(day, time.min)
+            lo = max(start, day_start) - day_start
+            hi = min(end, day_start + timedelta(days=1)) - day_start
+            busy_by_day[day].append((int(lo.total_seconds() // 60), int(hi.total_seconds() // 60)))
+            day += timedelta(days=1)
+
+    def busy_intervals(self, day):
+        """Merged busy (start, end) minute intervals for a date."""
+        return self._busy.get(day, [])
+
+    def busy_mask(self, day):
+        """Half-hour bitmap of busy slots for a date."""
+        mask = 0
+        for start, end in self.busy_intervals(day):
+            mask |= interval_mask(start, end)
+        return mask
+
+    def is_free(self, day, start_minute, end_minute):
+        """True if [start_minute, end_minute) overlaps no busy interval on `day`."""
+        starts = self._starts.get(day)
+        if not starts:
+            return True
+        # Only the last interval starting before end_minute can overlap,
+        # because merged intervals are disjoint and sorted.
+        idx = bisect_left(starts, end_minute) - 1
+        return idx < 0 or self._busy[day][idx][1] <= start_minute
+
+    def free_slots(self, day, duration_minutes):
+        """List of "HH:MM" start times on `day` that fit `duration_minutes`."""
+        slots = []
+        current = _minutes(DAY_START)
+        last_end = _minutes(DAY_END)
+        while current + duration_minutes <= last_end:
+            if self.is_free(day, current, current + duration_minutes):
+                slots.append(f"{current // 60:02d}:{current % 60:02d}")
+            current += SLOT_STEP_MINUTES
+        return slots
+
+
+def resolve_duration(service_id):
+    """Duration in minutes for a Puja id, falling back to the default."""
+    if not service_id:
+        return DEFAULT_DURATION_MINUTES
+    from services.models import Puja
+    try:
+        duration = (
+            Puja.objects.filter(id=service_id)
+            .values_list('base_duration_minutes', flat=True)
+            .first()
+        )
+    except (TypeError, ValueError):
+        duration = None
+    return duration or DEFAULT_DURATION_MINUTES
+
+
+def get_free_slots(pandit, dates, duration_minutes=DEFAULT_DURATION_MINUTES):
+    """
+    Free slots for a pandit over several dates in one pass.
+
+    Returns a dict mapping each date to a list of "HH:MM" start times.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    index = AvailabilityIndex.build(pandit, dates[0], dates[-1])
+    return {day: index.free_slots(day, duration_minutes) for day in dates}
+
+
+def refresh_slot_bitmaps(pandit_id, dates):
+    """
+    Recompute PanditSlotBitmap rows for a pandit on the given dates.
+    Rows whose mask becomes empty are removed, so only busy days are stored.
+    """
+    dates = sorted(set(_as_date(d) for d in dates if d))
+    if not dates:
+        return
+    index = AvailabilityIndex.build(pandit_id, dates[0], dates[-1])
+    free_days = []
+    for day in dates:
+        mask = index.busy_mask(day)
+        if mask:
+            PanditSlotBitmap.objects.update_or_create(
+                pandit_id=pandit_id, date=day, defaults={'busy_mask': mask}
+            )
+        else:
+            free_days.append(day)
+    if free_days:
+        PanditSlotBitmap.objects.filter(pandit_id=pandit_id, date__in=free_days).delete()
+
+
+def free_pandits_at(queryset, day, start, duration_minutes):
+    """
+    Narrow a PanditUser queryset to pandits free on `day` from `start` for
+    `duration_minutes`. Runs as one query: pandits whose bitmap overlaps the
+    requested slots are excluded via a subquery.
+    """
+    start_minute = _minutes(start)
+    needed = interval_mask(start_minute, start_minute + duration_minutes)
+    conflicting = PanditSlotBitmap.objects.annotate(
+        overlap=F('busy_mask').bitand(needed)
+    ).filter(date=day, overlap__gt=0).values('pandit_id')
+    return queryset.exclude(id__in=conflicting)
@@ -0,0 +1,59 @@
+"""
+Management command to backfill PanditSlotBitmap rows from existing data.
+Run with: python manage.py rebuild_slot_bitmaps [--days 90]
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookings.availability import ACTIVE_BOOKING_STATUSES, refresh_slot_bitmaps
+from bookings.models import Booking, PanditSlotBitmap
+from pandits.models import PanditAvailability
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-pandit half-hour slot bitmaps for upcoming days"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='How many days ahead to rebuild (default 90)')
+
+    def handle(self, *args, **options):
+        today = timezone.localtime().date()
+        horizon = today + timedelta(days=options['days'])
+
+        dates_by_pandit = defaultdict(set)
+        booking_rows = Booking.objects.filter(
+            booking_date__gte=today,
+            booking_date__lte=horizon,
+            status__in=ACTIVE_BOOKING_STATUSES,
+        ).values_list('pandit_id', 'booking_date').distinct()
+        for pandit_id, day in booking_rows:
+            dates_by_pandit[pandit_id].add(day)
+
+        blocks = PanditAvailability.objects.filter(
+            end_time__gte=timezone.now(),
+        ).values_list('pandit_id', 'start_time', 'end_time')
+        for pandit_id, start_time, end_time in blocks:
+            day = max(timezone.localtime(start_time).date(), today)
+            last = min(timezone.localtime(end_time).date(), horizon)
+            while day <= last:
+                dates_by_pandit[pandit_id].add(day)
+                day += timedelta(days=1)
+
+        # Existing rows may be stale (e.g. bookings changed through queryset.update)
+        stored_rows = PanditSlotBitmap.objects.filter(
+            date__gte=today, date__lte=horizon
+        ).values_list('pandit_id', 'date')
+        for pandit_id, day in stored_rows:
+            dates_by_pandit[pandit_id].add(day)
+
+        total_days = 0
+        for pandit_id, dates in dates_by_pandit.items():
+            refresh_slot_bitmaps(pandit_id, dates)
+            total_days += len(dates)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt slot bitmaps: pandits={len(dates_by_pandit)}, days={total_days}"
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_booking_full_name_booking_phone_number_and_more'),
+        ('pandits', '0014_delete_pandit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PanditSlotBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('busy_mask', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pandit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_bitmaps', to='pandits.pandituser')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'pandit'], name='bookings_pa_date_880296_idx')],
+                'unique_together': {('pandit', 'date')},
+            },
+        ),
+    ]
@@ -131,6 +131,32 @@ class Booking(models.Model):
         return self.samagri_items.all()
 
 
+class PanditSlotBitmap(models.Model):
+    """
+    Materialized busy map for one pandit on one day.
+    Bit i of busy_mask is set when the half-hour slot starting at i*30 minutes
+    past midnight is taken by a booking or a manual availability block.
+    Days without a row are fully free.
+    """
+    pandit = models.ForeignKey(
+        'pandits.PanditUser',
+        on_delete=models.CASCADE,
+        related_name='slot_bitmaps'
+    )
+    date = models.DateField()
+    busy_mask = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('pandit', 'date')
+        indexes = [
+            models.Index(fields=['date', 'pandit']),
+        ]
+
+    def __str__(self):
+        return f"{self.pandit_id} @ {self.date}: {self.busy_mask:048b}"
+
+
 class BookingSamagriItem(models.Model):
     """
     Links samagri items to bookings with quantities and selections.
@@ -0,0 +1,93 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from adminpanel.rollups import refresh_rollups
+from pandits.dashboard import invalidate_dashboard
+from pandits.models import PanditAvailability
+from .models import Booking
+from .availability import refresh_slot_bitmaps
+
+# Fields that can change a booking's footprint in the slot bitmap
+SLOT_FIELDS = {'pandit', 'pandit_id', 'booking_date', 'booking_time', 'status', 'service', 'service_id'}
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule_refresh(pandit_id, dates):
+    def _refresh():
+        try:
+            refresh_slot_bitmaps(pandit_id, dates)
+        except Exception as e:
+            logger.error(f"Failed to refresh slot bitmap for pandit {pandit_id}: {e}")
+
+    transaction.on_commit(_refresh)
+
+
+def refresh_after_bulk_update(bookings):
+    """
+    What the Booking save signals do, once for bookings changed with a
+    queryset update(): slot bitmaps, pandit dashboards and booking rollups.
+    """
+    dates_by_pandit = defaultdict(set)
+    for booking in bookings:
+        dates_by_pandit[booking.pandit_id].add(booking.booking_date)
+    for pandit_id, dates in dates_by_pandit.items():
+        try:
+            refresh_slot_bitmaps(pandit_id, dates)
+        except Exception as e:
+            logger.error(f"Failed to refresh slot bitmap for pandit {pandit_id}: {e}")
+        invalidate_dashboard(pandit_id)
+    try:
+        refresh_rollups('bookings_scheduled', [b.booking_date for b in bookings])
+    except Exception as e:
+        logger.error(f"Failed to refresh booking rollups after a bulk update: {e}")
+
+
+def _block_dates(block):
+    """Local dates touched by an availability block."""
+    start = timezone.localtime(block.start_time).date()
+    end = timezone.localtime(block.end_time).date()
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_slot(sender, instance, update_fields=None, **kwargs):
+    """
+    Stash the stored (pandit_id, booking_date) as `instance._previous_slot`.
+    The admin rollups (adminpanel/signals.py) read it too, so a save costs one lookup.
+    """
+    instance._previous_slot = None
+    if not instance.pk:
+        return
+    if update_fields is not None and not SLOT_FIELDS.intersection(update_fields):
+        return
+    instance._previous_slot = (
+        Booking.objects.filter(pk=instance.pk).values_list('pandit_id', 'booking_date').first()
+    )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_booking_slots(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not SLOT_FIELDS.intersection(update_fields):
+        return
+    previous = getattr(instance, '_previous_slot', None)
+    if previous and previous != (instance.pandit_id, instance.booking_date):
+        _schedule_refresh(previous[0], [previous[1]])
+    _schedule_refresh(instance.pandit_id, [instance.booking_date])
+
+
+@receiver(post_delete, sender=Booking)
+def clear_booking_slots(sender, instance, **kwargs):
+    _schedule_refresh(instance.pandit_id, [instance.booking_date])
+
+
+@receiver(post_save, sender=PanditAvailability)
+@receiver(post_delete, sender=PanditAvailability)
+def refresh_block_slots(sender, instance, **kwargs):
+    _schedule_refresh(instance.pandit_id, _block_dates(instance))
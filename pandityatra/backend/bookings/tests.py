@@ -1,3 +1,155 @@
+from datetime import date, datetime, time
+from unittest.mock import patch
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+
+from pandits.models import PanditUser, PanditAvailability
+from services.models import Puja
+from .models import Booking, BookingStatus, PanditSlotBitmap
+from .availability import AvailabilityIndex, get_free_slots, interval_mask
+
+User = get_user_model()
+
+
+class AvailabilityEngineTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(
+            username='slotcust', email='slotcust@t.com', password='p', role='user'
+        )
+        self.pandit = PanditUser.objects.create_user(
+            username='slotpandit', email='slotpandit@t.com', password='p', role='pandit',
+            expertise="Ganesh Puja", verification_status="APPROVED", is_verified=True
+        )
+        self.puja = Puja.objects.create(name='Ganesh Puja', description='d', base_duration_minutes=90)
+        self.day = date(2030, 1, 7)
+        self.client.force_authenticate(user=self.customer)
+
+    def _book(self, day, at, status_value=BookingStatus.ACCEPTED):
+        return Booking.objects.create(
+            user=self.customer, pandit=self.pandit, service=self.puja,
+            service_name=self.puja.name, booking_date=day, booking_time=at,
+            status=status_value
+        )
+
+    def test_merge_and_lookup(self):
+        index = AvailabilityIndex({self.day: [(600, 660), (630, 700), (800, 830)]})
+        self.assertEqual(index.busy_intervals(self.day), [(600, 700), (800, 830)])
+        self.assertFalse(index.is_free(self.day, 650, 710))
+        self.assertTrue(index.is_free(self.day, 700, 800))
+        self.assertTrue(index.is_free(self.day + timezone.timedelta(days=1), 600, 700))
+
+    def test_bookings_and_blocks_remove_slots(self):
+        self._book(self.day, time(10, 0))
+        self._book(self.day, time(15, 0), status_value=BookingStatus.CANCELLED)
+        PanditAvailability.objects.create(
+            pandit=self.pandit,
+            start_time=timezone.make_aware(datetime.combine(self.day, time(17, 0))),
+            end_time=timezone.make_aware(datetime.combine(self.day, time(18, 0))),
+        )
+
+        slots = get_free_slots(self.pandit, [self.day], 60)[self.day]
+
+        # 10:00-11:30 booked, so 09:30 (ends 10:30) through 11:00 are taken
+        for taken in ("09:30", "10:00", "10:30", "11:00", "16:30", "17:00", "17:30"):
+            self.assertNotIn(taken, slots)
+        for free in ("08:00", "09:00", "11:30", "15:00", "18:00", "19:00"):
+            self.assertIn(free, slots)
+        self.assertNotIn("19:30", slots)
+
+    def test_available_slots_endpoint(self):
+        self._book(self.day, time(8, 0))
+        response = self.client.get("/api/bookings/available_slots/", {
+            "pandit_id": self.pandit.id, "date": self.day.isoformat(), "service_id": self.puja.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["available_slots"][0], "09:30")
+
+    def test_available_slots_range_endpoint(self):
+        next_day = date(2030, 1, 8)
+        self._book(next_day, time(8, 0))
+        response = self.client.get("/api/bookings/available_slots_range/", {
+            "pandit_id": self.pandit.id,
+            "start_date": self.day.isoformat(),
+            "end_date": next_day.isoformat(),
+            "service_id": self.puja.id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["duration_minutes"], 90)
+        slots = response.data["available_slots"]
+        self.assertEqual(list(slots.keys()), [self.day.isoformat(), next_day.isoformat()])
+        self.assertEqual(slots[self.day.isoformat()][0], "08:00")
+        self.assertEqual(slots[next_day.isoformat()][0], "09:30")
+
+    def test_available_slots_range_rejects_long_range(self):
+        response = self.client.get("/api/bookings/available_slots_range/", {
+            "pandit_id": self.pandit.id, "start_date": "2030-01-01", "end_date": "2030-03-01"
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlotBitmapTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username='bitcust', email='bitcust@t.com', password='p', role='user'
+        )
+        self.pandit = PanditUser.objects.create_user(
+            username='bitpandit', email='bitpandit@t.com', password='p', role='pandit',
+            expertise="Vivah", language="Nepali", verification_status="APPROVED", is_verified=True
+        )
+        self.day = date(2030, 2, 2)
+
+    def test_interval_mask(self):
+        self.assertEqual(interval_mask(600, 660), 0b11 << 20)
+        self.assertEqual(interval_mask(615, 675), 0b111 << 20)
+        self.assertEqual(interval_mask(600, 600), 0)
+
+    def test_bitmap_follows_booking_lifecycle(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.customer, pandit=self.pandit, service_name='Puja',
+                booking_date=self.day, booking_time=time(10, 0), status=BookingStatus.PENDING
+            )
+        row = PanditSlotBitmap.objects.get(pandit=self.pandit, date=self.day)
+        self.assertEqual(row.busy_mask, 0b11 << 20)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.booking_date = date(2030, 2, 3)
+            booking.save()
+        self.assertFalse(PanditSlotBitmap.objects.filter(pandit=self.pandit, date=self.day).exists())
+        self.assertTrue(PanditSlotBitmap.objects.filter(pandit=self.pandit, date=date(2030, 2, 3)).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = BookingStatus.CANCELLED
+            booking.save(update_fields=['status'])
+        self.assertFalse(PanditSlotBitmap.objects.filter(pandit=self.pandit).exists())
+
+    def test_admin_cancel_action_frees_the_slot(self):
+        from django.contrib.admin.sites import site
+        from .admin import BookingAdmin
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.customer, pandit=self.pandit, service_name='Puja',
+                booking_date=self.day, booking_time=time(10, 0), status=BookingStatus.ACCEPTED
+            )
+        self.assertTrue(PanditSlotBitmap.objects.filter(pandit=self.pandit, date=self.day).exists())
+
+        model_admin = BookingAdmin(Booking, site)
+        with self.captureOnCommitCallbacks(execute=True), patch.object(model_admin, 'message_user'):
+            model_admin.cancel_booking(None, Booking.objects.filter(pandit=self.pandit))
+        self.assertFalse(PanditSlotBitmap.objects.filter(pandit=self.pandit).exists())
 
-# Create your tests here.
+    def test_bitmap_includes_availability_blocks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            PanditAvailability.objects.create(
+                pandit=self.pandit,
+                start_time=timezone.make_aware(datetime.combine(self.day, time(9, 0))),
+                end_time=timezone.make_aware(datetime.combine(self.day, time(9, 30))),
+            )
+        row = PanditSlotBitmap.objects.get(pandit=self.pandit, date=self.day)
+        self.assertEqual(row.busy_mask, 1 << 18)
@@ -15,6 +15,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
 
 from .models import Booking, BookingStatus
+from .availability import MAX_RANGE_DAYS, get_free_slots, resolve_duration
 
 from .serializers import (
     BookingCreateSerializer,
@@ -325,7 +326,6 @@ class BookingViewSet(viewsets.ModelViewSet):
     # ---------------------------
     @action(detail=False, methods=["get"])
     def available_slots(self, request):
-        from datetime import datetime, timedelta, time
         pandit_id = request.query_params.get("pandit_id")
         booking_date = request.query_params.get("date")
         service_id = request.query_params.get("service_id")
@@ -339,74 +339,61 @@ class BookingViewSet(viewsets.ModelViewSet):
         except PanditUser.DoesNotExist:
             return Response({"detail": "Pandit not found or not verified"}, status=404)
 
-        # Get requested service duration from Puja model
-        duration_minutes = 60 # Default
-        if service_id:
-            from services.models import Puja
-            try:
-                puja = Puja.objects.get(id=service_id)
-                duration_minutes = getattr(puja, 'base_duration_minutes', 60)
-            except Puja.DoesNotExist:
-                pass  # fallback to default
-
         # Parse booking_date
         try:
             booking_date_obj = datetime.strptime(booking_date, "%Y-%m-%d").date()
         except Exception:
             return Response({"detail": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-        # Fetch existing bookings with their services
-        existing_bookings = Booking.objects.filter(
-            pandit=pandit,
-            booking_date=booking_date_obj,
-            status__in=[BookingStatus.PENDING, BookingStatus.ACCEPTED]
-        ).select_related('service')
-
-        # Build list of busy intervals [(start, end)]
-        busy_intervals = []
-        for b in existing_bookings:
-            start_time = datetime.combine(booking_date_obj, b.booking_time)
-            # Use booking's service duration or default
-            b_duration = getattr(b.service, 'base_duration_minutes', 60) if b.service else 60
-            end_time = start_time + timedelta(minutes=b_duration)
-            busy_intervals.append((start_time, end_time))
-
-        # 🚨 ADDED: Fetch manual unavailability blocks
-        from pandits.models import PanditAvailability
-        manual_blocks = PanditAvailability.objects.filter(
-            pandit=pandit,
-            start_time__date=booking_date_obj
-        )
-        for block in manual_blocks:
-            # Convert to naive datetime if needed, or ensure tz awareness match
-            # For simplicity in this context, assuming localized or naive match
-            start = timezone.localtime(block.start_time).replace(tzinfo=None) # if using naive logic below
-            end = timezone.localtime(block.end_time).replace(tzinfo=None)
-            busy_intervals.append((start, end))
+        duration_minutes = resolve_duration(service_id)
+        slots = get_free_slots(pandit, [booking_date_obj], duration_minutes)
+
+        return Response({"available_slots": slots[booking_date_obj]})
+
+    # ---------------------------
+    # AVAILABLE SLOTS (DATE RANGE)
+    # ---------------------------
+    @action(detail=False, methods=["get"], url_path="available_slots_range")
+    def available_slots_range(self, request):
+        """
+        GET /api/bookings/available_slots_range/?pandit_id=&start_date=&end_date=&service_id=
+        Free slots for every day in the range, answered from one availability index.
+        """
+        pandit_id = request.query_params.get("pandit_id")
+        start_date = request.query_params.get("start_date")
+        end_date = request.query_params.get("end_date") or start_date
+        service_id = request.query_params.get("service_id")
 
-        slots = []
+        if not pandit_id or not start_date:
+            return Response({"detail": "pandit_id and start_date required"}, status=400)
 
-        # Helper to check overlap
-        def is_overlapping(candidate_start, candidate_end, intervals):
-            for start, end in intervals:
-                if candidate_start < end and candidate_end > start:
-                    return True
-            return False
+        try:
+            start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except Exception:
+            return Response({"detail": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-        # Generate slots every 30 mins
-        current_time = datetime.combine(booking_date_obj, time(8, 0)) # Start at 8 AM
-        end_of_day = datetime.combine(booking_date_obj, time(20, 0)) # End at 8 PM
+        if end_date_obj < start_date_obj:
+            return Response({"detail": "end_date must be on or after start_date"}, status=400)
 
-        while current_time + timedelta(minutes=duration_minutes) <= end_of_day:
-            candidate_start = current_time
-            candidate_end = current_time + timedelta(minutes=duration_minutes)
+        num_days = (end_date_obj - start_date_obj).days + 1
+        if num_days > MAX_RANGE_DAYS:
+            return Response({"detail": f"Date range cannot exceed {MAX_RANGE_DAYS} days"}, status=400)
 
-            if not is_overlapping(candidate_start, candidate_end, busy_intervals):
-                slots.append(candidate_start.time().strftime("%H:%M"))
+        try:
+            pandit = PanditUser.objects.get(id=pandit_id, is_verified=True)
+        except PanditUser.DoesNotExist:
+            return Response({"detail": "Pandit not found or not verified"}, status=404)
 
-            current_time += timedelta(minutes=30)
+        duration_minutes = resolve_duration(service_id)
+        dates = [start_date_obj + timedelta(days=i) for i in range(num_days)]
+        slots = get_free_slots(pandit, dates, duration_minutes)
 
-        return Response({"available_slots": slots})
+        return Response({
+            "pandit_id": pandit.id,
+            "duration_minutes": duration_minutes,
+            "available_slots": {day.isoformat(): day_slots for day, day_slots in slots.items()},
+        })
 
     @action(detail=True, methods=["get"], url_path="invoice")
     def invoice(self, request, pk=None):
@@ -5,13 +5,17 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import ChatRoom, Message, ChatMessage
 from django.utils import timezone
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from notifications.services import notify_new_message
+from . import quota, unread, writer
+from .pagination import clamp_limit, keyset_page
+from .presence import PresenceMixin
 
 logger = logging.getLogger(__name__)
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(PresenceMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time chat between customer and pandit
     """
@@ -27,9 +31,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.close()
                 return
 
-            # Verify access
-            access_granted = await self.verify_room_access()
-            if not access_granted:
+            # Verify access; the room is kept for the lifetime of the socket
+            self.room = await self.load_room()
+            if self.room is None:
                 logger.warning(f"Chat WS REJECT: Access denied for User {self.user.id} to Room {self.room_id}")
                 await self.close()
                 return
@@ -41,12 +45,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
             
             await self.accept()
+
+            self.presence_group = self.room_group_name
+            self.presence_peers = unread.participants(self.room) - {self.user.id}
+            _, online = await self.presence_join()
             
             # Send recent messages on connect
-            messages = await self.get_recent_messages()
+            messages, next_cursor = await self.get_recent_messages()
             await self.send(text_data=json.dumps({
                 'type': 'message_history',
-                'messages': messages
+                'messages': messages,
+                'next_cursor': next_cursor,
+                'online': online
             }))
         except Exception as e:
             logger.error(f"CRITICAL ERROR in Chat WS Connect: {str(e)}")
@@ -54,6 +64,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
     
     async def disconnect(self, close_code):
+        if hasattr(self, 'presence_group'):
+            await self.presence_leave()
+
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -66,9 +79,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except json.JSONDecodeError:
             return
 
+        # Older history on demand: {"type": "load_before", "cursor": ..., "limit": ...}
+        if data.get('type') == 'load_before':
+            await self.send_history_page(data)
+            return
+
+        # Presence keepalive and typing indicator, never stored
+        if data.get('type') == 'heartbeat':
+            await self.presence_heartbeat()
+            return
+        if data.get('type') == 'typing':
+            await self.presence_typing(data.get('is_typing', True))
+            return
+
         message_type = data.get('type', 'TEXT')
         content = data.get('content', '')
         content_ne = data.get('content_ne', None)
+        client_id = writer.client_id_from(data)
         
         # Check pre-booking limits
         is_allowed, reason = await self.check_pre_booking_limit()
@@ -79,8 +106,28 @@ class ChatConsumer(AsyncWebsocketConsumer):
             }))
             return
 
-        # Save message to database
-        message = await self.save_message(content, content_ne, message_type)
+        if writer.deliver_first():
+            # Broadcast now; the writer stores it and sends messages_persisted
+            message = Message(
+                chat_room=self.room,
+                sender=self.user,
+                content=content,
+                content_ne=content_ne,
+                message_type=message_type,
+                client_id=client_id,
+                timestamp=timezone.now()
+            )
+        else:
+            # Save message to database
+            message, created = await self.save_message(content, content_ne, message_type, client_id)
+            if not created:
+                # A resend after reconnect: the room already has it, just confirm
+                await self.messages_persisted({'messages': [{
+                    'client_id': message.client_id,
+                    'id': message.id,
+                    'timestamp': message.timestamp.isoformat()
+                }]})
+                return
         
         # Send message to room group
         await self.channel_layer.group_send(
@@ -89,6 +136,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'type': 'chat_message',
                 'message': {
                     'id': message.id,
+                    'client_id': message.client_id,
                     'sender': message.sender.username,
                     'sender_id': message.sender.id,
                     'content': message.content,
@@ -99,34 +147,81 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 }
             }
         )
+
+        if message.id is None:
+            await self.queue_message(message)
+        else:
+            # Notify after the broadcast so it never delays delivery to the room
+            await self.notify_recipient(message)
     
     async def chat_message(self, event):
         """Receive message from room group and send to WebSocket"""
         await self.send(text_data=json.dumps(event['message']))
+
+    async def messages_persisted(self, event):
+        """Ids of deliver-first messages once the writer has stored them"""
+        await self.send(text_data=json.dumps({
+            'type': 'messages_persisted',
+            'messages': event['messages']
+        }))
+
+    async def send_history_page(self, data):
+        try:
+            messages, next_cursor = await self.get_recent_messages(
+                cursor=data.get('cursor'), limit=clamp_limit(data.get('limit'))
+            )
+        except ValueError:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Invalid cursor'
+            }))
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'message_history_page',
+            'messages': messages,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }))
     
     @database_sync_to_async
-    def save_message(self, content, content_ne, message_type):
-        """Save message to database"""
-        chat_room = ChatRoom.objects.get(id=self.room_id)
-        message = Message.objects.create(
-            chat_room=chat_room,
-            sender=self.user,
-            content=content,
-            content_ne=content_ne,
-            message_type=message_type
-        )
+    def save_message(self, content, content_ne, message_type, client_id):
+        """Save message to database; (message, created), a resent client_id is not stored again"""
+        try:
+            with transaction.atomic():
+                return Message.objects.create(
+                    chat_room=self.room,
+                    sender=self.user,
+                    content=content,
+                    content_ne=content_ne,
+                    message_type=message_type,
+                    client_id=client_id
+                ), True
+        except IntegrityError:
+            return Message.objects.get(chat_room=self.room, sender=self.user, client_id=client_id), False
+
+    @database_sync_to_async
+    def queue_message(self, message):
+        quota.record(message)
+        writer.submit(self.room_group_name, message)
+
+    @database_sync_to_async
+    def notify_recipient(self, message):
         # 🔔 Send notification to recipient
         notify_new_message(message)
-        return message
     
     @database_sync_to_async
-    def get_recent_messages(self):
-        """Get recent messages for the chat room"""
+    def get_recent_messages(self, cursor=None, limit=50):
+        """
+        A page of messages for the chat room (the latest when no cursor) and
+        the cursor for the page before it. Raises ValueError on a bad cursor.
+        """
         try:
             # OPTIMIZATION: select_related('sender') prevents N+1 crashes in WS context
-            messages = Message.objects.filter(
-                chat_room_id=self.room_id
-            ).select_related('sender').order_by('-timestamp')[:50]
+            messages, next_cursor = keyset_page(
+                Message.objects.filter(chat_room_id=self.room_id).select_related('sender'),
+                cursor=cursor,
+                limit=limit,
+            )
             
             return [{
                 'id': msg.id,
@@ -137,53 +232,35 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'message_type': msg.message_type,
                 'timestamp': msg.timestamp.isoformat() if msg.timestamp else timezone.now().isoformat(),
                 'is_read': msg.is_read
-            } for msg in reversed(messages)]
+            } for msg in messages], next_cursor
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"ERROR in get_recent_messages: {str(e)}")
-            return []
+            return [], None
 
     @database_sync_to_async
-    def verify_room_access(self):
-        """Verify user has access to this chat room"""
-        try:
-            room = ChatRoom.objects.get(id=self.room_id)
-            is_customer = room.customer_id == self.user.id
-            is_pandit = bool(room.pandit_id == self.user.id)
-            is_vendor = bool(room.vendor_id == self.user.id)
-            return is_customer or is_pandit or is_vendor
-        except ChatRoom.DoesNotExist:
-            return False
+    def load_room(self):
+        """
+        The chat room with its participants and booking, or None when it does
+        not exist or the user is not part of it. Also warms the sender's
+        pre-booking quota.
+        """
+        room = ChatRoom.objects.select_related(
+            'customer', 'pandit', 'vendor', 'booking'
+        ).filter(id=self.room_id).first()
+        if room is None or self.user.id not in unread.participants(room):
+            return None
+        quota.load(room, self.user)
+        return room
 
     @database_sync_to_async
     def check_pre_booking_limit(self):
         """Check if user has exceeded pre-booking message limit (10 msgs per 24h)"""
-        try:
-            chat_room = ChatRoom.objects.get(id=self.room_id)
-            if not chat_room.is_pre_booking:
-                return True, None
-                
-            # Only customers are limited, pandits can reply
-            from users.models import User
-            if self.user.role != 'user':
-                return True, None
-
-            # Limit to 10 messages per 24 hours
-            time_limit = timezone.now() - timezone.timedelta(hours=24)
-            msg_count = Message.objects.filter(
-                chat_room=chat_room,
-                sender=self.user,
-                timestamp__gte=time_limit
-            ).count()
-            
-            if msg_count >= 10:
-                return False, "Pre-booking message limit reached (10 msgs/day). Book a puja for unlimited chat!"
-            
-            return True, None
-        except ChatRoom.DoesNotExist:
-            return False, "Room not found"
+        return quota.check(self.room, self.user)
 
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(PresenceMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time notifications
     """
@@ -199,8 +276,28 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+
+        if self.user.is_authenticated:
+            # App-wide presence: the user has the app open
+            self.presence_group = self.room_group_name
+            await self.presence_join()
+            await self.send(text_data=json.dumps({
+                'type': 'unread_count',
+                'unread_count': await database_sync_to_async(unread.total_for)(self.user.id)
+            }))
     
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+        if data.get('type') == 'heartbeat' and hasattr(self, 'presence_group'):
+            await self.presence_heartbeat()
+
     async def disconnect(self, close_code):
+        if hasattr(self, 'presence_group'):
+            await self.presence_leave()
+
         # Leave notification group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -211,7 +308,16 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         """Send notification to WebSocket"""
         await self.send(text_data=json.dumps(event['notification']))
 
-class PujaConsumer(AsyncWebsocketConsumer):
+    async def unread_count(self, event):
+        """Send updated chat unread counters to WebSocket"""
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_count': event['unread_count'],
+            'room_id': event.get('room_id'),
+            'room_unread': event.get('room_unread'),
+        }))
+
+class PujaConsumer(PresenceMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time chat during puja (interaction mode).
     Endpoint: /ws/puja/<booking_id>/
@@ -242,12 +348,17 @@ class PujaConsumer(AsyncWebsocketConsumer):
             )
             
             await self.accept()
+
+            self.presence_group = self.room_group_name
+            _, online = await self.presence_join()
             
             # Send recent messages on connect
-            messages = await self.get_recent_messages()
+            messages, next_cursor = await self.get_recent_messages()
             await self.send(text_data=json.dumps({
                 'type': 'message_history',
                 'messages': messages,
+                'next_cursor': next_cursor,
+                'online': online,
                 'mode': 'interaction'
             }))
             
@@ -266,6 +377,9 @@ class PujaConsumer(AsyncWebsocketConsumer):
             await self.close()
     
     async def disconnect(self, close_code):
+        if hasattr(self, 'presence_group'):
+            await self.presence_leave()
+
         # Send leave notification
         await self.channel_layer.group_send(
             self.room_group_name,
@@ -286,9 +400,24 @@ class PujaConsumer(AsyncWebsocketConsumer):
         """Receive message from WebSocket and broadcast to group"""
         try:
             data = json.loads(text_data)
+
+            # Older history on demand: {"type": "load_before", "cursor": ..., "limit": ...}
+            if data.get('type') == 'load_before':
+                await self.send_history_page(data)
+                return
+
+            # Presence keepalive and typing indicator, never stored
+            if data.get('type') == 'heartbeat':
+                await self.presence_heartbeat()
+                return
+            if data.get('type') == 'typing':
+                await self.presence_typing(data.get('is_typing', True))
+                return
+
             content = data.get('content', '').strip()
             content_ne = data.get('content_ne', None)  # Nepali translation
             message_type = data.get('message_type', 'TEXT')
+            client_id = writer.client_id_from(data)
             
             if not content:
                 await self.send(text_data=json.dumps({
@@ -296,8 +425,17 @@ class PujaConsumer(AsyncWebsocketConsumer):
                 }))
                 return
             
-            # Save message to database
-            message = await self.save_message(content, content_ne, message_type)
+            message = self.build_message(content, content_ne, client_id)
+            if not writer.deliver_first():
+                # Save message to database
+                message, created = await self.save_message(message)
+                if not created:
+                    await self.messages_persisted({'messages': [{
+                        'client_id': message.client_id,
+                        'id': message.id,
+                        'timestamp': message.timestamp.isoformat()
+                    }]})
+                    return
             
             # Broadcast to puja room group
             await self.channel_layer.group_send(
@@ -306,15 +444,20 @@ class PujaConsumer(AsyncWebsocketConsumer):
                     'type': 'puja_message',
                     'message': {
                         'id': message.id,
+                        'client_id': message.client_id,
                         'sender': self.user.username,
                         'sender_id': self.user.id,
                         'content': message.content,
                         'content_ne': message.content_ne,
-                        'message_type': message.message_type,
+                        'message_type': message_type,
                         'timestamp': message.timestamp.isoformat(),
                     }
                 }
             )
+
+            if message.id is None:
+                # Deliver-first: the writer stores it and sends messages_persisted
+                writer.submit(self.room_group_name, message)
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({
                 'error': 'Invalid JSON format'
@@ -324,12 +467,37 @@ class PujaConsumer(AsyncWebsocketConsumer):
                 'error': f'Error processing message: {str(e)}'
             }))
     
+    async def send_history_page(self, data):
+        try:
+            messages, next_cursor = await self.get_recent_messages(
+                cursor=data.get('cursor'), limit=clamp_limit(data.get('limit'))
+            )
+        except ValueError:
+            await self.send(text_data=json.dumps({
+                'error': 'Invalid cursor'
+            }))
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'message_history_page',
+            'messages': messages,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'mode': 'interaction'
+        }))
+
     async def puja_message(self, event):
         """Receive message from room group and send to WebSocket"""
         await self.send(text_data=json.dumps({
             'type': 'message',
             'data': event['message']
         }))
+
+    async def messages_persisted(self, event):
+        """Ids of deliver-first messages once the writer has stored them"""
+        await self.send(text_data=json.dumps({
+            'type': 'messages_persisted',
+            'messages': event['messages']
+        }))
     
     async def user_join(self, event):
         """Send join notification to WebSocket"""
@@ -354,34 +522,49 @@ class PujaConsumer(AsyncWebsocketConsumer):
         try:
             booking = Booking.objects.get(id=self.booking_id)
             # Check if user is customer or pandit for this booking
-            is_customer = booking.customer_id == self.user.id
+            self.is_customer = booking.user_id == self.user.id
             is_pandit = booking.pandit_id == self.user.id
-            return is_customer or is_pandit
+            self.presence_peers = {booking.user_id, booking.pandit_id} - {self.user.id, None}
+            return self.is_customer or is_pandit
         except Booking.DoesNotExist:
             return False
     
-    @database_sync_to_async
-    def save_message(self, content, content_ne, message_type):
-        """Save message to ChatMessage model"""
-        message = ChatMessage.objects.create(
+    def build_message(self, content, content_ne, client_id):
+        return ChatMessage(
             user=self.user,
             mode='interaction',
-            sender='user' if self.user.is_customer else 'pandit',  # Simplified - should check actual role
+            sender='user' if self.is_customer else 'pandit',
             content=content,
             content_ne=content_ne,
-            booking_id=self.booking_id,
+            booking_id=int(self.booking_id),
+            client_id=client_id,
             timestamp=timezone.now()
         )
-        return message
+
+    @database_sync_to_async
+    def save_message(self, message):
+        """Save message to ChatMessage model; (message, created), a resent client_id is not stored again"""
+        try:
+            with transaction.atomic():
+                message.save()
+            return message, True
+        except IntegrityError:
+            return ChatMessage.objects.get(
+                booking_id=message.booking_id, user=self.user, client_id=message.client_id
+            ), False
     
     @database_sync_to_async
-    def get_recent_messages(self):
-        """Get recent messages for this puja"""
+    def get_recent_messages(self, cursor=None, limit=50):
+        """
+        A page of messages for this puja (the latest when no cursor) and the
+        cursor for the page before it. Raises ValueError on a bad cursor.
+        """
         try:
-            messages = ChatMessage.objects.filter(
-                booking_id=self.booking_id,
-                mode='interaction'
-            ).select_related('user').order_by('-timestamp')[:50]
+            messages, next_cursor = keyset_page(
+                ChatMessage.objects.filter(booking_id=self.booking_id, mode='interaction'),
+                cursor=cursor,
+                limit=limit,
+            )
             
             return [{
                 'id': msg.id,
@@ -391,7 +574,9 @@ class PujaConsumer(AsyncWebsocketConsumer):
                 'content_ne': msg.content_ne,
                 'message_type': 'TEXT',
                 'timestamp': msg.timestamp.isoformat() if msg.timestamp else timezone.now().isoformat(),
-            } for msg in reversed(messages)]
+            } for msg in messages], next_cursor
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"ERROR in Puja get_recent_messages: {str(e)}")
-            return []
\ No newline at end of file
+            return [], None
\ No newline at end of file
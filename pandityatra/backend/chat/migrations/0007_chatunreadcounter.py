@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    Message = apps.get_model('chat', 'Message')
+    ChatUnreadCounter = apps.get_model('chat', 'ChatUnreadCounter')
+
+    rooms = {room.id: room for room in ChatRoom.objects.filter(messages__is_read=False).distinct()}
+    counts = {}
+    unread = Message.objects.filter(is_read=False).values('chat_room_id', 'sender_id').annotate(n=Count('id')).order_by()
+    for entry in unread:
+        room = rooms[entry['chat_room_id']]
+        for user_id in {room.customer_id, room.pandit_id, room.vendor_id} - {None, entry['sender_id']}:
+            counts[(user_id, room.id)] = counts.get((user_id, room.id), 0) + entry['n']
+    ChatUnreadCounter.objects.bulk_create(
+        [ChatUnreadCounter(user_id=u, room_id=r, count=n) for (u, r), n in counts.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_alter_chatmessage_pandit_alter_chatroom_pandit_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='chat.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'room')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -88,6 +88,8 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(blank=True, null=True)
+    # Id chosen by the sending client, so resends after a reconnect are not stored twice
+    client_id = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         ordering = ['timestamp']
@@ -95,6 +97,13 @@ class Message(models.Model):
             models.Index(fields=['chat_room', 'timestamp']),
             models.Index(fields=['sender', 'timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chat_room', 'sender', 'client_id'],
+                condition=~models.Q(client_id=''),
+                name='unique_message_client_id',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
@@ -150,6 +159,7 @@ class ChatMessage(models.Model):
     
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    client_id = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         ordering = ['timestamp']
@@ -157,6 +167,37 @@ class ChatMessage(models.Model):
             models.Index(fields=['mode', 'user', 'timestamp']),
             models.Index(fields=['booking', 'timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['booking', 'user', 'client_id'],
+                condition=~models.Q(client_id=''),
+                name='unique_chatmessage_client_id',
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.sender} ({self.mode}): {self.content[:50]}"
\ No newline at end of file
+        return f"{self.sender} ({self.mode}): {self.content[:50]}"
+
+class ChatUnreadCounter(models.Model):
+    """
+    A user's unread message count in one room, kept up to date with F()
+    updates by chat/unread.py.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_unread_counters'
+    )
+    room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='unread_counters'
+    )
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'room')
+
+    def __str__(self):
+        return f"{self.user_id} @ room {self.room_id}: {self.count}"
@@ -0,0 +1,104 @@
+"""
+Chat History Pagination - Keyset (timestamp, id) paging over chat messages.
+
+Pages walk backwards from the newest message. A cursor encodes the
+(timestamp, id) of the oldest message already sent, so fetching the next
+older page is an indexed range scan no matter how deep into the history the
+client is, and messages arriving meanwhile never shift the pages.
+
+Used by MessageListView (REST) and by the `load_before` command of
+ChatConsumer and PujaConsumer (WebSocket).
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(message):
+    raw = f"{message.timestamp.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, message_id = raw.rsplit('|', 1)
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError
+        return parsed, int(message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def clamp_limit(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    The `limit` messages just older than `cursor` (the newest when None),
+    oldest first, plus the cursor for the page before them (None at the start).
+    """
+    queryset = queryset.order_by('-timestamp', '-id')
+    if cursor:
+        timestamp, message_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more else None
+    rows.reverse()
+    return rows, next_cursor
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Opt-in: applies when the request has `limit` or `cursor`, so clients that
+    still expect the whole room as a plain list keep working.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.limit_query_param not in params:
+            return None
+        self.request = request
+        try:
+            page, self.next_cursor = keyset_page(
+                queryset,
+                cursor=params.get(self.cursor_query_param),
+                limit=clamp_limit(params.get(self.limit_query_param)),
+            )
+        except ValueError:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
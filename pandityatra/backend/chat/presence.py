@@ -0,0 +1,139 @@
+"""
+Presence - Who is online in a chat, puja or video room, kept in the cache.
+
+A connected socket marks its user online in its room (the channel layer
+group it broadcasts on) and app-wide, with keys that expire after
+PRESENCE_TTL_SECONDS. Client heartbeats refresh them, so a socket that
+vanishes without a clean disconnect drops out on its own. The cache is Redis
+in production and local memory in development, and nothing here touches the
+database.
+
+Going online or offline in a room, and typing, are sent to the room group as
+"presence_update" events. Online/offline changes also go to the other room
+participants' notification sockets, so e.g. the pandit dashboard learns that
+a customer came online without polling.
+"""
+import json
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _ttl():
+    return int(getattr(settings, 'PRESENCE_TTL_SECONDS', 60))
+
+
+def _room_key(group_name, user_id):
+    return f"presence:{group_name}:{user_id}"
+
+
+def _user_key(user_id):
+    return f"presence_user:{user_id}"
+
+
+def touch(group_name, user_id, channel_name):
+    """
+    Mark a user online in a room (and app-wide) for another TTL.
+    Returns True when they were not online in the room before.
+    """
+    ttl = _ttl()
+    cache.set(_user_key(user_id), True, timeout=ttl)
+    key = _room_key(group_name, user_id)
+    if cache.add(key, channel_name, timeout=ttl):
+        return True
+    # The most recent socket owns the key, see leave()
+    cache.set(key, channel_name, timeout=ttl)
+    return False
+
+
+def leave(group_name, user_id, channel_name):
+    """
+    Mark a user offline in a room. A socket that no longer owns the key (the
+    user has a newer connection to the room) changes nothing. Returns True
+    when the user went offline.
+    """
+    key = _room_key(group_name, user_id)
+    if cache.get(key) != channel_name:
+        return False
+    cache.delete(key)
+    return True
+
+
+def online_in(group_name, user_ids):
+    """The subset of `user_ids` online in a room."""
+    user_ids = [uid for uid in user_ids if uid]
+    found = cache.get_many([_room_key(group_name, uid) for uid in user_ids])
+    return {uid for uid in user_ids if _room_key(group_name, uid) in found}
+
+
+def online_users(user_ids):
+    """The subset of `user_ids` with any live socket."""
+    user_ids = [uid for uid in user_ids if uid]
+    found = cache.get_many([_user_key(uid) for uid in user_ids])
+    return {uid for uid in user_ids if _user_key(uid) in found}
+
+
+class PresenceMixin:
+    """
+    Presence for an AsyncWebsocketConsumer. Set `presence_group` to the group
+    the consumer broadcasts on and `presence_peers` to the other users of the
+    room before calling presence_join().
+    """
+    presence_peers = ()
+
+    async def presence_join(self, on_join=None):
+        """
+        Mark the user online and return (joined, online): whether they were
+        not online in the room before, and the sorted ids of the room's users
+        online now, for the consumer's connect payload. `on_join` is called
+        (synchronously, so it may use the ORM) before the others hear of it.
+        """
+        def join():
+            joined = touch(self.presence_group, self.user.id, self.channel_name)
+            if joined and on_join:
+                on_join()
+            return joined, sorted(online_in(self.presence_group, [self.user.id, *self.presence_peers]))
+
+        joined, online = await database_sync_to_async(join)()
+        if joined:
+            await self._announce_presence('online')
+        return joined, online
+
+    async def presence_heartbeat(self, on_join=None):
+        def beat():
+            joined = touch(self.presence_group, self.user.id, self.channel_name)
+            if joined and on_join:
+                on_join()
+            return joined
+
+        if await database_sync_to_async(beat)():
+            # Back after the key expired or another tab of the user left
+            await self._announce_presence('online')
+
+    async def presence_leave(self):
+        """Returns True when the user went offline in the room."""
+        left = await database_sync_to_async(leave)(self.presence_group, self.user.id, self.channel_name)
+        if left:
+            await self._announce_presence('offline')
+        return left
+
+    async def presence_typing(self, is_typing):
+        await self.channel_layer.group_send(self.presence_group, {
+            'type': 'presence_update',
+            'event': {'type': 'typing', 'user_id': self.user.id, 'is_typing': bool(is_typing)}
+        })
+
+    async def presence_update(self, event):
+        # Clients know their own state; only relay other users
+        if event['event']['user_id'] != self.user.id:
+            await self.send(text_data=json.dumps(event['event']))
+
+    async def _announce_presence(self, status):
+        event = {'type': 'presence', 'user_id': self.user.id, 'status': status}
+        await self.channel_layer.group_send(self.presence_group, {'type': 'presence_update', 'event': event})
+        for user_id in self.presence_peers:
+            await self.channel_layer.group_send(f'notifications_{user_id}', {
+                'type': 'presence_update',
+                'event': {**event, 'room': self.presence_group}
+            })
@@ -0,0 +1,76 @@
+"""
+Pre-booking Chat Quota - Sliding 24h message limit for customers in pre-booking rooms.
+
+Customers may send PRE_BOOKING_MESSAGE_LIMIT messages per room in any 24
+hours before they book. The send times of their recent messages are kept in
+the cache per (room, sender), seeded from the Message table on first use and
+appended by chat/signals.py whenever a message is saved, so checking the
+quota on each WebSocket message does not touch the database.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Message
+
+PRE_BOOKING_MESSAGE_LIMIT = 10
+WINDOW = timedelta(hours=24)
+LIMIT_REACHED_MESSAGE = "Pre-booking message limit reached (10 msgs/day). Book a puja for unlimited chat!"
+
+
+def _key(room_id, user_id):
+    return f"chat_quota:{room_id}:{user_id}"
+
+
+def applies(room, user):
+    """Only customers are limited, pandits and vendors can always reply."""
+    return bool(room.is_pre_booking and user.role == 'user')
+
+
+def _recent(room_id, user_id):
+    """Send times (epoch seconds) of the user's messages in the last 24h, oldest first."""
+    cutoff = time.time() - WINDOW.total_seconds()
+    stamps = cache.get(_key(room_id, user_id))
+    if stamps is None:
+        rows = Message.objects.filter(
+            chat_room_id=room_id,
+            sender_id=user_id,
+            timestamp__gte=timezone.now() - WINDOW,
+        ).order_by('-timestamp').values_list('timestamp', flat=True)[:PRE_BOOKING_MESSAGE_LIMIT]
+        stamps = sorted(ts.timestamp() for ts in rows)
+        cache.set(_key(room_id, user_id), stamps, timeout=int(WINDOW.total_seconds()))
+    return [ts for ts in stamps if ts >= cutoff]
+
+
+def load(room, user):
+    """Warm the cache for a sender, e.g. when their WebSocket connects."""
+    if applies(room, user):
+        _recent(room.id, user.id)
+
+
+def check(room, user):
+    """(allowed, reason) for `user` sending one more message in `room`."""
+    if not applies(room, user):
+        return True, None
+    if len(_recent(room.id, user.id)) >= PRE_BOOKING_MESSAGE_LIMIT:
+        return False, LIMIT_REACHED_MESSAGE
+    return True, None
+
+
+def record(message):
+    """Count a saved message against its sender's quota."""
+    room, sender = message.chat_room, message.sender
+    if sender is None or not applies(room, sender):
+        return
+    stamps = _recent(room.id, sender.id)
+    sent = message.timestamp.timestamp()
+    # The seed query may already include this message
+    if sent not in stamps:
+        stamps.append(sent)
+    cache.set(
+        _key(room.id, sender.id),
+        sorted(stamps)[-PRE_BOOKING_MESSAGE_LIMIT:],
+        timeout=int(WINDOW.total_seconds()),
+    )
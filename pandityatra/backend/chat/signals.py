@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from pandits.dashboard import invalidate_dashboard
+from .models import Message
+from . import quota, unread
+
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    def _count():
+        unread.record_message(instance)
+        quota.record(instance)
+        # The pandit dashboard embeds the unread total
+        invalidate_dashboard(instance.chat_room.pandit_id)
+
+    transaction.on_commit(_count)
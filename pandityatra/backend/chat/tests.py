@@ -1,11 +1,21 @@
-from django.test import TestCase
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from pandits.models import PanditUser
 from vendors.models import Vendor
-from .models import ChatRoom, Message
+from .models import ChatMessage, ChatRoom, ChatUnreadCounter, Message
+from . import presence, quota, unread, writer
+from .pagination import encode_cursor, keyset_page
 
 User = get_user_model()
 
@@ -80,3 +90,357 @@ class ChatSystemTestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['id'], room_vendor.id)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class UnreadCounterTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='ucust', email='ucust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(username='upand', email='upand@t.com', role='pandit')
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit)
+        self.url_msg = reverse('chat:message-list', kwargs={'room_id': self.room.id})
+        self.url_count = reverse('chat:unread-count')
+
+    def _send(self, sender, text):
+        self.client.force_authenticate(user=sender)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url_msg, {'content': text})
+
+    @mock.patch('chat.unread.cache_is_shared', return_value=True)
+    def test_counts_are_served_from_shared_cache_and_reset_on_read(self, _):
+        self._send(self.customer, 'Namaste')
+        self._send(self.customer, 'Are you free on Sunday?')
+
+        self.client.force_authenticate(user=self.pandit)
+        self.assertEqual(self.client.get(self.url_count).data['unread_count'], 2)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url_count)
+        self.assertEqual(response.data['unread_count'], 2)
+
+        self.client.get(self.url_msg)
+        self.assertEqual(self.client.get(self.url_count).data['unread_count'], 0)
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+
+        # A new message drops the cached total
+        self._send(self.customer, 'Hello?')
+        self.client.force_authenticate(user=self.pandit)
+        self.assertEqual(self.client.get(self.url_count).data['unread_count'], 1)
+
+    def test_counts_are_written_through_to_db(self):
+        self._send(self.customer, 'Namaste')
+        self._send(self.pandit, 'Namaste ji')
+        self._send(self.pandit, 'Yes, Sunday works')
+
+        self.assertEqual(ChatUnreadCounter.objects.get(user=self.customer, room=self.room).count, 2)
+        self.assertEqual(unread.total_for(self.customer.id), 2)
+        self.assertEqual(unread.total_for(self.pandit.id), 1)
+
+        # Without a shared cache another worker's change is seen at once
+        ChatUnreadCounter.objects.filter(user=self.customer).update(count=F('count') + 1)
+        self.assertEqual(unread.total_for(self.customer.id), 3)
+
+        self.assertTrue(unread.mark_room_read(self.customer.id, self.room.id, 5))
+        self.assertEqual(unread.room_count(self.customer.id, self.room.id), 0)
+        self.assertFalse(unread.mark_room_read(self.customer.id, self.room.id))
+
+        Message.objects.update(is_read=False)
+        unread.rebuild_counters()
+        self.assertEqual(unread.total_for(self.customer.id), 2)
+
+    def test_changes_are_pushed_to_notification_group(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'notifications_{self.pandit.id}', channel)
+
+        self._send(self.customer, 'Namaste')
+
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['type'], 'unread_count')
+        self.assertEqual((event['unread_count'], event['room_id'], event['room_unread']), (1, self.room.id, 1))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class MessageHistoryPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='hcust', email='hcust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(username='hpand', email='hpand@t.com', role='pandit')
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit)
+        self.messages = [
+            Message.objects.create(chat_room=self.room, sender=self.customer, content=f'm{n}', is_read=True)
+            for n in range(5)
+        ]
+        self.url = reverse('chat:message-list', kwargs={'room_id': self.room.id})
+        self.client.force_authenticate(user=self.pandit)
+
+    def test_pages_walk_back_from_newest(self):
+        seen = []
+        response = self.client.get(self.url, {'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.append([m['content'] for m in response.data['results']])
+            if not response.data['next_cursor']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [['m3', 'm4'], ['m1', 'm2'], ['m0']])
+
+    def test_plain_list_and_bad_cursor(self):
+        response = self.client.get(self.url)
+        self.assertEqual([m['content'] for m in response.data], ['m0', 'm1', 'm2', 'm3', 'm4'])
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tied_timestamps_are_not_skipped(self):
+        Message.objects.filter(chat_room=self.room).update(timestamp=timezone.now())
+        queryset = Message.objects.filter(chat_room=self.room)
+
+        first, cursor = keyset_page(queryset, limit=3)
+        rest, end = keyset_page(queryset, cursor=cursor, limit=3)
+
+        ids = [m.id for m in rest + first]
+        self.assertEqual(ids, [m.id for m in self.messages])
+        self.assertIsNone(end)
+
+    def test_websocket_load_before(self):
+        from channels.testing import WebsocketCommunicator
+        from .consumers import ChatConsumer
+
+        async def scenario():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.id}/')
+            communicator.scope['user'] = self.pandit
+            communicator.scope['url_route'] = {'kwargs': {'room_id': self.room.id}}
+            await communicator.connect()
+            history = await communicator.receive_json_from()
+            cursor = encode_cursor(self.messages[3])
+            await communicator.send_json_to({'type': 'load_before', 'cursor': cursor, 'limit': 2})
+            page = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return history, page
+
+        history, page = async_to_sync(scenario)()
+        self.assertEqual(len(history['messages']), 5)
+        self.assertIsNone(history['next_cursor'])
+        self.assertEqual(page['type'], 'message_history_page')
+        self.assertEqual([m['content'] for m in page['messages']], ['m1', 'm2'])
+        self.assertTrue(page['has_more'])
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PreBookingQuotaTestCase(TransactionTestCase):
+    # Autocommit, so the post-save quota update runs as it does in production
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='qcust', email='qcust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(username='qpand', email='qpand@t.com', role='pandit')
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit, is_pre_booking=True)
+
+    def test_quota_is_seeded_once_and_kept_in_cache(self):
+        for n in range(quota.PRE_BOOKING_MESSAGE_LIMIT - 1):
+            Message.objects.create(chat_room=self.room, sender=self.customer, content=f'm{n}')
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            quota.load(self.room, self.customer)
+        with self.assertNumQueries(0):
+            self.assertEqual(quota.check(self.room, self.customer), (True, None))
+            self.assertEqual(quota.check(self.room, self.pandit), (True, None))
+
+        Message.objects.create(chat_room=self.room, sender=self.customer, content='last one')
+        allowed, reason = quota.check(self.room, self.customer)
+        self.assertFalse(allowed)
+        self.assertEqual(reason, quota.LIMIT_REACHED_MESSAGE)
+
+    def test_websocket_rejects_messages_over_quota(self):
+        from channels.testing import WebsocketCommunicator
+        from .consumers import ChatConsumer
+
+        for n in range(quota.PRE_BOOKING_MESSAGE_LIMIT - 1):
+            Message.objects.create(chat_room=self.room, sender=self.customer, content=f'm{n}')
+
+        async def scenario():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.id}/')
+            communicator.scope['user'] = self.customer
+            communicator.scope['url_route'] = {'kwargs': {'room_id': self.room.id}}
+            await communicator.connect()
+            await communicator.receive_json_from()
+            replies = []
+            for text in ('Namaste', 'One more?'):
+                await communicator.send_json_to({'type': 'TEXT', 'content': text})
+                replies.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+
+        sent, rejected = async_to_sync(scenario)()
+        self.assertEqual(sent['content'], 'Namaste')
+        self.assertEqual(rejected, {'type': 'error', 'message': quota.LIMIT_REACHED_MESSAGE})
+        self.assertEqual(Message.objects.filter(sender=self.customer).count(), quota.PRE_BOOKING_MESSAGE_LIMIT)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ChatDeliveryTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        writer.flush()
+        self.customer = User.objects.create_user(username='dcust', email='dcust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(username='dpand', email='dpand@t.com', role='pandit')
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit)
+
+    def _chat(self, steps):
+        from channels.testing import WebsocketCommunicator
+        from .consumers import ChatConsumer
+
+        async def scenario():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.id}/')
+            communicator.scope['user'] = self.customer
+            communicator.scope['url_route'] = {'kwargs': {'room_id': self.room.id}}
+            await communicator.connect()
+            await communicator.receive_json_from()
+            replies = []
+            for step in steps:
+                if step == 'flush':
+                    await database_sync_to_async(writer.flush)()
+                else:
+                    await communicator.send_json_to(step)
+                replies.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+
+        return async_to_sync(scenario)()
+
+    @override_settings(
+        CHAT_DELIVERY_MODE='deliver_first',
+        CHAT_WRITE_BEHIND_FLUSH_SECONDS=3600,
+        CHAT_WRITE_BEHIND_BATCH_SIZE=1000,
+    )
+    def test_deliver_first_broadcasts_then_stores_once(self):
+        message = {'type': 'TEXT', 'content': 'Namaste', 'client_id': 'c-1'}
+        echo, persisted, resent, _ = self._chat([message, 'flush', message, 'flush'])
+
+        self.assertEqual((echo['id'], echo['client_id'], echo['content']), (None, 'c-1', 'Namaste'))
+        stored = Message.objects.get(chat_room=self.room)
+        self.assertEqual(persisted['type'], 'messages_persisted')
+        self.assertEqual(persisted['messages'][0]['id'], stored.id)
+        self.assertEqual(resent['client_id'], 'c-1')
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 1)
+        # Side effects ran once, for the first copy only
+        self.assertEqual(unread.room_count(self.pandit.id, self.room.id), 1)
+
+    def test_copy_stored_concurrently_is_not_counted_as_created(self):
+        # Stored by another process after this one checked for existing copies
+        Message.objects.create(chat_room=self.room, sender=self.customer, content='Namaste', client_id='c-race')
+        racing = Message(chat_room=self.room, sender=self.customer, content='Namaste', client_id='c-race')
+        fresh = Message(chat_room=self.room, sender=self.customer, content='Hello', client_id='c-new')
+
+        self.assertEqual(writer._insert(Message, [racing, fresh]), [fresh])
+        self.assertIsNone(racing.pk)
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 2)
+
+    def test_sync_mode_confirms_resent_message(self):
+        message = {'type': 'TEXT', 'content': 'Namaste', 'client_id': 'c-2'}
+        echo, resent = self._chat([message, message])
+
+        stored = Message.objects.get(chat_room=self.room)
+        self.assertEqual(echo['id'], stored.id)
+        self.assertEqual(resent, {
+            'type': 'messages_persisted',
+            'messages': [{'client_id': 'c-2', 'id': stored.id, 'timestamp': stored.timestamp.isoformat()}],
+        })
+
+    @override_settings(
+        CHAT_DELIVERY_MODE='deliver_first',
+        CHAT_WRITE_BEHIND_FLUSH_SECONDS=3600,
+        CHAT_WRITE_BEHIND_BATCH_SIZE=1000,
+    )
+    def test_puja_chat_deliver_first(self):
+        from datetime import time
+        from channels.testing import WebsocketCommunicator
+        from bookings.models import Booking
+        from .consumers import PujaConsumer
+
+        booking = Booking.objects.create(
+            user=self.customer, pandit=self.pandit, service_name='Ganesh Puja',
+            booking_date=timezone.localdate(), booking_time=time(10, 0), total_fee=1000
+        )
+
+        async def scenario():
+            communicator = WebsocketCommunicator(PujaConsumer.as_asgi(), f'/ws/puja/{booking.id}/')
+            communicator.scope['user'] = self.customer
+            communicator.scope['url_route'] = {'kwargs': {'booking_id': str(booking.id)}}
+            await communicator.connect()
+            await communicator.receive_json_from()  # history
+            await communicator.receive_json_from()  # user_joined
+            await communicator.send_json_to({'content': 'Is the live stream on?', 'client_id': 'p-1'})
+            echo = await communicator.receive_json_from()
+            await database_sync_to_async(writer.flush)()
+            persisted = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return echo, persisted
+
+        echo, persisted = async_to_sync(scenario)()
+        stored = ChatMessage.objects.get(booking=booking)
+        self.assertEqual((echo['type'], echo['data']['id']), ('message', None))
+        self.assertEqual((stored.sender, stored.client_id), ('user', 'p-1'))
+        self.assertEqual(persisted['messages'][0]['id'], stored.id)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PresenceTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='pcust', email='pcust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(username='ppand', email='ppand@t.com', role='pandit')
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit)
+
+    def test_newest_socket_owns_room_presence(self):
+        group = f'chat_{self.room.id}'
+        self.assertTrue(presence.touch(group, self.customer.id, 'tab-1'))
+        self.assertFalse(presence.touch(group, self.customer.id, 'tab-2'))
+
+        # The older tab closing does not take the user offline
+        self.assertFalse(presence.leave(group, self.customer.id, 'tab-1'))
+        self.assertEqual(presence.online_in(group, [self.customer.id, self.pandit.id]), {self.customer.id})
+        self.assertTrue(presence.leave(group, self.customer.id, 'tab-2'))
+        self.assertEqual(presence.online_in(group, [self.customer.id]), set())
+        self.assertEqual(presence.online_users([self.customer.id, self.pandit.id]), {self.customer.id})
+
+    def test_presence_and_typing_reach_the_other_side(self):
+        from channels.testing import WebsocketCommunicator
+        from .consumers import ChatConsumer
+
+        def connect(user):
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.id}/')
+            communicator.scope['user'] = user
+            communicator.scope['url_route'] = {'kwargs': {'room_id': self.room.id}}
+            return communicator
+
+        async def scenario():
+            channel_layer = get_channel_layer()
+            inbox = await channel_layer.new_channel()
+            await channel_layer.group_add(f'notifications_{self.pandit.id}', inbox)
+
+            pandit = connect(self.pandit)
+            await pandit.connect()
+            await pandit.receive_json_from()
+
+            customer = connect(self.customer)
+            await customer.connect()
+            history = await customer.receive_json_from()
+            joined = await pandit.receive_json_from()
+            dashboard = await channel_layer.receive(inbox)
+
+            await customer.send_json_to({'type': 'typing', 'is_typing': True})
+            typing = await pandit.receive_json_from()
+            await customer.disconnect()
+            left = await pandit.receive_json_from()
+            await pandit.disconnect()
+            return history, joined, dashboard, typing, left
+
+        history, joined, dashboard, typing, left = async_to_sync(scenario)()
+        self.assertEqual(history['online'], sorted([self.customer.id, self.pandit.id]))
+        self.assertEqual(joined, {'type': 'presence', 'user_id': self.customer.id, 'status': 'online'})
+        self.assertEqual(dashboard['event']['room'], f'chat_{self.room.id}')
+        self.assertEqual(typing, {'type': 'typing', 'user_id': self.customer.id, 'is_typing': True})
+        self.assertEqual(left['status'], 'offline')
+        self.assertFalse(Message.objects.exists())
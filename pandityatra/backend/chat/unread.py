@@ -0,0 +1,171 @@
+"""
+Chat Unread Counters - Stored unread message counts per user and room.
+
+The unread badge is polled by every open client, so it reads one
+ChatUnreadCounter row per (user, room) instead of counting messages. A saved
+message adds 1 for every other participant of its room (chat/signals.py, after
+commit), and reading a room takes its count back down. Both are single UPDATEs
+with F() expressions, so concurrent workers never overwrite each other.
+
+When the default cache is shared between processes (CACHE_REDIS_URL), totals
+are also served from it for CHAT_UNREAD_CACHE_SECONDS. A user's cached
+counts are dropped whenever they change and reseeded on the next read. With
+a per-process cache (LocMemCache) the counts are always read from the table,
+since another worker's changes would never reach this process's cache.
+
+Message.is_read stays the source of truth; rebuild_counters() recounts from it.
+Every change is pushed to the user's NotificationConsumer group as an
+"unread_count" event.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from core.cache import cache_is_shared
+from .models import ChatRoom, ChatUnreadCounter, Message
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 500
+
+
+def _room_key(user_id, room_id):
+    return f"chat_unread:{user_id}:{room_id}"
+
+
+def _total_key(user_id):
+    return f"chat_unread_total:{user_id}"
+
+
+def _cache_seconds():
+    return int(getattr(settings, 'CHAT_UNREAD_CACHE_SECONDS', 300))
+
+
+def participants(room):
+    return {uid for uid in (room.customer_id, room.pandit_id, room.vendor_id) if uid}
+
+
+def _stored_counts(user_id, room_id=None):
+    """(total, room count) for a user from ChatUnreadCounter, in one query."""
+    counts = ChatUnreadCounter.objects.filter(user_id=user_id).aggregate(
+        total=Sum('count'),
+        room=Sum('count', filter=Q(room_id=room_id)),
+    )
+    return counts['total'] or 0, counts['room'] or 0
+
+
+def total_for(user_id):
+    if not cache_is_shared():
+        return _stored_counts(user_id)[0]
+    total = cache.get(_total_key(user_id))
+    if total is None:
+        total = _stored_counts(user_id)[0]
+        cache.set(_total_key(user_id), total, timeout=_cache_seconds())
+    return total
+
+
+def room_count(user_id, room_id):
+    if not cache_is_shared():
+        return _stored_counts(user_id, room_id)[1]
+    count = cache.get(_room_key(user_id, room_id))
+    if count is None:
+        count = _stored_counts(user_id, room_id)[1]
+        cache.set(_room_key(user_id, room_id), count, timeout=_cache_seconds())
+    return count
+
+
+def _add(user_id, room_id, delta):
+    counter = ChatUnreadCounter.objects.filter(user_id=user_id, room_id=room_id)
+    if counter.update(count=F('count') + delta):
+        return
+    # First unread message in this room for the user
+    ChatUnreadCounter.objects.bulk_create(
+        [ChatUnreadCounter(user_id=user_id, room_id=room_id, count=0)], ignore_conflicts=True
+    )
+    counter.update(count=F('count') + delta)
+
+
+def _changed(user_id, room_id):
+    """Drop the user's cached counts and push the new ones."""
+    if cache_is_shared():
+        cache.delete_many([_total_key(user_id), _room_key(user_id, room_id)])
+    total, room_unread = _stored_counts(user_id, room_id)
+    push_count(user_id, total, room_id, room_unread)
+
+
+def record_message(message):
+    """Count a new message as unread for every other participant of its room."""
+    room = message.chat_room
+    for user_id in participants(room) - {message.sender_id}:
+        _add(user_id, room.id, 1)
+        _changed(user_id, room.id)
+
+
+def mark_room_read(user_id, room_id, count=None):
+    """
+    Drop `count` unread messages (all of them when None) from the user's
+    counter for a room. Returns True when the counter changed.
+    """
+    counter = ChatUnreadCounter.objects.filter(user_id=user_id, room_id=room_id, count__gt=0)
+    if count is None:
+        changed = counter.update(count=0)
+    else:
+        changed = counter.update(count=Greatest(F('count') - count, 0))
+    if not changed:
+        return False
+    _changed(user_id, room_id)
+    return True
+
+
+def push_count(user_id, total, room_id=None, room_unread=None):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f'notifications_{user_id}',
+            {
+                'type': 'unread_count',
+                'unread_count': total,
+                'room_id': room_id,
+                'room_unread': room_unread,
+            }
+        )
+    except Exception as e:
+        logger.warning(f"Could not push unread count to user {user_id}: {e}")
+
+
+def rebuild_counters():
+    """
+    Recount every user's unread messages from the Message table, replacing
+    both the stored rows and the cached counts.
+    """
+    rooms = {room.id: room for room in ChatRoom.objects.filter(messages__is_read=False).distinct()}
+    counts = {}
+    unread = (
+        Message.objects.filter(is_read=False)
+        .values('chat_room_id', 'sender_id')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for entry in unread:
+        room = rooms[entry['chat_room_id']]
+        for user_id in participants(room) - {entry['sender_id']}:
+            key = (user_id, room.id)
+            counts[key] = counts.get(key, 0) + entry['n']
+
+    stale = set(ChatUnreadCounter.objects.values_list('user_id', 'room_id')) | set(counts)
+    ChatUnreadCounter.objects.all().delete()
+    ChatUnreadCounter.objects.bulk_create(
+        [ChatUnreadCounter(user_id=u, room_id=r, count=n) for (u, r), n in counts.items()],
+        batch_size=REBUILD_BATCH_SIZE,
+    )
+    # Drop cached counts; they are reseeded from the new rows on next use
+    cache.delete_many(
+        [_room_key(u, r) for u, r in stale] + [_total_key(u) for u in {u for u, _ in stale}]
+    )
@@ -7,6 +7,7 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from django.utils import timezone
 from .models import ChatRoom, Message, ChatMessage
 from .serializers import ChatRoomSerializer, MessageSerializer
+from .pagination import MessageKeysetPagination
 import os
 from django.conf import settings
 from groq import Groq
@@ -15,6 +16,8 @@ from django.db.models import Q
 from samagri.models import SamagriItem
 from bookings.models import Booking, BookingStatus
 from notifications.services import notify_new_message
+from pandits.dashboard import invalidate_dashboard
+from . import unread
 
 class UnreadMessageCountView(APIView):
     """Returns the total number of unread messages for the current user across all their chat rooms."""
@@ -22,12 +25,8 @@ class UnreadMessageCountView(APIView):
 
     @extend_schema(summary="Get Total Unread Message Count")
     def get(self, request):
-        user = request.user
-        count = Message.objects.filter(
-            Q(chat_room__customer=user) | Q(chat_room__pandit=user) | Q(chat_room__vendor=user),
-            is_read=False
-        ).exclude(sender=user).count()
-        return Response({"unread_count": count})
+        # Served from the stored counters (chat/unread.py), not a cross-room count
+        return Response({"unread_count": unread.total_for(request.user.id)})
 
 class ChatRoomListView(generics.ListAPIView):
     """List all chat rooms for the current user"""
@@ -67,26 +66,37 @@ class ChatRoomDetailView(generics.RetrieveUpdateAPIView):
 
 
 class MessageListView(generics.ListCreateAPIView):
-    """List all messages in a chat room or send a new message"""
+    """
+    List messages in a chat room or send a new message.
+    Pass ?limit=N (and then ?cursor=<next_cursor>) for keyset pages, newest first.
+    """
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessageKeysetPagination
     
     def get_queryset(self):
         room_id = self.kwargs['room_id']
-        return Message.objects.filter(chat_room_id=room_id).order_by('timestamp')
+        return Message.objects.filter(chat_room_id=room_id).select_related('sender', 'chat_room').order_by('timestamp')
     
     def list(self, request, *args, **kwargs):
         """Mark all messages as read when fetching"""
         room_id = self.kwargs['room_id']
         user = request.user
         
-        # Mark all messages as read for this user
-        Message.objects.filter(
-            chat_room_id=room_id
+        # Mark all messages as read for this user. The counter is only for
+        # display, so the (indexed, usually empty) UPDATE always runs
+        marked = Message.objects.filter(
+            chat_room_id=room_id,
+            is_read=False
         ).exclude(sender=user).update(
             is_read=True,
             read_at=timezone.now()
         )
+        unread.mark_room_read(user.id, room_id)
+        if marked:
+            # Bulk update skips signals, so drop the pandit's cached dashboard here
+            pandit_id = ChatRoom.objects.filter(id=room_id).values_list('pandit_id', flat=True).first()
+            invalidate_dashboard(pandit_id)
         
         return super().list(request, *args, **kwargs)
     
@@ -132,6 +142,8 @@ class MarkMessageReadView(generics.UpdateAPIView):
     
     def update(self, request, *args, **kwargs):
         message = self.get_object()
+        if not message.is_read and message.sender_id != request.user.id:
+            unread.mark_room_read(request.user.id, message.chat_room_id, 1)
         message.is_read = True
         message.read_at = timezone.now()
         message.save()
@@ -0,0 +1,216 @@
+"""
+Chat Write-behind - Deliver-first persistence for the chat consumers.
+
+With CHAT_DELIVERY_MODE = "deliver_first", ChatConsumer and PujaConsumer
+broadcast a message as soon as it arrives and hand it to this writer. A
+background thread inserts the queued messages with bulk_create at most every
+CHAT_WRITE_BEHIND_FLUSH_SECONDS (sooner once CHAT_WRITE_BEHIND_BATCH_SIZE are
+waiting) and then runs what the Message post_save signal would have: unread
+counters, the pandit dashboard and the NEW_MESSAGE notification.
+
+Every message carries a client_id, sent by the client or generated here, and
+(room, sender, client_id) is unique. After a batch is stored each room group
+gets a "messages_persisted" event mapping client ids to database ids. Clients
+keep a message until it shows up there and resend it after a reconnect;
+resends are dropped here, so delivery is at-least-once without duplicates
+even if a process dies with messages still queued.
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from notifications.services import notify_new_message
+from pandits.dashboard import invalidate_dashboard
+from .models import ChatMessage, Message
+from . import unread
+
+logger = logging.getLogger(__name__)
+
+CLIENT_ID_MAX_LENGTH = 64
+
+# Fields that, together with client_id, identify a message
+SCOPE_FIELDS = {
+    Message: ('chat_room_id', 'sender_id'),
+    ChatMessage: ('booking_id', 'user_id'),
+}
+
+
+def deliver_first():
+    return getattr(settings, 'CHAT_DELIVERY_MODE', 'sync') == 'deliver_first'
+
+
+def client_id_from(data):
+    """The client's id for an inbound message, or a fresh one."""
+    client_id = str(data.get('client_id') or '')[:CLIENT_ID_MAX_LENGTH]
+    return client_id or uuid.uuid4().hex
+
+
+def _flush_seconds():
+    return float(getattr(settings, 'CHAT_WRITE_BEHIND_FLUSH_SECONDS', 0.2))
+
+
+def _batch_size():
+    return int(getattr(settings, 'CHAT_WRITE_BEHIND_BATCH_SIZE', 50))
+
+
+def _key(message):
+    return (type(message),) + tuple(getattr(message, f) for f in SCOPE_FIELDS[type(message)]) + (message.client_id,)
+
+
+_pending = {}
+_lock = threading.Lock()
+_wake = threading.Event()
+_thread = None
+
+
+def submit(group_name, message):
+    """
+    Queue an unsaved Message or ChatMessage; `group_name` is told once it is
+    stored. A message already waiting with the same client_id is ignored.
+    """
+    with _lock:
+        _pending.setdefault(_key(message), (group_name, message))
+        full = len(_pending) >= _batch_size()
+    _ensure_thread()
+    if full:
+        _wake.set()
+
+
+def _ensure_thread():
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name='chat-writer', daemon=True)
+            _thread.start()
+
+
+def _run():
+    while True:
+        _wake.wait(_flush_seconds())
+        _wake.clear()
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"Chat writer flush failed: {e}")
+        finally:
+            close_old_connections()
+
+
+def flush():
+    """Store everything queued in this process. Returns how many rows were new."""
+    with _lock:
+        batch = list(_pending.values())
+        _pending.clear()
+    if not batch:
+        return 0
+
+    try:
+        created = _store(batch)
+    except Exception as e:
+        # Requeue so the next flush retries them
+        with _lock:
+            for group_name, message in batch:
+                _pending.setdefault(_key(message), (group_name, message))
+        logger.error(f"Failed to store {len(batch)} queued chat messages: {e}")
+        return 0
+
+    for message in created:
+        if isinstance(message, Message):
+            _after_save(message)
+    _announce(batch)
+    return len(created)
+
+
+def _store(batch):
+    """
+    Insert the batch, skipping messages stored before, and give every queued
+    message its database id and timestamp. Returns the newly stored ones.
+    """
+    created = []
+    by_model = defaultdict(list)
+    for _, message in batch:
+        by_model[type(message)].append(message)
+
+    for model, messages in by_model.items():
+        fields = SCOPE_FIELDS[model]
+        client_ids = {m.client_id for m in messages}
+        existing = set(model.objects.filter(client_id__in=client_ids).values_list(*fields, 'client_id'))
+        fresh = [m for m in messages if _key(m)[1:] not in existing]
+        created.extend(_insert(model, fresh))
+
+        stored = {
+            tuple(row[:-2]): row[-2:]
+            for row in model.objects.filter(client_id__in=client_ids).values_list(
+                *fields, 'client_id', 'id', 'timestamp'
+            )
+        }
+        for m in messages:
+            m.pk, m.timestamp = stored.get(_key(m)[1:], (None, m.timestamp))
+    return [m for m in created if m.pk]
+
+
+def _insert(model, messages):
+    """
+    Insert `messages` and return the ones this call stored. Another process may
+    store a resend between the existence check and the insert; then the rows
+    are retried one by one and the conflicting copy is not counted as created.
+    """
+    if not messages:
+        return []
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(messages, batch_size=_batch_size())
+        return messages
+    except IntegrityError:
+        pass
+
+    inserted = []
+    for message in messages:
+        message.pk = None
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([message])
+            inserted.append(message)
+        except IntegrityError:
+            message.pk = None
+    return inserted
+
+
+def _after_save(message):
+    """What chat/signals.py and the consumer do for a message saved one at a time."""
+    unread.record_message(message)
+    invalidate_dashboard(message.chat_room.pandit_id)
+    try:
+        notify_new_message(message)
+    except Exception as e:
+        logger.error(f"Could not notify recipient of chat message {message.pk}: {e}")
+
+
+def _announce(batch):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    by_group = defaultdict(list)
+    for group_name, message in batch:
+        if message.pk:
+            by_group[group_name].append({
+                'client_id': message.client_id,
+                'id': message.pk,
+                'timestamp': message.timestamp.isoformat(),
+            })
+    for group_name, messages in by_group.items():
+        try:
+            async_to_sync(channel_layer.group_send)(
+                group_name,
+                {'type': 'messages_persisted', 'messages': messages}
+            )
+        except Exception as e:
+            logger.warning(f"Could not announce stored messages to {group_name}: {e}")
@@ -0,0 +1,11 @@
+"""
+Helpers for code that relies on the default cache being shared between processes.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    """False when the default cache lives in this process only (LocMemCache, DummyCache)."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
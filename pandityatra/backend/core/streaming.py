@@ -0,0 +1,51 @@
+"""
+Helpers for native async / streaming HTTP views.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the exception text, which can hold upstream API or DB errors
+STREAM_ERROR_DETAIL = "Something went wrong while generating the answer. Please try again."
+
+
+async def aauthenticate(request):
+    """
+    Resolve the user from a JWT bearer token, falling back to the session.
+    Raises rest_framework.exceptions.AuthenticationFailed for a bad token.
+    """
+    auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    if auth is not None:
+        return auth[0]
+    return await request.auser()
+
+
+def sse_event(event: dict) -> str:
+    """Format an event dict with a "type" key as a Server-Sent Events frame."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+def sse_response(events):
+    """
+    Wrap an async iterator of event dicts in a text/event-stream response.
+    Errors raised mid-stream are logged and sent as a final generic "error" event.
+    """
+    async def stream():
+        try:
+            async for event in events:
+                yield sse_event(event)
+        except Exception:
+            logger.exception("Streaming response failed")
+            yield sse_event({"type": "error", "detail": STREAM_ERROR_DETAIL})
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,10 +1,20 @@
+import json
+import logging
+
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-def get_ai_prediction(kundali):
-    """Legacy helper for model-based predictions."""
-    # Map the model instance to a dict for the expert service
-    data = {
+logger = logging.getLogger(__name__)
+
+OLLAMA_MODEL = "llama3.2:1b"
+ORACLE_UNAVAILABLE = "The cosmic oracle is currently at rest, please try later."
+
+
+def kundali_to_data(kundali):
+    """Map a Kundali instance to the dict used by the expert prediction service."""
+    return {
         'dob': kundali.dob,
         'time': kundali.time,
         'place': kundali.place,
@@ -14,21 +24,28 @@ def get_ai_prediction(kundali):
             for p in kundali.planets.all()
         ]
     }
-    return get_expert_ai_prediction(data)
 
-def get_expert_ai_prediction(data, history=None):
-    """
-    Highly detailed AI prediction using an expert Vedic Jyotishi persona.
-    Supports multi-turn chat if history is provided.
-    """
-    try:
-        planets_list = data.get('planets', [])
-        planets_str = "\n".join([
-            f"- {p.get('planet')} in {p.get('rashi')}, House {p.get('house')} ({float(p.get('longitude', 0)):.2f}°)"
-            for p in planets_list
-        ])
 
-        system_prompt = """You are 'Jyotish AI', a highly experienced Nepali Vedic Jyotishi (astrologer) with 25+ years of practice.
+def get_ai_prediction(kundali):
+    """Legacy helper for model-based predictions."""
+    return get_expert_ai_prediction(kundali_to_data(kundali))
+
+
+def _ollama_chat_url():
+    # Ensure we use the OLLAMA_URL from settings
+    url = getattr(settings, 'OLLAMA_URL', 'http://ollama:7070')
+    if not url.endswith('/api/chat'):
+        url = f"{url.rstrip('/')}/api/chat"
+    return url
+
+def _build_prediction_messages(data, history=None):
+    planets_list = data.get('planets', [])
+    planets_str = "\n".join([
+        f"- {p.get('planet')} in {p.get('rashi')}, House {p.get('house')} ({float(p.get('longitude', 0)):.2f}°)"
+        for p in planets_list
+    ])
+
+    system_prompt = """You are 'Jyotish AI', a highly experienced Nepali Vedic Jyotishi (astrologer) with 25+ years of practice.
 Your goal is to provide a deep, soulful, and accurate interpretation of the user's Kundali (birth chart).
 
 LANGUAGE INSTRUCTIONS:
@@ -41,8 +58,8 @@ CONVERSATION CONTEXT:
 - For the initial reading, provide a comprehensive 6-point analysis.
 - For follow-up questions, be specific and use the birth data to answer directly.
 """
-        
-        initial_user_prompt = f"""
+    
+    initial_user_prompt = f"""
 User's Birth Chart Data:
 - Date of Birth: {data.get('dob')}
 - Time of Birth: {data.get('time')}
@@ -55,25 +72,31 @@ Planetary Positions:
 Please generate my personalized Kundali interpretation in the language I am using (Nepali or English).
 """
 
-        # Construct messages for Ollama Chat API
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        if not history or len(history) == 0:
-            # First time prediction
-            messages.append({"role": "user", "content": initial_user_prompt})
-        else:
-            # We have a history. We need to prepend the birth chart context to the very first user message 
-            # if it's not already there, but usually, we can just pass the history array directly
-            # assuming the base history starts with the chart data.
-            messages.extend(history)
-
-        # Ensure we use the OLLAMA_URL from settings
-        url = getattr(settings, 'OLLAMA_URL', 'http://ollama:7070')
-        if not url.endswith('/api/chat'):
-            url = f"{url.rstrip('/')}/api/chat"
+    # Construct messages for Ollama Chat API
+    messages = [{"role": "system", "content": system_prompt}]
+    
+    if not history or len(history) == 0:
+        # First time prediction
+        messages.append({"role": "user", "content": initial_user_prompt})
+    else:
+        # We have a history. We need to prepend the birth chart context to the very first user message 
+        # if it's not already there, but usually, we can just pass the history array directly
+        # assuming the base history starts with the chart data.
+        messages.extend(history)
+    return messages
+
+
+def get_expert_ai_prediction(data, history=None):
+    """
+    Highly detailed AI prediction using an expert Vedic Jyotishi persona.
+    Supports multi-turn chat if history is provided.
+    """
+    try:
+        messages = _build_prediction_messages(data, history)
+        url = _ollama_chat_url()
         
         res = requests.post(url, json={
-            "model": "llama3.2:1b",
+            "model": OLLAMA_MODEL,
             "messages": messages,
             "stream": False
         }, timeout=60)
@@ -81,11 +104,75 @@ Please generate my personalized Kundali interpretation in the language I am usin
         if res.status_code == 200:
             return res.json().get("message", {}).get("content", "The cosmic alignment is unclear at this moment.")
         
-        return "The cosmic oracle is currently at rest, please try later."
+        return ORACLE_UNAVAILABLE
         
     except requests.exceptions.RequestException as e:
         print(f"Ollama Connection Error (RequestException): {str(e)}")
-        return "The cosmic oracle is currently at rest, please try later."
+        return ORACLE_UNAVAILABLE
     except Exception as e:
         print(f"Ollama Connection Error (General): {str(e)}")
         return f"Divine Insight Error: {str(e)}"
+
+
+async def astream_expert_ai_prediction(data, history=None):
+    """
+    Async generator yielding prediction text as Ollama produces it.
+    Same prompt as get_expert_ai_prediction, but with "stream": True the
+    response is newline-delimited JSON chunks.
+    """
+    try:
+        messages = _build_prediction_messages(data, history)
+        async with httpx.AsyncClient(timeout=60) as client:
+            async with client.stream("POST", _ollama_chat_url(), json={
+                "model": OLLAMA_MODEL,
+                "messages": messages,
+                "stream": True
+            }) as res:
+                if res.status_code != 200:
+                    yield ORACLE_UNAVAILABLE
+                    return
+                async for line in res.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text = chunk.get("message", {}).get("content")
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        break
+
+    except httpx.HTTPError as e:
+        logger.warning(f"Ollama connection error while streaming: {e}")
+        yield ORACLE_UNAVAILABLE
+    except Exception:
+        # Details stay in the log; the client only gets the generic message
+        logger.exception("Ollama streaming prediction failed")
+        yield ORACLE_UNAVAILABLE
+
+
+async def stream_kundali_prediction(user, data, history=None, kundali_id=None):
+    """
+    Yield {"type": "token"} events followed by {"type": "done", "ai_prediction": ...}.
+    When kundali_id refers to one of the user's saved charts, the chart is read
+    from the database and the finished initial reading is stored on
+    Kundali.ai_prediction (follow-up answers are not persisted).
+    """
+    from kundali.models import Kundali
+
+    kundali = None
+    if kundali_id and user is not None and user.is_authenticated:
+        kundali = await Kundali.objects.filter(id=kundali_id, user=user).afirst()
+        if kundali is not None:
+            data = await sync_to_async(kundali_to_data)(kundali)
+
+    parts = []
+    async for text in astream_expert_ai_prediction(data or {}, history=history):
+        parts.append(text)
+        yield {"type": "token", "text": text}
+
+    prediction = "".join(parts) or "The cosmic alignment is unclear at this moment."
+    if kundali is not None and not history:
+        kundali.ai_prediction = prediction
+        await kundali.asave(update_fields=["ai_prediction"])
+
+    yield {"type": "done", "ai_prediction": prediction}
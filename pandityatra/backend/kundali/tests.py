@@ -1,3 +1,54 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Kundali
+from .services.ai import ORACLE_UNAVAILABLE, astream_expert_ai_prediction, stream_kundali_prediction
+
+User = get_user_model()
+
+
+class KundaliPredictionStreamTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='kstream', email='kstream@t.com', password='p', role='user'
+        )
+        self.kundali = Kundali.objects.create(
+            user=self.user, dob='1995-05-05', time='10:30', latitude=27.7, longitude=85.3,
+            timezone='Asia/Kathmandu', lagna=120.5,
+        )
+
+    def _collect(self, **kwargs):
+        async def fake_stream(data, history=None):
+            self.seen_data = data
+            for text in ("Your ", "lagna ", "is strong."):
+                yield text
+
+        async def run():
+            return [event async for event in stream_kundali_prediction(self.user, {}, **kwargs)]
+
+        with mock.patch('kundali.services.ai.astream_expert_ai_prediction', fake_stream):
+            return async_to_sync(run)()
+
+    def test_initial_reading_is_streamed_and_saved(self):
+        events = self._collect(kundali_id=self.kundali.id)
+
+        self.assertEqual([e["type"] for e in events], ["token", "token", "token", "done"])
+        self.assertEqual(self.seen_data["lagna"], 120.5)
+        self.kundali.refresh_from_db()
+        self.assertEqual(self.kundali.ai_prediction, "Your lagna is strong.")
+
+    def test_follow_up_answers_are_not_saved(self):
+        self._collect(kundali_id=self.kundali.id, history=[{"role": "user", "content": "career?"}])
+        self.kundali.refresh_from_db()
+        self.assertIsNone(self.kundali.ai_prediction)
+
+    def test_unexpected_errors_are_not_streamed_to_the_client(self):
+        async def run():
+            return [text async for text in astream_expert_ai_prediction({})]
+
+        with mock.patch('kundali.services.ai._build_prediction_messages', side_effect=ValueError("secret detail")), \
+                self.assertLogs('kundali.services.ai', level='ERROR'):
+            self.assertEqual(async_to_sync(run)(), [ORACLE_UNAVAILABLE])
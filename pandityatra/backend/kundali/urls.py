@@ -7,4 +7,5 @@ urlpatterns = [
     path('list/', views.list_kundalis),
     path('public-stats/', views.public_kundali_stats),
     path('expert-predict/', views.predict_kundali_ai),
+    path('expert-predict/stream/', views.predict_kundali_ai_stream),
 ]
@@ -3,11 +3,17 @@ from .services.astro import calculate_chart, get_nakshatra, get_rashi, get_house
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from kundali.services.ai import get_ai_prediction, get_expert_ai_prediction
+from kundali.services.ai import get_ai_prediction, get_expert_ai_prediction, stream_kundali_prediction
 from django.db.models import Avg, Count
 from django.conf import settings
 from reviews.models import SiteReview, Review
 from drf_spectacular.utils import extend_schema
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from core.streaming import aauthenticate, sse_response
+import json
 
 
 @extend_schema(summary="Generate Kundali Chart")
@@ -85,10 +91,13 @@ def generate_kundali(request):
             house=pdata["house"]
         )
 
-    # AI prediction
-    prediction = get_ai_prediction(kundali)
-    kundali.ai_prediction = prediction
-    kundali.save()
+    # AI prediction. Clients that stream the reading (expert-predict/stream/
+    # with kundali_id) pass defer_prediction to get the chart back immediately.
+    prediction = None
+    if not request.data.get("defer_prediction"):
+        prediction = get_ai_prediction(kundali)
+        kundali.ai_prediction = prediction
+        kundali.save()
 
     return Response({
         "kundali_id": kundali.id,
@@ -192,4 +201,30 @@ def predict_kundali_ai(request):
     
     return Response({
         "ai_prediction": prediction
-    })
\ No newline at end of file
+    })
+
+
+@csrf_exempt
+@require_POST
+async def predict_kundali_ai_stream(request):
+    """
+    Streaming (Server-Sent Events) variant of predict_kundali_ai.
+    Accepts the same body plus an optional kundali_id; for a saved chart of
+    the logged-in user the finished reading is stored on the Kundali.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+
+    try:
+        user = await aauthenticate(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+
+    return sse_response(stream_kundali_prediction(
+        user,
+        data,
+        history=data.get('messages', []),
+        kundali_id=data.get('kundali_id'),
+    ))
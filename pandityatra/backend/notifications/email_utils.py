@@ -1,4 +1,4 @@
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -6,23 +6,30 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def build_puja_email(recipient_email, subject, template_name, context):
+    """
+    Render a puja-related email without sending it.
+    """
+    html_content = render_to_string(f'emails/{template_name}', context)
+    text_content = strip_tags(html_content)
+
+    from_email = settings.DEFAULT_FROM_EMAIL
+    msg = EmailMultiAlternatives(
+        subject,
+        text_content,
+        from_email,
+        [recipient_email],
+        reply_to=['support@pandityatra.com']
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
 def send_puja_email(recipient_email, subject, template_name, context):
     """
     Generic function to send puja-related emails using templates.
     """
     try:
-        html_content = render_to_string(f'emails/{template_name}', context)
-        text_content = strip_tags(html_content)
-        
-        from_email = settings.DEFAULT_FROM_EMAIL
-        msg = EmailMultiAlternatives(
-            subject,
-            text_content,
-            from_email,
-            [recipient_email],
-            reply_to=['support@pandityatra.com']
-        )
-        msg.attach_alternative(html_content, "text/html")
+        msg = build_puja_email(recipient_email, subject, template_name, context)
         msg.send(fail_silently=False)
         logger.info(f"Successfully sent email to {recipient_email} with subject: {subject}")
         return True
@@ -84,9 +91,10 @@ def send_recording_ready_email(booking):
     )
 
 
-def send_room_reminder_email(booking):
-    """Send a 5-minute reminder email to customer and pandit for online session."""
+def _room_reminder_emails(booking):
+    """(recipient, subject, template, context) for the 5-minute reminder of an online session."""
     room_url = booking.daily_room_url or booking.video_room_url
+    subject = f"Reminder: {booking.service_name} starts in 5 minutes"
 
     customer_context = {
         'user_name': booking.user.full_name,
@@ -97,12 +105,7 @@ def send_room_reminder_email(booking):
         'role': 'customer',
         'is_reminder': True,
     }
-    send_puja_email(
-        booking.user.email,
-        f"Reminder: {booking.service_name} starts in 5 minutes",
-        'room_ready_email.html',
-        customer_context,
-    )
+    emails = [(booking.user.email, subject, 'room_ready_email.html', customer_context)]
 
     if booking.pandit and booking.pandit.user.email:
         pandit_context = {
@@ -114,10 +117,37 @@ def send_room_reminder_email(booking):
             'role': 'pandit',
             'is_reminder': True,
         }
-        send_puja_email(
-            booking.pandit.user.email,
-            f"Reminder: {booking.service_name} starts in 5 minutes",
-            'room_ready_email.html',
-            pandit_context,
-        )
+        emails.append((booking.pandit.user.email, subject, 'room_ready_email.html', pandit_context))
+    return emails
+
+def send_room_reminder_email(booking):
+    """Send a 5-minute reminder email to customer and pandit for online session."""
+    for email in _room_reminder_emails(booking):
+        send_puja_email(*email)
+
+def send_room_reminder_emails(bookings):
+    """
+    Send the reminder emails for many bookings over one SMTP connection.
+    Returns the number of emails sent.
+    """
+    messages = []
+    for booking in bookings:
+        for recipient, subject, template_name, context in _room_reminder_emails(booking):
+            if not recipient:
+                continue
+            try:
+                messages.append(build_puja_email(recipient, subject, template_name, context))
+            except Exception as e:
+                logger.error(f"Failed to render reminder email for booking {booking.id}: {str(e)}", exc_info=True)
+    if not messages:
+        return 0
+
+    try:
+        with get_connection(fail_silently=False) as connection:
+            sent = connection.send_messages(messages) or 0
+        logger.info(f"Sent {sent} room reminder emails")
+        return sent
+    except Exception as e:
+        logger.error(f"Failed to send {len(messages)} room reminder emails: {str(e)}", exc_info=True)
+        return 0
 
@@ -45,6 +45,10 @@ class Notification(models.Model):
         null=True
     )
     
+    # Coalescing: repeated events (e.g. chat messages per room) update one row
+    group_key = models.CharField(max_length=100, blank=True, default='')
+    event_count = models.PositiveIntegerField(default=1)
+    
     # Metadata
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(blank=True, null=True)
@@ -58,6 +62,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'is_read']),
+            models.Index(fields=['user', 'group_key', '-created_at']),
         ]
     
     def __str__(self):
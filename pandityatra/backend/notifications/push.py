@@ -0,0 +1,220 @@
+"""
+Push Delivery - Queued, batched web push for Notification rows.
+
+create_notification only schedules delivery; nothing is sent until the
+surrounding transaction commits, and then outside the request:
+
+- "celery": a notifications.tasks.send_push_task per notification
+- "thread": a small in-process worker pool, used when Celery runs eagerly
+  (CELERY_TASK_ALWAYS_EAGER) and .delay() would block the request anyway
+- "inline": deliver in the caller, for tests and management commands
+
+A delivery loads the recipient's active tokens once, sends to them through a
+bounded pool (PUSH_SEND_WORKERS) and deactivates every token the push
+service reports as gone (404/410) in a single UPDATE.
+
+The transport is pluggable via PUSH_BACKEND. LocalPushBackend is a stand-in
+push endpoint that records messages in memory, so tests and local setups can
+exercise the whole pipeline without VAPID keys or network access.
+"""
+import importlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, PushNotificationToken
+
+logger = logging.getLogger(__name__)
+
+GONE_STATUS_CODES = (404, 410)
+
+
+class WebPushBackend:
+    """Sends through pywebpush with the configured VAPID keys."""
+
+    def __init__(self):
+        try:
+            module = importlib.import_module('pywebpush')
+            self.webpush = getattr(module, 'webpush', None)
+            self.error = getattr(module, 'WebPushException', Exception)
+        except Exception:
+            self.webpush, self.error = None, Exception
+
+    def available(self):
+        return bool(settings.VAPID_PUBLIC_KEY and settings.VAPID_PRIVATE_KEY and self.webpush)
+
+    def send(self, subscription, payload):
+        """Returns the HTTP status of the push service."""
+        try:
+            response = self.webpush(
+                subscription_info=subscription,
+                data=payload,
+                vapid_private_key=settings.VAPID_PRIVATE_KEY,
+                vapid_claims={'sub': settings.VAPID_ADMIN_EMAIL},
+                timeout=float(getattr(settings, 'PUSH_TIMEOUT_SECONDS', 10)),
+            )
+            return getattr(response, 'status_code', 201)
+        except self.error as exc:
+            status_code = getattr(getattr(exc, 'response', None), 'status_code', None)
+            if status_code in GONE_STATUS_CODES:
+                return status_code
+            raise
+
+
+class LocalPushBackend:
+    """
+    In-memory stand-in for a push service. Messages land in `outbox` as
+    (endpoint, payload dict) and endpoints listed in `gone` answer 410.
+    """
+    outbox = []
+    gone = set()
+    _lock = threading.Lock()
+
+    def available(self):
+        return True
+
+    def send(self, subscription, payload):
+        endpoint = subscription.get('endpoint')
+        if endpoint in self.gone:
+            return 410
+        with self._lock:
+            self.outbox.append((endpoint, json.loads(payload)))
+        return 201
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.outbox.clear()
+            cls.gone.clear()
+
+
+def get_backend():
+    path = getattr(settings, 'PUSH_BACKEND', 'notifications.push.WebPushBackend')
+    return import_string(path)()
+
+
+def build_payload(notification):
+    target_url = '/my-bookings'
+    if notification.booking_id:
+        if notification.notification_type in {'PUJA_ROOM_READY', 'VIDEO_CALL_INCOMING'}:
+            target_url = f'/video/room/{notification.booking_id}'
+        elif notification.notification_type == 'RECORDING_READY_REVIEW':
+            target_url = f'/my-bookings/{notification.booking_id}?tab=recording-review'
+
+    return {
+        'title': notification.title,
+        'body': notification.message,
+        'notification_id': notification.id,
+        'notification_type': notification.notification_type,
+        'booking_id': notification.booking_id,
+        'url': target_url,
+    }
+
+
+def _subscription(token):
+    if token.subscription:
+        return token.subscription
+    if token.endpoint:
+        return {'endpoint': token.endpoint}
+    return None
+
+
+def deliver_push(notification_id, backend=None):
+    """
+    Send one notification to all of its recipient's active tokens.
+    Returns the number of successful sends.
+    """
+    backend = backend or get_backend()
+    if not backend.available():
+        return 0
+
+    notification = Notification.objects.filter(id=notification_id).first()
+    if notification is None:
+        return 0
+
+    targets = [
+        (token.id, subscription)
+        for token in PushNotificationToken.objects.filter(user_id=notification.user_id, is_active=True)
+        if (subscription := _subscription(token))
+    ]
+    if not targets:
+        return 0
+
+    payload = json.dumps(build_payload(notification))
+
+    def send(target):
+        token_id, subscription = target
+        try:
+            return token_id, backend.send(subscription, payload)
+        except Exception as exc:
+            logger.warning('Web push failed for token %s: %s', token_id, exc)
+            return token_id, None
+
+    workers = min(len(targets), int(getattr(settings, 'PUSH_SEND_WORKERS', 8)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(send, targets))
+    else:
+        results = [send(target) for target in targets]
+
+    dead = [token_id for token_id, status_code in results if status_code in GONE_STATUS_CODES]
+    if dead:
+        PushNotificationToken.objects.filter(id__in=dead).update(is_active=False, updated_at=timezone.now())
+        logger.info('Deactivated %s expired push tokens', len(dead))
+    return sum(1 for _, status_code in results if status_code and status_code < 300)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(getattr(settings, 'PUSH_DISPATCH_WORKERS', 4)),
+                    thread_name_prefix='push',
+                )
+    return _executor
+
+
+def _deliver_in_worker(notification_id):
+    try:
+        deliver_push(notification_id)
+    except Exception as exc:
+        logger.error('Push delivery failed for notification %s: %s', notification_id, exc)
+    finally:
+        close_old_connections()
+
+
+def _dispatch_mode():
+    mode = getattr(settings, 'PUSH_DISPATCH', None)
+    if mode:
+        return mode
+    return 'thread' if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False) else 'celery'
+
+
+def dispatch_push(notification_id):
+    if not get_backend().available():
+        return
+    mode = _dispatch_mode()
+    if mode == 'inline':
+        deliver_push(notification_id)
+    elif mode == 'thread':
+        _get_executor().submit(_deliver_in_worker, notification_id)
+    else:
+        from .tasks import send_push_task
+        send_push_task.delay(notification_id)
+
+
+def enqueue_push(notification):
+    """Deliver `notification` once the current transaction commits."""
+    transaction.on_commit(lambda: dispatch_push(notification.id))
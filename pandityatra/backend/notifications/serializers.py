@@ -10,7 +10,8 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'notification_type', 'type', 'title', 'title_ne', 
             'message', 'message_ne', 'booking', 'is_read', 
-            'read_at', 'created_at', 'user_timezone', 'action_url'
+            'read_at', 'created_at', 'user_timezone', 'action_url',
+            'event_count'
         ]
         read_only_fields = ['id', 'created_at', 'read_at']
     
@@ -1,29 +1,21 @@
 """
 Notification Service - Creates notifications for various events
 """
-import json
 import logging
-import importlib
 from datetime import timedelta
 
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 from .models import Notification, PushNotificationToken
+from .push import enqueue_push
 
 
 logger = logging.getLogger(__name__)
 
 
-def _get_webpush_callable():
-    try:
-        module = importlib.import_module('pywebpush')
-        return getattr(module, 'webpush', None), getattr(module, 'WebPushException', Exception)
-    except Exception:
-        return None, Exception
-
-
-def create_notification(user, notification_type, title, message, booking=None, title_ne=None, message_ne=None):
+def create_notification(user, notification_type, title, message, booking=None, title_ne=None, message_ne=None, group_key=''):
     """
     Create a notification for a user
     
@@ -35,6 +27,7 @@ def create_notification(user, notification_type, title, message, booking=None, t
         booking: Optional related booking
         title_ne: Optional Nepali title
         message_ne: Optional Nepali message
+        group_key: Optional key that later events may coalesce into
     
     Returns:
         The created Notification object
@@ -46,10 +39,12 @@ def create_notification(user, notification_type, title, message, booking=None, t
         message=message,
         booking=booking,
         title_ne=title_ne,
-        message_ne=message_ne
+        message_ne=message_ne,
+        group_key=group_key
     )
 
-    _send_push_for_notification(notification)
+    # Web push goes out after commit, off the request path (see push.py)
+    enqueue_push(notification)
     return notification
 
 
@@ -71,61 +66,6 @@ def register_push_token(user, token, device_type='web', endpoint=None, subscript
     return obj
 
 
-def _build_push_payload(notification):
-    target_url = '/my-bookings'
-    if notification.booking_id:
-        if notification.notification_type in {'PUJA_ROOM_READY', 'VIDEO_CALL_INCOMING'}:
-            target_url = f'/video/room/{notification.booking_id}'
-        elif notification.notification_type == 'RECORDING_READY_REVIEW':
-            target_url = f'/my-bookings/{notification.booking_id}?tab=recording-review'
-
-    return {
-        'title': notification.title,
-        'body': notification.message,
-        'notification_id': notification.id,
-        'notification_type': notification.notification_type,
-        'booking_id': notification.booking_id,
-        'url': target_url,
-    }
-
-
-def _send_push_for_notification(notification):
-    """Best-effort web push send for active user tokens."""
-    webpush_callable, webpush_exception = _get_webpush_callable()
-
-    if not settings.VAPID_PUBLIC_KEY or not settings.VAPID_PRIVATE_KEY or webpush_callable is None:
-        return
-
-    tokens = PushNotificationToken.objects.filter(user=notification.user, is_active=True)
-    if not tokens.exists():
-        return
-
-    payload = json.dumps(_build_push_payload(notification))
-
-    for token in tokens:
-        subscription = token.subscription
-        if not subscription and token.endpoint:
-            subscription = {'endpoint': token.endpoint}
-        if not subscription:
-            continue
-
-        try:
-            webpush_callable(
-                subscription_info=subscription,
-                data=payload,
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={'sub': settings.VAPID_ADMIN_EMAIL},
-            )
-        except webpush_exception as exc:
-            status_code = getattr(getattr(exc, 'response', None), 'status_code', None)
-            if status_code in (404, 410):
-                token.is_active = False
-                token.save(update_fields=['is_active', 'updated_at'])
-            logger.warning('Web push failed for token %s: %s', token.id, exc)
-        except Exception as exc:
-            logger.warning('Unexpected push error for token %s: %s', token.id, exc)
-
-
 def notify_booking_created(booking):
     """Notify pandit when a new booking is created"""
     pandit_user = booking.pandit
@@ -251,13 +191,33 @@ def notify_new_message(message):
         recipient = chat_room.pandit if chat_room.pandit else chat_room.vendor
     
     sender_name = sender.full_name or sender.username
-    
-    create_notification(
+    preview = message_preview[:100] + ('...' if len(message_preview) > 100 else '')
+    group_key = f'chat_room:{chat_room.id}'
+
+    # Within the window, fold further messages into the recipient's unread
+    # notification for this room; only the first one is pushed.
+    window = timedelta(seconds=getattr(settings, 'NEW_MESSAGE_COALESCE_SECONDS', 300))
+    with transaction.atomic():
+        existing = Notification.objects.select_for_update().filter(
+            user=recipient,
+            group_key=group_key,
+            is_read=False,
+            created_at__gte=timezone.now() - window,
+        ).order_by('-created_at').first()
+        if existing:
+            existing.event_count += 1
+            existing.title = f'{existing.event_count} new messages from {sender_name}'
+            existing.message = preview
+            existing.save(update_fields=['event_count', 'title', 'message'])
+            return existing
+
+    return create_notification(
         user=recipient,
         notification_type='NEW_MESSAGE',
         title=f'New message from {sender_name}',
-        message=message_preview[:100] + ('...' if len(message_preview) > 100 else ''),
-        booking=chat_room.booking
+        message=preview,
+        booking=chat_room.booking,
+        group_key=group_key
     )
 
 
@@ -376,21 +336,37 @@ def notify_recording_ready_review(booking):
 
 def notify_puja_room_reminder(booking):
     """Notify both participants 5 minutes before scheduled online puja."""
-    create_notification(
-        user=booking.user,
-        notification_type='PUJA_ROOM_READY',
-        title='Puja starts in 5 minutes ⏰',
-        message=f'Your {booking.service_name} session will start soon. Please join the video room.',
-        booking=booking,
-    )
+    return notify_puja_room_reminders([booking])
 
-    create_notification(
-        user=booking.pandit,
-        notification_type='PUJA_ROOM_READY',
-        title='Upcoming puja in 5 minutes ⏰',
-        message=f'{booking.service_name} with {booking.user.full_name} starts in 5 minutes. Please join the room.',
-        booking=booking,
-    )
+
+def notify_puja_room_reminders(bookings):
+    """
+    Reminder notifications for many online pujas at once, with a single
+    INSERT. Bookings need user and pandit loaded. Returns the
+    notifications created.
+    """
+    notifications = []
+    for booking in bookings:
+        notifications.append(Notification(
+            user=booking.user,
+            notification_type='PUJA_ROOM_READY',
+            title='Puja starts in 5 minutes ⏰',
+            message=f'Your {booking.service_name} session will start soon. Please join the video room.',
+            booking=booking,
+        ))
+        if booking.pandit:
+            notifications.append(Notification(
+                user=booking.pandit.user,
+                notification_type='PUJA_ROOM_READY',
+                title='Upcoming puja in 5 minutes ⏰',
+                message=f'{booking.service_name} with {booking.user.full_name} starts in 5 minutes. Please join the room.',
+                booking=booking,
+            ))
+
+    created = Notification.objects.bulk_create(notifications)
+    for notification in created:
+        enqueue_push(notification)
+    return created
 
 
 def notify_review_received(review):
@@ -121,3 +121,12 @@ def booking_notification_task(booking_id, notification_type):
     except Exception as e:
         logger.error(f"Error in booking_notification_task: {str(e)}")
         return False
+
+
+@shared_task(name='notifications.tasks.send_push_task')
+def send_push_task(notification_id):
+    """
+    Deliver web push for one Notification to all of the user's devices
+    """
+    from .push import deliver_push
+    return deliver_push(notification_id)
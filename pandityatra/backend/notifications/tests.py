@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from chat.models import ChatRoom, Message
+from pandits.models import PanditUser
+from .models import Notification, PushNotificationToken
+from .push import LocalPushBackend
+from .services import create_notification, notify_new_message
+
+User = get_user_model()
+
+
+@override_settings(PUSH_BACKEND='notifications.push.LocalPushBackend', PUSH_DISPATCH='inline')
+class PushPipelineTestCase(TestCase):
+    def setUp(self):
+        LocalPushBackend.reset()
+        self.user = User.objects.create_user(username='pushuser', email='push@t.com', role='user')
+        for n in range(3):
+            PushNotificationToken.objects.create(
+                user=self.user, token=f't{n}', subscription={'endpoint': f'https://push.local/{n}'}
+            )
+        PushNotificationToken.objects.create(user=self.user, token='no-endpoint')
+
+    def _notify(self):
+        return create_notification(self.user, 'BOOKING_ACCEPTED', 'Booking Confirmed', 'See you soon')
+
+    def test_push_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            notification = self._notify()
+        self.assertEqual(LocalPushBackend.outbox, [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(LocalPushBackend.outbox), 3)
+        self.assertEqual({p['notification_id'] for _, p in LocalPushBackend.outbox}, {notification.id})
+
+    def test_gone_tokens_are_deactivated_in_bulk(self):
+        LocalPushBackend.gone.update({'https://push.local/0', 'https://push.local/2'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self._notify()
+
+        self.assertEqual([endpoint for endpoint, _ in LocalPushBackend.outbox], ['https://push.local/1'])
+        active = set(PushNotificationToken.objects.filter(is_active=True).values_list('token', flat=True))
+        self.assertEqual(active, {'t1', 'no-endpoint'})
+
+    @override_settings(PUSH_BACKEND='notifications.push.WebPushBackend', VAPID_PUBLIC_KEY='', VAPID_PRIVATE_KEY='')
+    def test_unconfigured_web_push_is_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._notify()
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(LocalPushBackend.outbox, [])
+
+
+@override_settings(PUSH_BACKEND='notifications.push.LocalPushBackend', PUSH_DISPATCH='inline')
+class NewMessageCoalescingTestCase(TestCase):
+    def setUp(self):
+        LocalPushBackend.reset()
+        self.customer = User.objects.create_user(username='chatcust', email='chatcust@t.com', role='user')
+        self.pandit = PanditUser.objects.create_user(
+            username='chatpandit', email='chatpandit@t.com', role='pandit', full_name='Hari Sharma'
+        )
+        PushNotificationToken.objects.create(
+            user=self.customer, token='c', subscription={'endpoint': 'https://push.local/c'}
+        )
+        self.room = ChatRoom.objects.create(customer=self.customer, pandit=self.pandit)
+
+    def _send(self, text):
+        message = Message.objects.create(chat_room=self.room, sender=self.pandit, content=text)
+        with self.captureOnCommitCallbacks(execute=True):
+            return notify_new_message(message)
+
+    def test_messages_in_window_share_one_row_and_push(self):
+        for n in range(4):
+            self._send(f'message {n}')
+
+        notification = Notification.objects.get(user=self.customer)
+        self.assertEqual(notification.event_count, 4)
+        self.assertEqual(notification.title, '4 new messages from Hari Sharma')
+        self.assertEqual(notification.message, 'message 3')
+        self.assertEqual(len(LocalPushBackend.outbox), 1)
+
+    def test_read_or_expired_notification_starts_a_new_one(self):
+        first = self._send('hello')
+        Notification.objects.filter(id=first.id).update(is_read=True)
+        second = self._send('are you there')
+        Notification.objects.filter(id=second.id).update(created_at=timezone.now() - timedelta(hours=1))
+        third = self._send('ping')
+
+        self.assertEqual(len({first.id, second.id, third.id}), 3)
+        self.assertEqual(len(LocalPushBackend.outbox), 3)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PanchangConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'panchang'
+
+    def ready(self):
+        import panchang.signals
@@ -0,0 +1,36 @@
+"""
+Management command to precompute PanchangData for whole years.
+Run with: python manage.py generate_panchang [--bs-year 2083 ...] [--ad-year 2026 ...]
+(defaults to the current and next Bikram Sambat years)
+"""
+import time
+from datetime import date
+
+import nepali_datetime
+from django.core.management.base import BaseCommand
+
+from panchang.precompute import bs_year_bounds, generate_range
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate panchang days for whole BS or AD years (existing days are kept)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bs-year', type=int, action='append', default=[], help='Bikram Sambat year, repeatable')
+        parser.add_argument('--ad-year', type=int, action='append', default=[], help='Gregorian year, repeatable')
+
+    def handle(self, *args, **options):
+        ranges = [(f"BS {y}", *bs_year_bounds(y)) for y in options['bs_year']]
+        ranges += [(f"AD {y}", date(y, 1, 1), date(y, 12, 31)) for y in options['ad_year']]
+        if not ranges:
+            current = nepali_datetime.date.today().year
+            ranges = [(f"BS {y}", *bs_year_bounds(y)) for y in (current, current + 1)]
+
+        total = 0
+        for label, first, last in ranges:
+            started = time.monotonic()
+            created = generate_range(first, last)
+            total += created
+            self.stdout.write(f"{label} ({first} to {last}): {created} days created in {time.monotonic() - started:.1f}s")
+
+        self.stdout.write(self.style.SUCCESS(f"Generated panchang: days={total}"))
@@ -0,0 +1,168 @@
+"""
+Panchang Precompute - Bulk-generated PanchangData and cached date windows.
+
+Whole Bikram Sambat or Gregorian years are computed with Swiss Ephemeris and
+inserted with bulk_create by the generate_panchang command and the
+panchang.tasks.ensure_panchang_years beat job, which keeps the current and
+next BS years filled. PanchangView then only reads: one range query per
+window, cached under a version that is bumped whenever PanchangData changes
+(panchang/signals.py), with an ETag so clients can revalidate for free.
+
+Days that have not been generated yet are computed in memory for the
+response and never written from the request.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+import nepali_datetime
+import swisseph as swe
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import PanchangData
+from .serializers import PanchangSerializer
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "panchang_windows:version"
+BULK_BATCH_SIZE = 500
+
+TITHIS = [
+    "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami",
+    "Shastika", "Saptami", "Ashtami", "Navami", "Dashami",
+    "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Purnima",
+    "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami",
+    "Shastika", "Saptami", "Ashtami", "Navami", "Dashami",
+    "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Amavasya"
+]
+NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra", "Punarvasu",
+    "Pushya", "Ashlesha", "Magha", "Poorva Phalguni", "Uttara Phalguni", "Hasta",
+    "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Moola", "Poorva Ashadha",
+    "Uttara Ashadha", "Shravana", "Dhanishtha", "Shatabhisha", "Poorva Bhadrapada",
+    "Uttara Bhadrapada", "Revati"
+]
+YOGAS = [
+    "Vishkumbha", "Preeti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda",
+    "Sukarma", "Dhriti", "Shoola", "Ganda", "Vriddhi", "Dhruva", "Vyaghata",
+    "Harshana", "Vajra", "Siddhi", "Vyatipata", "Variyan", "Parigha", "Shiva",
+    "Siddha", "Sadhya", "Shubha", "Shukla", "Brahma", "Indra", "Vaidhriti"
+]
+
+
+def compute_day(date_obj):
+    """
+    An unsaved PanchangData for one day, using Swiss Ephemeris and
+    nepali-datetime. None if the date is outside what they support.
+    """
+    try:
+        # 1. Accurate BS Date using nepali-datetime
+        np_date = nepali_datetime.date.from_datetime_date(date_obj)
+        bs_year, bs_month, bs_day = np_date.year, np_date.month, np_date.day
+
+        # 2. Astronomical Tithi/Nakshatra using swisseph
+        # Julian day at 5:30 AM (Kathmandu approximate)
+        jd = swe.julday(date_obj.year, date_obj.month, date_obj.day, 5.5)
+        moon_long = swe.calc_ut(jd, swe.MOON)[0][0]
+        sun_long = swe.calc_ut(jd, swe.SUN)[0][0]
+
+        # Tithi = (Moon - Sun) % 360 / 12
+        tithi_idx = int(((moon_long - sun_long) % 360) / 12)
+        # Nakshatra = Moon_long % 360 / (360/27)
+        nak_idx = int(moon_long / (360 / 27.0))
+        # Yoga = (Sun + Moon) % 360 / (360/27)
+        yoga_idx = int((sun_long + moon_long) % 360 / (360 / 27.0))
+
+        # Festivals and Muhurat (can be enhanced further)
+        festivals = []
+        if bs_month == 11 and bs_day == 5:
+            festivals.append("Basant Panchami")
+        if bs_month == 11 and bs_day == 13:
+            festivals.append("Maha Shivaratri")
+
+        return PanchangData(
+            date=date_obj,
+            bs_date=f"{bs_year}-{bs_month:02d}-{bs_day:02d}",
+            bs_year=bs_year,
+            bs_month=bs_month,
+            bs_day=bs_day,
+            tithi=TITHIS[tithi_idx % 30],
+            nakshatra=NAKSHATRAS[nak_idx % 27],
+            yoga=YOGAS[yoga_idx % 27],
+            karana="Bava" if bs_day % 2 == 0 else "Kaulava",
+            sunrise="06:40:00",
+            sunset="18:20:00",
+            festivals=festivals,
+            muhurat_hints="Auspicious for spiritual activity." if yoga_idx % 5 == 0 else "Routine day for puja.",
+        )
+    except Exception as e:
+        logger.warning(f"Could not calculate panchang for {date_obj}: {e}")
+        return None
+
+
+def bs_year_bounds(bs_year):
+    """First and last Gregorian dates of a Bikram Sambat year."""
+    first = nepali_datetime.date(bs_year, 1, 1).to_datetime_date()
+    last = nepali_datetime.date(bs_year + 1, 1, 1).to_datetime_date() - timedelta(days=1)
+    return first, last
+
+
+def generate_range(first, last):
+    """
+    Compute and insert every missing day from `first` to `last` inclusive.
+    Existing rows are left alone. Returns the number of days created.
+    """
+    existing = set(PanchangData.objects.filter(date__range=(first, last)).values_list('date', flat=True))
+    rows = []
+    day = first
+    while day <= last:
+        if day not in existing and (row := compute_day(day)) is not None:
+            rows.append(row)
+        day += timedelta(days=1)
+
+    PanchangData.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    if rows:
+        # bulk_create sends no signals
+        bump_version()
+    return len(rows)
+
+
+def bump_version():
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def _window_key(start, days):
+    return f"panchang_windows:v{cache.get(VERSION_KEY, 0)}:{start.isoformat()}:{days}"
+
+
+def _ttl():
+    return int(getattr(settings, "PANCHANG_WINDOW_TTL", 60 * 60 * 6))
+
+
+def get_window(start, days):
+    """(etag, serialized days) for `days` days from `start`, cached per version."""
+    key = _window_key(start, days)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    end = start + timedelta(days=days)
+    stored = {p.date: p for p in PanchangData.objects.filter(date__gte=start, date__lt=end).order_by('date')}
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = stored.get(day) or compute_day(day)
+        if row is not None:
+            rows.append(row)
+
+    data = list(PanchangSerializer(rows, many=True).data)
+    etag = hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    cached = (f'"{etag}"', data)
+    cache.set(key, cached, timeout=_ttl())
+    return cached
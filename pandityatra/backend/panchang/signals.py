@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import PanchangData
+from .precompute import bump_version
+
+
+# Cached windows embed the rows, so edits (e.g. from the admin) invalidate them
+@receiver(post_save, sender=PanchangData)
+@receiver(post_delete, sender=PanchangData)
+def invalidate_panchang_windows(sender, instance, **kwargs):
+    transaction.on_commit(bump_version)
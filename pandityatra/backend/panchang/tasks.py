@@ -0,0 +1,17 @@
+from celery import shared_task
+
+
+@shared_task(name='panchang.tasks.ensure_panchang_years')
+def ensure_panchang_years(years_ahead=1):
+    """
+    Fill in any missing PanchangData for the current BS year and the next
+    `years_ahead` years
+    """
+    import nepali_datetime
+    from .precompute import bs_year_bounds, generate_range
+
+    current = nepali_datetime.date.today().year
+    created = 0
+    for bs_year in range(current, current + years_ahead + 1):
+        created += generate_range(*bs_year_bounds(bs_year))
+    return created
@@ -1,3 +1,63 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import PanchangData
+from .precompute import bs_year_bounds, generate_range
+
+
+class PanchangPrecomputeTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/panchang/data/'
+
+    def test_generate_range_bulk_creates_missing_days(self):
+        self.assertEqual(generate_range(date(2026, 1, 1), date(2026, 1, 10)), 10)
+        # Existing days are kept
+        self.assertEqual(generate_range(date(2026, 1, 5), date(2026, 1, 15)), 5)
+        self.assertEqual(PanchangData.objects.count(), 15)
+
+    def test_bs_year_bounds_cover_a_whole_year(self):
+        first, last = bs_year_bounds(2082)
+        self.assertIn((last - first).days + 1, range(365, 367))
+
+    def test_window_is_cached_with_etag(self):
+        generate_range(date(2026, 1, 1), date(2026, 1, 7))
+        params = {'date': '2026-01-01', 'days': 7}
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 7)
+        etag = response['ETag']
+        # Clients must revalidate so a regenerated window is never served stale
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, params)
+        self.assertEqual(again.data, response.data)
+
+        not_modified = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_edits_invalidate_cached_windows(self):
+        generate_range(date(2026, 1, 1), date(2026, 1, 1))
+        params = {'date': '2026-01-01'}
+        self.client.get(self.url, params)
+        day = PanchangData.objects.get()
+        day.tithi = 'Purnima'
+        with self.captureOnCommitCallbacks(execute=True):
+            day.save()
+        self.assertEqual(self.client.get(self.url, params).data[0]['tithi'], 'Purnima')
+
+    def test_missing_days_are_computed_without_writing(self):
+        response = self.client.get(self.url, {'date': '2026-02-01', 'days': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertFalse(PanchangData.objects.exists())
 
-# Create your tests here.
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'date': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'days': 'x'}).status_code, 400)
@@ -1,14 +1,14 @@
-import requests
-import swisseph as swe
-from datetime import datetime, timedelta, date as py_date
-import nepali_datetime
+from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .models import PanchangData
+from .precompute import get_window
 from .serializers import PanchangSerializer
 from drf_spectacular.utils import extend_schema
 
+MAX_DAYS = 31
+
+
 class PanchangView(APIView):
     permission_classes = [AllowAny]
     serializer_class = PanchangSerializer
@@ -16,109 +16,26 @@ class PanchangView(APIView):
     @extend_schema(summary="Get Panchang Data")
     def get(self, request):
         date_str = request.query_params.get('date', datetime.now().strftime('%Y-%m-%d'))
-        days = int(request.query_params.get('days', 1))
-        
-        days = min(days, 31)
+        try:
+            days = int(request.query_params.get('days', 1))
+        except ValueError:
+            return Response({"error": "days must be an integer."}, status=400)
+        days = max(1, min(days, MAX_DAYS))
         
         try:
             start_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
-            
-        results = []
-        for i in range(days):
-            current_date = start_date + timedelta(days=i)
-            panchang = PanchangData.objects.filter(date=current_date).first()
-            if not panchang:
-                panchang = self.calculate_panchang_data(current_date)
-            
-            if panchang:
-                results.append(panchang)
-        
-        serializer = PanchangSerializer(results, many=True)
-        return Response(serializer.data)
-
-    def calculate_panchang_data(self, date_obj):
-        """
-        Uses Swiss Ephemeris and nepali-datetime for real calculation.
-        """
-        try:
-            # 1. Accurate BS Date using nepali-datetime
-            np_date = nepali_datetime.date.from_datetime_date(date_obj)
-            bs_year = np_date.year
-            bs_month = np_date.month
-            bs_day = np_date.day
-            
-            # 2. Astronomical Tithi/Nakshatra using swisseph
-            # Julian day at 5:30 AM (Kathmandu approximate)
-            jd = swe.julday(date_obj.year, date_obj.month, date_obj.day, 5.5)
-            
-            # Moon / Sun longitudes
-            moon_res, _ = swe.calc_ut(jd, swe.MOON)
-            sun_res, _ = swe.calc_ut(jd, swe.SUN)
-            
-            moon_long = moon_res[0]
-            sun_long = sun_res[0]
-            
-            # Tithi = (Moon - Sun) % 360 / 12
-            diff = (moon_long - sun_long) % 360
-            tithi_idx = int(diff / 12)
-            
-            tithis = [
-                "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami", 
-                "Shastika", "Saptami", "Ashtami", "Navami", "Dashami", 
-                "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Purnima",
-                "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami", 
-                "Shastika", "Saptami", "Ashtami", "Navami", "Dashami", 
-                "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Amavasya"
-            ]
-            # Adjust index for Shukla/Krishna Paksha (rough)
-            tithi = tithis[tithi_idx % 30]
-            
-            # Nakshatra = Moon_long % 360 / (360/27)
-            nak_idx = int(moon_long / (360/27.0))
-            nakshatras = [
-                "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra", "Punarvasu",
-                "Pushya", "Ashlesha", "Magha", "Poorva Phalguni", "Uttara Phalguni", "Hasta",
-                "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Moola", "Poorva Ashadha",
-                "Uttara Ashadha", "Shravana", "Dhanishtha", "Shatabhisha", "Poorva Bhadrapada",
-                "Uttara Bhadrapada", "Revati"
-            ]
-            nakshatra = nakshatras[nak_idx % 27]
-
-            # Yoga = (Sun + Moon) % 360 / (360/27)
-            yoga_idx = int((sun_long + moon_long) % 360 / (360/27.0))
-            yogas = [
-                "Vishkumbha", "Preeti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda",
-                "Sukarma", "Dhriti", "Shoola", "Ganda", "Vriddhi", "Dhruva", "Vyaghata",
-                "Harshana", "Vajra", "Siddhi", "Vyatipata", "Variyan", "Parigha", "Shiva",
-                "Siddha", "Sadhya", "Shubha", "Shukla", "Brahma", "Indra", "Vaidhriti"
-            ]
-            yoga = yogas[yoga_idx % 27]
 
-            # Festivals and Muhurat (can be enhanced further)
-            festivals = []
-            if bs_month == 11 and bs_day == 5: festivals.append("Basant Panchami")
-            if bs_month == 11 and bs_day == 13: festivals.append("Maha Shivaratri")
-            
-            panchang, _ = PanchangData.objects.get_or_create(
-                date=date_obj,
-                defaults={
-                    "bs_date": f"{bs_year}-{bs_month:02d}-{bs_day:02d}", 
-                    "bs_year": bs_year,
-                    "bs_month": bs_month,
-                    "bs_day": bs_day,
-                    "tithi": tithi,
-                    "nakshatra": nakshatra,
-                    "yoga": yoga,
-                    "karana": "Bava" if bs_day % 2 == 0 else "Kaulava",
-                    "sunrise": "06:40:00",
-                    "sunset": "18:20:00",
-                    "festivals": festivals,
-                    "muhurat_hints": "Auspicious for spiritual activity." if yoga_idx % 5 == 0 else "Routine day for puja.",
-                }
-            )
-            return panchang
-        except Exception as e:
-            print(f"Error calculating panchang: {e}")
-            return None
+        # Days are precomputed (see panchang/precompute.py), so this is one
+        # range query on a cache miss and none on a hit
+        etag, data = get_window(start_date, days)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=304)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        # Revalidate every time: the ETag changes as soon as days are regenerated,
+        # and a 304 costs no queries
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,168 @@
+"""
+Pandit Dashboard Snapshot - Builds and caches the payload for pandit_dashboard_stats.
+
+All booking counters and earnings come from one conditional aggregate, and
+the schedule, queue and next puja are sliced from a single ordered scan of
+upcoming bookings. The result is cached per pandit per day and dropped by
+the signals in pandits/signals.py whenever a booking, message, wallet or the
+pandit profile changes. Whether each customer is online changes too often to
+cache, so it is read from chat.presence on every request.
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStatus
+from chat import presence, unread
+from .models import PanditWallet
+
+DASHBOARD_CACHE_TTL = 300  # seconds; invalidation normally clears it sooner
+QUEUE_SIZE = 10
+
+QUEUE_EXCLUDED_STATUSES = {BookingStatus.COMPLETED, BookingStatus.CANCELLED, BookingStatus.FAILED}
+
+
+def _cache_key(pandit_id, today=None):
+    today = today or timezone.localtime().date()
+    return f"pandit_dashboard:{pandit_id}:{today.isoformat()}"
+
+
+def invalidate_dashboard(pandit_id):
+    """Drop the cached snapshot for a pandit (no-op if none is cached)."""
+    if pandit_id:
+        cache.delete(_cache_key(pandit_id))
+
+
+def _payment_fields(b):
+    return {
+        "payment_status": b.payment_status,
+        "payment_method": b.payment_method,
+        "transaction_id": b.transaction_id,
+    }
+
+
+def build_dashboard_snapshot(pandit, today=None):
+    """Compute the dashboard payload without touching the cache."""
+    today = today or timezone.localtime().date()
+    week_start = today - datetime.timedelta(days=today.weekday())
+    completed = Q(status=BookingStatus.COMPLETED)
+
+    # 1. Counters & earnings in one pass
+    totals = Booking.objects.filter(pandit=pandit).aggregate(
+        todays_bookings=Count('id', filter=Q(booking_date=today)),
+        pending_requests=Count('id', filter=Q(status=BookingStatus.PENDING)),
+        todays_earnings=Sum('total_fee', filter=completed & Q(booking_date=today)),
+        week_earnings=Sum('total_fee', filter=completed & Q(booking_date__gte=week_start)),
+        month_earnings=Sum(
+            'total_fee',
+            filter=completed & Q(booking_date__year=today.year, booking_date__month=today.month),
+        ),
+    )
+
+    wallet, _ = PanditWallet.objects.get_or_create(pandit=pandit)
+
+    # 2-4. Next puja, today's schedule and queue from one ordered scan
+    upcoming = Booking.objects.filter(
+        pandit=pandit,
+        booking_date__gte=today,
+    ).select_related('user').order_by('booking_date', 'booking_time')
+
+    next_puja_data = None
+    schedule_data = []
+    queue_data = []
+    for b in upcoming.iterator(chunk_size=50):
+        if b.booking_date == today:
+            schedule_data.append({
+                "id": b.id,
+                "title": b.service_name,
+                "time": b.booking_time,
+                "customer": b.user.full_name,
+                "customer_id": b.user_id,
+                "status": b.status,
+                # Video link only if status is Accepted
+                "video_link": (b.daily_room_url or b.video_room_url) if b.status == BookingStatus.ACCEPTED else None,
+                **_payment_fields(b),
+            })
+
+        if next_puja_data is None and b.status == BookingStatus.ACCEPTED:
+            next_puja_data = {
+                "id": b.id,
+                "customerName": b.user.full_name,
+                "customerId": b.user_id,
+                "pujaName": b.service_name,
+                "date": b.booking_date,
+                "time": b.booking_time,
+                "location": b.service_location,
+                "status": b.status,
+                "videoLink": b.daily_room_url or b.video_room_url,
+                **_payment_fields(b),
+            }
+
+        if len(queue_data) < QUEUE_SIZE and b.status not in QUEUE_EXCLUDED_STATUSES:
+            queue_data.append({
+                "id": b.id,
+                "customer": b.user.full_name,
+                "customer_id": b.user_id,
+                "service": b.service_name,
+                "date": b.booking_date,
+                "time": b.booking_time,
+                "status": b.status,
+                **_payment_fields(b),
+            })
+
+        if b.booking_date > today and next_puja_data is not None and len(queue_data) >= QUEUE_SIZE:
+            break
+
+    # 5. Unread messages (stored counters, see chat/unread.py)
+    unread_messages_count = unread.total_for(pandit.id)
+
+    stats_data = {
+        "todays_bookings": totals['todays_bookings'],
+        "pending_requests": totals['pending_requests'],
+        "todays_earnings": totals['todays_earnings'] or 0,
+        "available_balance": wallet.available_balance,
+        "total_earned": wallet.total_earned,
+        "week_earnings": totals['week_earnings'] or 0,
+        "month_earnings": totals['month_earnings'] or 0,
+        "unread_messages": unread_messages_count,
+        "is_online": getattr(pandit, 'is_available', False),
+        "is_verified": getattr(pandit, 'is_verified', False),
+        "verification_status": getattr(pandit, 'verification_status', 'PENDING')
+    }
+
+    return {
+        "stats": stats_data,
+        "next_puja": next_puja_data,
+        "schedule": schedule_data,
+        "queue": queue_data
+    }
+
+
+def get_dashboard_snapshot(pandit):
+    """Cached dashboard payload for a pandit, rebuilt on a miss."""
+    today = timezone.localtime().date()
+    key = _cache_key(pandit.id, today)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard_snapshot(pandit, today)
+        cache.set(key, snapshot, timeout=DASHBOARD_CACHE_TTL)
+    return with_presence(snapshot)
+
+
+def with_presence(snapshot):
+    """Copy of the snapshot with customer_online set on each booking entry."""
+    next_puja = snapshot["next_puja"]
+    entries = snapshot["schedule"] + snapshot["queue"]
+    customer_ids = {e.get("customer_id") for e in entries}
+    if next_puja:
+        customer_ids.add(next_puja.get("customerId"))
+    online = presence.online_users(customer_ids)
+
+    return {
+        **snapshot,
+        "next_puja": next_puja and {**next_puja, "customerOnline": next_puja.get("customerId") in online},
+        "schedule": [{**e, "customer_online": e.get("customer_id") in online} for e in snapshot["schedule"]],
+        "queue": [{**e, "customer_online": e.get("customer_id") in online} for e in snapshot["queue"]],
+    }
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import PanditUser, PanditWallet
+from .dashboard import invalidate_dashboard
+from bookings.models import Booking
+from chat.models import ChatRoom, Message
 
 @receiver(post_save, sender=PanditUser)
 def create_wallet(sender, instance, created, **kwargs):
@@ -10,3 +13,25 @@ def create_wallet(sender, instance, created, **kwargs):
         # Ensure wallet exists for existing pandits (self-healing)
         if not hasattr(instance, 'wallet'):
             PanditWallet.objects.create(pandit=instance)
+        invalidate_dashboard(instance.id)
+
+
+# Dashboard snapshot invalidation
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_dashboard_on_booking(sender, instance, **kwargs):
+    invalidate_dashboard(instance.pandit_id)
+
+
+@receiver(post_save, sender=PanditWallet)
+def invalidate_dashboard_on_wallet(sender, instance, **kwargs):
+    invalidate_dashboard(instance.pandit_id)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_dashboard_on_message(sender, instance, **kwargs):
+    try:
+        invalidate_dashboard(instance.chat_room.pandit_id)
+    except ChatRoom.DoesNotExist:
+        pass
@@ -3,7 +3,7 @@ from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import PanditUser, PanditWallet
+from .models import PanditUser, PanditWallet, PanditService
 
 User = get_user_model()
 
@@ -28,6 +28,52 @@ class PanditEndpointTests(APITestCase):
         self.assertIn('stats', response.data)
         self.assertEqual(float(response.data['stats']['available_balance']), 1000.0)
 
+    def test_dashboard_stats_snapshot_is_cached_and_invalidated(self):
+        from datetime import time
+        from django.utils import timezone
+        from bookings.models import Booking, BookingStatus
+
+        url = "/api/pandits/dashboard/stats/"
+        customer = User.objects.create_user(
+            username='dashcust', email='dash@t.com', password='p', role='user', full_name='Dash Customer'
+        )
+        today = timezone.localtime().date()
+        Booking.objects.create(
+            user=customer, pandit=self.pandit, service_name='Puja', booking_date=today,
+            booking_time=time(9, 0), status=BookingStatus.COMPLETED, total_fee=500
+        )
+        Booking.objects.create(
+            user=customer, pandit=self.pandit, service_name='Puja', booking_date=today,
+            booking_time=time(11, 0), status=BookingStatus.ACCEPTED
+        )
+
+        response = self.client.get(url)
+        stats = response.data['stats']
+        self.assertEqual(stats['todays_bookings'], 2)
+        self.assertEqual(float(stats['todays_earnings']), 500.0)
+        self.assertEqual(len(response.data['schedule']), 2)
+        self.assertEqual(response.data['next_puja']['customerName'], 'Dash Customer')
+        self.assertEqual(len(response.data['queue']), 1)
+
+        self.assertFalse(response.data['next_puja']['customerOnline'])
+
+        # Served from cache: no queries on the second poll, presence included
+        from chat import presence
+        presence.touch(f'notifications_{customer.id}', customer.id, 'test-channel')
+        with self.assertNumQueries(0):
+            from pandits.dashboard import get_dashboard_snapshot
+            snapshot = get_dashboard_snapshot(self.pandit)
+        self.assertTrue(snapshot['next_puja']['customerOnline'])
+        self.assertTrue(all(entry['customer_online'] for entry in snapshot['schedule']))
+
+        Booking.objects.create(
+            user=customer, pandit=self.pandit, service_name='Puja', booking_date=today,
+            booking_time=time(15, 0), status=BookingStatus.PENDING
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.data['stats']['todays_bookings'], 3)
+        self.assertEqual(response.data['stats']['pending_requests'], 1)
+
     def test_wallet_endpoint(self):
         url = "/api/pandits/wallet/"
         response = self.client.get(url)
@@ -39,3 +85,50 @@ class PanditEndpointTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsInstance(response.data, list)
+
+
+class PanditAvailableAtTests(APITestCase):
+    def setUp(self):
+        from datetime import date, time
+        from bookings.models import Booking, BookingStatus
+        from services.models import Puja
+
+        self.client = APIClient()
+        self.puja = Puja.objects.create(name='Satyanarayan Puja', description='d', base_duration_minutes=60)
+        self.busy = PanditUser.objects.create_user(
+            username='busypandit', email='busy@t.com', password='p', role='pandit',
+            expertise="Satyanarayan", language="Nepali", verification_status="APPROVED", is_verified=True
+        )
+        self.free = PanditUser.objects.create_user(
+            username='freepandit', email='free@t.com', password='p', role='pandit',
+            expertise="Satyanarayan", language="Hindi", verification_status="APPROVED", is_verified=True
+        )
+        for pandit in (self.busy, self.free):
+            PanditService.objects.create(pandit=pandit, puja=self.puja, custom_price=1000, duration_minutes=60)
+        customer = User.objects.create_user(username='cust', email='c@t.com', password='p', role='user')
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=customer, pandit=self.busy, service=self.puja, service_name=self.puja.name,
+                booking_date=date(2030, 3, 2), booking_time=time(10, 30), status=BookingStatus.ACCEPTED
+            )
+
+    def test_available_at_excludes_busy_pandits(self):
+        url = "/api/pandits/available-at/"
+        response = self.client.get(url, {"date": "2030-03-02", "time": "10:00", "puja_id": self.puja.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.free.id])
+
+        response = self.client.get(url, {"date": "2030-03-02", "time": "11:30", "puja_id": self.puja.id})
+        self.assertEqual({p['id'] for p in response.data}, {self.busy.id, self.free.id})
+
+        response = self.client.get(url, {"date": "2030-03-02", "time": "11:30", "language": "nepali"})
+        self.assertEqual([p['id'] for p in response.data], [self.busy.id])
+
+    def test_available_at_validates_input(self):
+        response = self.client.get("/api/pandits/available-at/", {"date": "2030-03-02", "time": "21:00"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            "/api/pandits/available-at/", {"date": "2030-03-02", "time": "10:00", "puja_id": "abc"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
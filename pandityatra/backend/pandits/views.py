@@ -285,9 +285,8 @@ def delete_availability_block(request, block_id):
 # PANDIT: Dashboard Stats
 # ---------------------------
 from bookings.models import Booking, BookingStatus
-from django.db.models import Sum
 from .models import PanditWallet
-from chat.models import Message, ChatRoom
+from .dashboard import get_dashboard_snapshot
 import datetime
 
 @api_view(['GET'])
@@ -309,126 +308,7 @@ def pandit_dashboard_stats(request):
         else:
              return Response({"error": "User is not a pandit"}, status=403)
         
-    today = timezone.localtime().date()
-    
-    # 1. Stats
-    todays_bookings_count = Booking.objects.filter(pandit=pandit, booking_date=today).count()
-    pending_requests_count = Booking.objects.filter(pandit=pandit, status=BookingStatus.PENDING).count()
-    
-    todays_earnings = Booking.objects.filter(
-        pandit=pandit, 
-        booking_date=today, 
-        status=BookingStatus.COMPLETED
-    ).aggregate(total=Sum('total_fee'))['total'] or 0
-
-    wallet, created = PanditWallet.objects.get_or_create(pandit=pandit)
-    
-    # 2. Next Puja
-    now = timezone.localtime()
-    next_puja = Booking.objects.filter(
-        pandit=pandit,
-        status=BookingStatus.ACCEPTED,
-        booking_date__gte=today
-    ).order_by('booking_date', 'booking_time').first()
-    
-    next_puja_data = None
-    if next_puja:
-        next_puja_data = {
-            "id": next_puja.id,
-            "customerName": next_puja.user.full_name,
-            "pujaName": next_puja.service_name,
-            "date": next_puja.booking_date,
-            "time": next_puja.booking_time,
-            "location": next_puja.service_location,
-            "status": next_puja.status,
-            "videoLink": next_puja.daily_room_url or next_puja.video_room_url,
-            "payment_status": next_puja.payment_status,
-            "payment_method": next_puja.payment_method,
-            "transaction_id": next_puja.transaction_id,
-        }
-
-    # 3. Today's Schedule (NEW)
-    todays_schedule = Booking.objects.filter(
-        pandit=pandit,
-        booking_date=today
-    ).order_by('booking_time')
-
-    schedule_data = []
-    for b in todays_schedule:
-        schedule_data.append({
-            "id": b.id,
-            "title": b.service_name,
-            "time": b.booking_time,
-            "customer": b.user.full_name,
-            "status": b.status,
-             # Video link only if status is Accepted
-            "video_link": (b.daily_room_url or b.video_room_url) if b.status == BookingStatus.ACCEPTED else None,
-            "payment_status": b.payment_status,
-            "payment_method": b.payment_method,
-            "transaction_id": b.transaction_id,
-        })
-
-    # 4. Booking Queue (Top 5 pending/upcoming)
-    queue = Booking.objects.filter(
-        pandit=pandit,
-        booking_date__gte=today
-    ).exclude(status__in=[BookingStatus.COMPLETED, BookingStatus.CANCELLED, BookingStatus.FAILED]).order_by('booking_date', 'booking_time')[:10]
-    
-    queue_data = []
-    for b in queue:
-        queue_data.append({
-            "id": b.id,
-            "customer": b.user.full_name,
-            "service": b.service_name,
-            "date": b.booking_date,
-            "time": b.booking_time,
-            "status": b.status,
-            "payment_status": b.payment_status,
-            "payment_method": b.payment_method,
-            "transaction_id": b.transaction_id,
-        })
-        
-    # 5. Earnings Snapshot
-    week_start = today - datetime.timedelta(days=today.weekday())
-    week_earnings = Booking.objects.filter(
-        pandit=pandit,
-        booking_date__gte=week_start,
-        status=BookingStatus.COMPLETED
-    ).aggregate(total=Sum('total_fee'))['total'] or 0
-    
-    month_earnings = Booking.objects.filter(
-        pandit=pandit,
-        booking_date__month=today.month,
-        booking_date__year=today.year,
-        status=BookingStatus.COMPLETED
-    ).aggregate(total=Sum('total_fee'))['total'] or 0
-
-    # 6. Unread Messages Count
-    unread_messages_count = Message.objects.filter(
-        chat_room__pandit=pandit,
-        is_read=False
-    ).exclude(sender=request.user).count()
-    
-    stats_data = {
-        "todays_bookings": todays_bookings_count,
-        "pending_requests": pending_requests_count,
-        "todays_earnings": todays_earnings,
-        "available_balance": wallet.available_balance,
-        "total_earned": wallet.total_earned,
-        "week_earnings": week_earnings,
-        "month_earnings": month_earnings,
-        "unread_messages": unread_messages_count,
-        "is_online": getattr(pandit, 'is_available', False),
-        "is_verified": getattr(pandit, 'is_verified', False),
-        "verification_status": getattr(pandit, 'verification_status', 'PENDING')
-    }
-
-    return Response({
-        "stats": stats_data,
-        "next_puja": next_puja_data,
-        "schedule": schedule_data, # Return Today's Schedule
-        "queue": queue_data
-    })
+    return Response(get_dashboard_snapshot(pandit))
 
 
 # ---------------------------
@@ -564,6 +444,65 @@ class PanditViewSet(viewsets.ModelViewSet):
             "last_updated": timezone.now()
         })
 
+    @extend_schema(
+        summary="Public: Pandits free at a given date and time",
+        parameters=[
+            OpenApiParameter('date', str, required=True, description='YYYY-MM-DD'),
+            OpenApiParameter('time', str, required=True, description='HH:MM'),
+            OpenApiParameter('puja_id', int, description='Only pandits offering this puja'),
+            OpenApiParameter('language', str),
+            OpenApiParameter('expertise', str),
+        ],
+        responses={200: PanditSerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'], url_path='available-at', permission_classes=[permissions.AllowAny])
+    def available_at(self, request):
+        """
+        Which verified pandits are free at this date/time, answered from the
+        per-day slot bitmaps instead of looping available_slots per pandit.
+        """
+        from bookings.availability import (
+            DAY_END, DAY_START, free_pandits_at, resolve_duration,
+        )
+
+        date_str = request.query_params.get('date')
+        time_str = request.query_params.get('time')
+        puja_id = request.query_params.get('puja_id')
+        language = request.query_params.get('language')
+        expertise = request.query_params.get('expertise')
+
+        if not date_str or not time_str:
+            return Response({"detail": "date and time required"}, status=400)
+
+        try:
+            day = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+            start = datetime.datetime.strptime(time_str, "%H:%M").time()
+        except ValueError:
+            return Response({"detail": "Invalid date/time format. Use YYYY-MM-DD and HH:MM."}, status=400)
+
+        if puja_id:
+            try:
+                puja_id = int(puja_id)
+            except ValueError:
+                return Response({"detail": "puja_id must be an integer"}, status=400)
+
+        duration_minutes = resolve_duration(puja_id)
+        end = (datetime.datetime.combine(day, start) + datetime.timedelta(minutes=duration_minutes)).time()
+        if start < DAY_START or end > DAY_END or end <= start:
+            return Response({"detail": "Requested time is outside bookable hours"}, status=400)
+
+        queryset = PanditUser.objects.filter(is_verified=True)
+        if puja_id:
+            queryset = queryset.filter(services__puja_id=puja_id, services__is_active=True)
+        if language:
+            queryset = queryset.filter(language__icontains=language)
+        if expertise:
+            queryset = queryset.filter(expertise__icontains=expertise)
+
+        queryset = free_pandits_at(queryset, day, start, duration_minutes).distinct().order_by('-rating')
+        serializer = PanditSerializer(queryset, many=True, context={'request': request})
+        return Response(serializer.data)
+
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
         pandit = self.get_object()
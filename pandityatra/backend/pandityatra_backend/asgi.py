@@ -17,6 +17,7 @@ django_asgi_app = get_asgi_application()
 from chat import routing as chat_routing  # noqa: E402
 from video import routing as video_routing  # noqa: E402
 from bug_reports import routing as bug_routing  # noqa: E402
+from ai import routing as ai_routing  # noqa: E402
 from chat.middleware import JWTAuthMiddleware  # noqa: E402
 
 application = ProtocolTypeRouter({
@@ -26,7 +27,8 @@ application = ProtocolTypeRouter({
             URLRouter(
                 chat_routing.websocket_urlpatterns + 
                 video_routing.websocket_urlpatterns +
-                bug_routing.websocket_urlpatterns
+                bug_routing.websocket_urlpatterns +
+                ai_routing.websocket_urlpatterns
             )
         )
     ),
@@ -1,6 +1,7 @@
 """
 Django settings for pandityatra_backend project.
 """
+import logging
 import os
 import dj_database_url
 from pathlib import Path
@@ -153,6 +154,47 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache (dashboard snapshots, counters). Set CACHE_REDIS_URL (defaults to
+# REDIS_URL) so every gunicorn/daphne worker sees the same entries; falls back to
+# per-process memory only when neither is set.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', os.getenv('REDIS_URL', ''))
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+        # AI guide answers; eviction follows the Redis maxmemory-policy (allkeys-lru)
+        'ai_responses': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'ai_resp',
+            'TIMEOUT': int(os.getenv('AI_RESPONSE_CACHE_TTL', '3600')),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        # LocMemCache evicts least-recently-used entries past MAX_ENTRIES
+        'ai_responses': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ai-responses',
+            'TIMEOUT': int(os.getenv('AI_RESPONSE_CACHE_TTL', '3600')),
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('AI_RESPONSE_CACHE_MAX_ENTRIES', '2000'))},
+        },
+    }
+    if not DEBUG:
+        logging.getLogger(__name__).warning(
+            "DEBUG is off but the cache is per-process memory (LocMemCache): set CACHE_REDIS_URL "
+            "or REDIS_URL so counters, dashboards and locks are shared between workers."
+        )
+
+# OTP storage backend: 'cache' (needs CACHE_REDIS_URL to be shared) or 'db'.
+# Empty picks 'cache' when CACHE_REDIS_URL is set, otherwise 'db'.
+OTP_STORE_BACKEND = os.getenv('OTP_STORE_BACKEND', '')
+
 # For local development without Docker, use in-memory channel layer:
 # CHANNEL_LAYERS = {
 #     "default": {
@@ -422,6 +464,15 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Installed into django_celery_beat by the DatabaseScheduler on startup
+CELERY_BEAT_SCHEDULE = {
+    'ensure-panchang-years': {
+        'task': 'panchang.tasks.ensure_panchang_years',
+        'schedule': 60 * 60 * 24,
+    },
+}
+# Cached /api/panchang/data/ windows; new or edited days invalidate them sooner
+PANCHANG_WINDOW_TTL = int(os.environ.get('PANCHANG_WINDOW_TTL', str(60 * 60 * 6)))
 
 # CORS Configuration
 # Standard CORS hardening: Disable wildcard in production
@@ -471,6 +522,10 @@ ESEWA_API_URL = os.environ.get('ESEWA_API_URL', 'https://epay.esewa.com.np')
 # Daily.co (for video calls)
 DAILY_API_KEY = os.environ.get('DAILY_API_KEY', '')
 DAILY_ENABLE_RECORDING = os.environ.get('DAILY_ENABLE_RECORDING', 'False').lower() in ('true', '1', 'yes', 'on')
+# Point at a local stand-in (video/services/daily_standin.py) to run the recordings sync offline
+DAILY_API_BASE_URL = os.environ.get('DAILY_API_BASE_URL', 'https://api.daily.co/v1')
+DAILY_API_CONNECT_TIMEOUT = float(os.environ.get('DAILY_API_CONNECT_TIMEOUT', '3.05'))
+DAILY_API_READ_TIMEOUT = float(os.environ.get('DAILY_API_READ_TIMEOUT', '15'))
 
 # WebRTC TURN/STUN (Coturn)
 TURN_ENABLED = os.environ.get('TURN_ENABLED', 'False').lower() in ('true', '1', 'yes', 'on')
@@ -497,6 +552,36 @@ STUN_URLS = [
 VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY', '')
 VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY', '')
 VAPID_ADMIN_EMAIL = os.environ.get('VAPID_ADMIN_EMAIL', 'mailto:admin@pandityatra.com')
+# celery | thread | inline; unset picks thread while Celery runs eagerly
+PUSH_DISPATCH = os.environ.get('PUSH_DISPATCH', '')
+PUSH_BACKEND = os.environ.get('PUSH_BACKEND', 'notifications.push.WebPushBackend')
+PUSH_DISPATCH_WORKERS = int(os.environ.get('PUSH_DISPATCH_WORKERS', '4'))
+PUSH_SEND_WORKERS = int(os.environ.get('PUSH_SEND_WORKERS', '8'))
+PUSH_TIMEOUT_SECONDS = float(os.environ.get('PUSH_TIMEOUT_SECONDS', '10'))
+# Chat messages to the same recipient and room within this window share one notification
+NEW_MESSAGE_COALESCE_SECONDS = int(os.environ.get('NEW_MESSAGE_COALESCE_SECONDS', '300'))
+# Chat unread totals are cached this long when the cache is shared (CACHE_REDIS_URL)
+CHAT_UNREAD_CACHE_SECONDS = int(os.environ.get('CHAT_UNREAD_CACHE_SECONDS', '300'))
+# sync: chat consumers save a message before broadcasting it
+# deliver_first: broadcast at once and insert in batches from a background writer
+CHAT_DELIVERY_MODE = os.environ.get('CHAT_DELIVERY_MODE', 'sync')
+CHAT_WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get('CHAT_WRITE_BEHIND_FLUSH_SECONDS', '0.2'))
+CHAT_WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('CHAT_WRITE_BEHIND_BATCH_SIZE', '50'))
+# Presence keys expire this long after the last heartbeat (clients beat well within it)
+PRESENCE_TTL_SECONDS = int(os.environ.get('PRESENCE_TTL_SECONDS', '60'))
+# Recording finalize: celery | thread | inline (unset picks thread while Celery runs eagerly)
+RECORDING_FINALIZE_DISPATCH = os.environ.get('RECORDING_FINALIZE_DISPATCH', '')
+RECORDING_ASSEMBLY_WORKERS = int(os.environ.get('RECORDING_ASSEMBLY_WORKERS', '4'))
+# A queued/assembling finalize with no progress for this long is queued again
+RECORDING_FINALIZE_STALE_SECONDS = int(os.environ.get('RECORDING_FINALIZE_STALE_SECONDS', '600'))
+# run_video_jobs: seconds between runs of each periodic video command
+VIDEO_JOBS = {
+    'send_video_reminders': int(os.environ.get('VIDEO_REMINDER_INTERVAL_SECONDS', '60')),
+    'check_video_timeouts': int(os.environ.get('VIDEO_TIMEOUT_CHECK_INTERVAL_SECONDS', '60')),
+    'fetch_daily_recordings': int(os.environ.get('VIDEO_RECORDINGS_FETCH_INTERVAL_SECONDS', '900')),
+}
+VIDEO_JOBS_JITTER_SECONDS = float(os.environ.get('VIDEO_JOBS_JITTER_SECONDS', '5'))
+VIDEO_JOBS_LEADER_TTL = int(os.environ.get('VIDEO_JOBS_LEADER_TTL', '30'))
 
 # Frontend URL (for payment redirects)
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:5173')
@@ -504,5 +589,8 @@ FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:5173')
 # AI Configuration
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
+GROQ_TIMEOUT_SECONDS = float(os.environ.get('GROQ_TIMEOUT_SECONDS', '20'))
+GROQ_MAX_RETRIES = int(os.environ.get('GROQ_MAX_RETRIES', '2'))
+GROQ_MAX_CONNECTIONS = int(os.environ.get('GROQ_MAX_CONNECTIONS', '20'))
 OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://ollama:7070')
 
@@ -0,0 +1,59 @@
+"""
+Recommendation Bundles - Precomputed, ranked recommendations per puja.
+
+Each puja's active SamagriRecommendations are loaded once (with the item,
+its category and vendor, and the puja joined in) in the order the API
+returns them, and cached under a key carrying a global version. Saving or
+deleting a SamagriRecommendation, SamagriItem or Puja bumps the version
+after commit (recommender/signals.py), so stale bundles are never read and
+simply expire.
+
+Callers filter by confidence and slice in memory; the ranking itself is
+never recomputed per request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import SamagriRecommendation
+
+VERSION_KEY = "recommender_bundles:version"
+BUNDLE_ORDERING = ('-is_essential', '-confidence_score', 'priority')
+
+
+def _ttl():
+    return int(getattr(settings, "RECOMMENDER_BUNDLE_TTL", 60 * 60))
+
+
+def _version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def _bundle_key(puja_id, version):
+    return f"recommender_bundles:v{version}:puja{puja_id}"
+
+
+def build_bundle(puja_id):
+    return list(
+        SamagriRecommendation.objects.filter(puja_id=puja_id, is_active=True)
+        .select_related('puja', 'samagri_item__category', 'samagri_item__vendor')
+        .order_by(*BUNDLE_ORDERING)
+    )
+
+
+def get_bundle(puja_id):
+    """Ranked active recommendations for a puja, built on first use per version."""
+    key = _bundle_key(puja_id, _version())
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_bundle(puja_id)
+        cache.set(key, bundle, timeout=_ttl())
+    return bundle
+
+
+def bump_version():
+    """Invalidate every cached bundle."""
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
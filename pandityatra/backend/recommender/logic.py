@@ -11,6 +11,7 @@ Current: Rule-based recommendations with confidence scoring
 from datetime import datetime, timedelta
 from decimal import Decimal
 from django.utils import timezone
+from .bundles import get_bundle
 from .models import SamagriRecommendation, UserSamagriPreference, RecommendationLog
 from samagri.models import SamagriItem
 from bookings.models import BookingSamagriItem, Booking
@@ -37,15 +38,10 @@ class SamagriRecommender:
             min_confidence: Minimum confidence score (0.0-1.0)
         
         Returns:
-            Queryset of SamagriRecommendation objects
+            List of SamagriRecommendation objects, from the cached puja bundle
         """
-        recommendations = SamagriRecommendation.objects.filter(
-            puja=self.puja,
-            is_active=True,
-            confidence_score__gte=min_confidence
-        ).order_by('-is_essential', '-confidence_score', 'priority')[:limit]
-        
-        return recommendations
+        ranked = get_bundle(self.puja.id) if self.puja else []
+        return [rec for rec in ranked if rec.confidence_score >= min_confidence][:limit]
     
     def get_personalized_recommendations(self, limit=10):
         """
@@ -67,14 +63,18 @@ class SamagriRecommender:
         # Get base recommendations for the puja
         base_recommendations = self.get_recommendations(limit * 2)
         
-        # Filter using user preferences
+        # One query for the user's preferences on every candidate item
+        preferences = {
+            pref.samagri_item_id: pref
+            for pref in UserSamagriPreference.objects.filter(
+                user=self.user,
+                samagri_item_id__in=[rec.samagri_item_id for rec in base_recommendations]
+            ).only('samagri_item_id', 'is_favorite', 'never_recommend')
+        }
+        
         filtered = []
         for rec in base_recommendations:
-            # Check if user has marked this as "never recommend"
-            user_pref = UserSamagriPreference.objects.filter(
-                user=self.user,
-                samagri_item=rec.samagri_item
-            ).first()
+            user_pref = preferences.get(rec.samagri_item_id)
             
             if user_pref and user_pref.never_recommend:
                 continue  # Skip this item
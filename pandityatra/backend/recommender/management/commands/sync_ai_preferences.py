@@ -1,4 +1,5 @@
 import logging
+import time
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
@@ -6,6 +7,7 @@ from bookings.models import Booking, BookingStatus
 from samagri.models import ShopOrder, ShopOrderStatus
 from recommender.logic import SamagriRecommender
 from recommender.models import UserSamagriPreference
+from recommender.preferences import CHUNK_SIZE, rebuild_preferences
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Reset all existing preferences before sync (Caution: deletes manually set favorites!)',
         )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute purchase metrics from history in bulk, keeping favorites (safe to re-run)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Rows streamed and upserted per batch in --rebuild mode',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('🚀 Starting AI Samagri Preferences synchronization...'))
@@ -26,6 +39,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('Resetting existing preferences...'))
             UserSamagriPreference.objects.all().delete()
 
+        if options['rebuild']:
+            self.rebuild(options['chunk_size'])
+            return
+
         with transaction.atomic():
             # 1. Sync Bookings
             completed_bookings = Booking.objects.filter(status=BookingStatus.COMPLETED).select_related('user').prefetch_related('samagri_items', 'samagri_items__samagri_item')
@@ -63,3 +80,20 @@ class Command(BaseCommand):
                 f"\n🎉 Total Synchronization Complete!\n"
                 f"Items Processed: {booking_item_count + order_item_count}"
             ))
+
+    def rebuild(self, chunk_size):
+        started = time.monotonic()
+
+        def progress(stage, done, elapsed):
+            rate = done / elapsed if elapsed else 0
+            self.stdout.write(f"   {stage}: {done} rows ({rate:.0f}/s)")
+
+        result = rebuild_preferences(chunk_size=chunk_size, progress=progress)
+        elapsed = time.monotonic() - started
+        lines = result['booking_lines'] + result['order_lines']
+        self.stdout.write(self.style.SUCCESS(
+            f"\n🎉 Rebuild Complete in {elapsed:.1f}s!\n"
+            f"Items Processed: {lines} ({result['booking_lines']} from bookings, {result['order_lines']} from shop orders, "
+            f"{lines / elapsed if elapsed else 0:.0f}/s)\n"
+            f"Preferences Written: {result['preferences']}, Reset: {result['reset']}"
+        ))
@@ -0,0 +1,134 @@
+"""
+Preference Rebuild - Recompute UserSamagriPreference purchase history in bulk.
+
+Used by `python manage.py sync_ai_preferences --rebuild`. Included samagri
+lines of completed bookings and lines of paid/shipped/delivered shop orders
+are streamed with values_list().iterator() (no model instances, no per-order
+queries). They are summed per (user, item) in memory: purchase count,
+quantities, spend and latest purchase time. The sums are written as chunked
+INSERT ... ON CONFLICT DO UPDATE batches, each in its own short transaction.
+
+The result matches what SamagriRecommender.record_purchase builds one line at
+a time (average_quantity is the mean quantity). It replaces the purchase
+metrics instead of adding to them, so a rebuild can be run repeatedly. The
+user's own flags (is_favorite, never_recommend, prefer_bulk) are kept.
+Preferences with no purchases left in the history have their metrics reset.
+"""
+import time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from bookings.models import BookingSamagriItem, BookingStatus
+from samagri.models import ShopOrderItem, ShopOrderStatus
+from .models import UserSamagriPreference
+
+CHUNK_SIZE = 2000
+SUCCESS_ORDER_STATES = [ShopOrderStatus.PAID, ShopOrderStatus.DELIVERED, ShopOrderStatus.SHIPPED]
+METRIC_FIELDS = ['times_purchased', 'average_quantity', 'total_spent', 'last_purchased', 'updated_at']
+
+
+def booking_lines():
+    """(user_id, item_id, quantity, spent, purchased_at) for included items of completed bookings."""
+    return (
+        BookingSamagriItem.objects.filter(
+            booking__status=BookingStatus.COMPLETED,
+            is_included=True,
+            samagri_item__isnull=False,
+        )
+        .values_list(
+            'booking__user_id', 'samagri_item_id', 'quantity', 'total_price',
+            Coalesce('booking__completed_at', 'booking__updated_at'),
+        )
+        .order_by()
+    )
+
+
+def order_lines():
+    """(user_id, item_id, quantity, spent, purchased_at) for items of successful shop orders."""
+    return (
+        ShopOrderItem.objects.filter(order__status__in=SUCCESS_ORDER_STATES, samagri_item__isnull=False)
+        .values_list(
+            'order__user_id', 'samagri_item_id', 'quantity',
+            ExpressionWrapper(F('price_at_purchase') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            'order__created_at',
+        )
+        .order_by()
+    )
+
+
+def aggregate(lines, totals, chunk_size=CHUNK_SIZE, progress=None, label=''):
+    """
+    Fold purchase lines into `totals`: (user_id, item_id) ->
+    [count, quantity sum, spent, last purchase]. Returns the lines read.
+    """
+    started = time.monotonic()
+    read = 0
+    for user_id, item_id, quantity, spent, purchased_at in lines.iterator(chunk_size=chunk_size):
+        entry = totals.get((user_id, item_id))
+        if entry is None:
+            entry = totals[(user_id, item_id)] = [0, 0, Decimal('0.00'), None]
+        entry[0] += 1
+        entry[1] += quantity or 0
+        entry[2] += Decimal(str(spent or 0))
+        if purchased_at and (entry[3] is None or purchased_at > entry[3]):
+            entry[3] = purchased_at
+        read += 1
+        if progress and read % chunk_size == 0:
+            progress(label, read, time.monotonic() - started)
+    if progress:
+        progress(label, read, time.monotonic() - started)
+    return read
+
+
+def write(totals, chunk_size=CHUNK_SIZE, progress=None):
+    """Upsert the aggregated metrics in chunks. Returns the rows written."""
+    started = time.monotonic()
+    pairs = list(totals.items())
+    for start in range(0, len(pairs), chunk_size):
+        rows = [
+            UserSamagriPreference(
+                user_id=user_id,
+                samagri_item_id=item_id,
+                times_purchased=count,
+                average_quantity=quantity / count,
+                total_spent=spent,
+                last_purchased=last,
+            )
+            for (user_id, item_id), (count, quantity, spent, last) in pairs[start:start + chunk_size]
+        ]
+        with transaction.atomic():
+            UserSamagriPreference.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'samagri_item'],
+                update_fields=METRIC_FIELDS,
+            )
+        if progress:
+            progress('write', start + len(rows), time.monotonic() - started)
+    return len(pairs)
+
+
+def rebuild_preferences(chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Recompute every user's purchase metrics from booking and shop order history.
+    `progress(stage, done, elapsed_seconds)` is called after each chunk.
+    Returns {'booking_lines', 'order_lines', 'preferences', 'reset'}.
+    """
+    rebuild_started = timezone.now()
+    totals = {}
+    booking_count = aggregate(booking_lines(), totals, chunk_size, progress, 'bookings')
+    order_count = aggregate(order_lines(), totals, chunk_size, progress, 'orders')
+    written = write(totals, chunk_size, progress)
+
+    # Rows the upserts did not touch have no purchases left in the history
+    reset = UserSamagriPreference.objects.filter(
+        updated_at__lt=rebuild_started, times_purchased__gt=0
+    ).update(
+        times_purchased=0, average_quantity=1.0, total_spent=Decimal('0.00'),
+        last_purchased=None, updated_at=timezone.now(),
+    )
+    return {'booking_lines': booking_count, 'order_lines': order_count, 'preferences': written, 'reset': reset}
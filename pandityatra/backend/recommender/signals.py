@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from samagri.models import SamagriItem
+from services.models import Puja
+from .bundles import bump_version
+from .models import SamagriRecommendation
+
+
+# Bundles embed the item (price, stock) and puja, so any change to them invalidates
+@receiver(post_save, sender=SamagriRecommendation)
+@receiver(post_delete, sender=SamagriRecommendation)
+@receiver(post_save, sender=SamagriItem)
+@receiver(post_delete, sender=SamagriItem)
+@receiver(post_save, sender=Puja)
+@receiver(post_delete, sender=Puja)
+def invalidate_recommendation_bundles(sender, instance, **kwargs):
+    transaction.on_commit(bump_version)
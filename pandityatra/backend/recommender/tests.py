@@ -1,3 +1,113 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from bookings.models import Booking, BookingSamagriItem
+from pandits.models import PanditUser
+from samagri.models import SamagriCategory, SamagriItem, ShopOrder, ShopOrderItem
+from services.models import Puja
+from users.models import User
+from .logic import SamagriRecommender
+from .models import SamagriRecommendation, UserSamagriPreference
+
+
+class RecommendationBundleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='devotee', email='devotee@t.com', role='user')
+        self.puja = Puja.objects.create(name='Ghar Puja', description='d')
+        category = SamagriCategory.objects.create(name='Basics', slug='basics')
+        self.items = [
+            SamagriItem.objects.create(name=name, category=category, price=100, stock_quantity=5)
+            for name in ('Diya', 'Ghee', 'Rice', 'Kalash')
+        ]
+        self.recs = [
+            SamagriRecommendation.objects.create(
+                puja=self.puja, samagri_item=item, confidence_score=score, is_essential=essential
+            )
+            for item, score, essential in zip(self.items, (0.9, 0.6, 0.8, 0.2), (False, True, False, False))
+        ]
+
+    def test_bundle_is_ranked_and_cached(self):
+        recommender = SamagriRecommender(puja=self.puja)
+        first = recommender.get_recommendations(limit=10)
+        self.assertEqual([r.id for r in first], [self.recs[1].id, self.recs[0].id, self.recs[2].id])
+
+        with self.assertNumQueries(0):
+            again = recommender.get_recommendations(limit=2)
+            [r.samagri_item.category.name for r in again]
+        self.assertEqual([r.id for r in again], [self.recs[1].id, self.recs[0].id])
+
+    def test_price_change_invalidates_bundle(self):
+        recommender = SamagriRecommender(puja=self.puja)
+        recommender.get_recommendations()
+        item = self.items[0]
+        item.price = 250
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+
+        rec = next(r for r in recommender.get_recommendations() if r.samagri_item_id == item.id)
+        self.assertEqual(rec.samagri_item.price, 250)
+
+    def test_personalization_uses_one_preference_query(self):
+        UserSamagriPreference.objects.create(user=self.user, samagri_item=self.items[1], never_recommend=True)
+        UserSamagriPreference.objects.create(user=self.user, samagri_item=self.items[2], is_favorite=True)
+        recommender = SamagriRecommender(user=self.user, puja=self.puja)
+        recommender.get_recommendations()
+
+        with self.assertNumQueries(1):
+            personalized = recommender.get_personalized_recommendations(limit=10)
+
+        self.assertEqual([r.id for r in personalized], [self.recs[0].id, self.recs[2].id])
+        self.assertAlmostEqual(personalized[1].confidence_score, 0.9)
+        # The boost is not written back into the shared bundle
+        self.assertEqual(recommender.get_recommendations()[2].confidence_score, 0.8)
+
+
+class PreferenceRebuildTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@t.com', role='user')
+        pandit = PanditUser.objects.create_user(username='rebuildpandit', email='rp@t.com', role='pandit')
+        category = SamagriCategory.objects.create(name='Basics', slug='basics')
+        self.diya, self.ghee, self.rice = [
+            SamagriItem.objects.create(name=name, category=category, price=100, stock_quantity=5)
+            for name in ('Diya', 'Ghee', 'Rice')
+        ]
+        booking = Booking.objects.create(
+            user=self.user, pandit=pandit, service_name='Ghar Puja', booking_date=date(2026, 1, 1),
+            booking_time='10:00:00', status='COMPLETED'
+        )
+        BookingSamagriItem.objects.create(booking=booking, samagri_item=self.diya, quantity=2, total_price=Decimal('40.00'))
+        BookingSamagriItem.objects.create(
+            booking=booking, samagri_item=self.ghee, quantity=9, total_price=Decimal('90.00'), is_included=False
+        )
+        for status, quantity in (('PAID', 4), ('CANCELLED', 7)):
+            order = ShopOrder.objects.create(
+                user=self.user, status=status, full_name='Buyer', phone_number='1', shipping_address='a', city='b'
+            )
+            ShopOrderItem.objects.create(order=order, samagri_item=self.diya, quantity=quantity, price_at_purchase=Decimal('15.00'))
+
+    def test_rebuild_replaces_metrics_and_keeps_flags(self):
+        UserSamagriPreference.objects.create(user=self.user, samagri_item=self.diya, times_purchased=50, is_favorite=True)
+        UserSamagriPreference.objects.create(user=self.user, samagri_item=self.rice, times_purchased=3, never_recommend=True)
+
+        for _ in range(2):
+            out = StringIO()
+            call_command('sync_ai_preferences', '--rebuild', '--chunk-size', '1', stdout=out)
+
+        self.assertIn('Items Processed: 2 (1 from bookings, 1 from shop orders', out.getvalue())
+        diya = UserSamagriPreference.objects.get(samagri_item=self.diya)
+        self.assertEqual(diya.times_purchased, 2)
+        self.assertEqual(diya.average_quantity, 3.0)
+        self.assertEqual(diya.total_spent, Decimal('100.00'))
+        self.assertTrue(diya.is_favorite)
+        self.assertIsNotNone(diya.last_purchased)
+
+        # No purchases left for rice; the user's flag stays
+        rice = UserSamagriPreference.objects.get(samagri_item=self.rice)
+        self.assertEqual((rice.times_purchased, rice.never_recommend), (0, True))
+        self.assertFalse(UserSamagriPreference.objects.filter(samagri_item=self.ghee).exists())
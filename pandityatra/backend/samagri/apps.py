@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SamagriConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'samagri'
+
+    def ready(self):
+        import samagri.signals
@@ -0,0 +1,285 @@
+"""
+Samagri Search Index - In-process ranked search over active SamagriItems.
+
+The catalog is small enough to keep in memory, so each worker builds the
+index with a single query and reuses it until the catalog changes. Saving
+or deleting a SamagriItem or SamagriCategory drops the local copy at once
+and bumps a version in the shared cache after commit (samagri/signals.py),
+so other workers rebuild within VERSION_CHECK_SECONDS.
+
+Text is normalized to tokens (case, punctuation, Devanagari words and Roman
+spelling variants folded together) and queries are expanded with aliases.
+Documents are ranked by whole-name and phrase matches, then exact > prefix >
+trigram-fuzzy token hits weighted by field (name > category > description);
+ties go to newer items, matching the previous order_by("-created_at").
+"""
+import bisect
+import threading
+import time
+import unicodedata
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import SamagriItem
+
+VERSION_KEY = "samagri_search_index:version"
+VERSION_CHECK_SECONDS = 2
+
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+PHRASE_BONUS = 6.0
+EXACT_NAME_BONUS = 4.0
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+ALIAS_FACTOR = 0.7
+MIN_FUZZY_SIMILARITY = 0.5
+MIN_QUERY_TOKEN_LENGTH = 3
+
+DEVANAGARI_WORDS = {
+    "दियो": "diya", "दीया": "diya", "दीप": "diya", "बत्ती": "batti",
+    "घिउ": "ghee", "घ्यू": "ghee", "घी": "ghee",
+    "धुप": "dhup", "धूप": "dhup", "अगरबत्ती": "agarbatti",
+    "चामल": "rice", "अक्षता": "rice", "फूल": "flowers", "माला": "mala",
+    "कलश": "kalash", "नरिवल": "coconut", "नारियल": "coconut",
+    "सिन्दुर": "sindoor", "सिन्दूर": "sindoor", "अबिर": "abir", "टीका": "tika",
+    "रुद्राक्ष": "rudraksha", "जनै": "janai", "मूर्ति": "murti", "मुर्ति": "murti",
+    "सुपारी": "supari", "पान": "paan", "मह": "honey", "दही": "curd", "दूध": "milk",
+    "मिठाई": "sweets", "लड्डु": "laddu", "गीता": "gita", "रामायण": "ramayan",
+    "पूजा": "puja", "सामग्री": "samagri",
+}
+
+SPELLING_VARIANTS = {
+    "diyo": "diya", "deepa": "diya", "deep": "diya",
+    "ghiu": "ghee", "ghyu": "ghee", "ghi": "ghee",
+    "dhoop": "dhup", "agarbati": "agarbatti",
+    "sindur": "sindoor", "sindhoor": "sindoor",
+    "rudraksh": "rudraksha", "janau": "janai",
+    "moorti": "murti", "murthi": "murti",
+    "nariwal": "coconut", "nariyal": "coconut",
+    "ramayana": "ramayan", "geeta": "gita", "pooja": "puja",
+}
+
+# Query-side expansions; keys may be single tokens or whole phrases
+ALIASES = {
+    "murti": ["idol", "statue", "ganesh", "ganesha"],
+    "idol": ["murti"],
+    "ganesh": ["ganesha", "ganpati", "vinayak"],
+    "book": ["granth", "gita", "ramayan", "mahabharat"],
+    "samagri": ["puja", "ritual", "aarti"],
+    "janai": ["sacred thread", "thread"],
+    "lakshmi idol": ["laxmi idol", "idol", "murti"],
+    "modak": ["laddu", "sweet"],
+    "incense sticks": ["agarbatti", "dhup", "incense"],
+    "incense": ["agarbatti", "dhup"],
+    "red flowers": ["flowers"],
+    "white flowers": ["flowers"],
+    "lotus flowers": ["flowers", "lotus"],
+    "marigold flowers": ["flowers", "marigold"],
+    "rangoli items": ["rangoli", "color powder"],
+    "tika": ["vermilion", "kumkum"],
+}
+
+
+def _fold_token(token):
+    token = DEVANAGARI_WORDS.get(token, token)
+    return SPELLING_VARIANTS.get(token, token)
+
+
+def tokenize(text):
+    """Normalized tokens for `text`; punctuation is dropped, Devanagari signs kept."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = "".join(" " if unicodedata.category(ch)[0] in "PSZ" else ch for ch in text)
+    return [_fold_token(t) for t in text.split()]
+
+
+def _trigrams(term):
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SamagriSearchIndex:
+    def __init__(self, rows, version=None):
+        """
+        `rows` are dicts with id, name, description, category_id,
+        category_name, stock_quantity and created_at.
+        """
+        self.version = version
+        self.docs = {}
+        self.postings = {field: {} for field in FIELD_WEIGHTS}
+        self.by_category = {}
+        self.trigrams = {}
+
+        for row in rows:
+            doc = {
+                "id": row["id"],
+                "category_id": row["category_id"],
+                "stock": row["stock_quantity"] or 0,
+                "created": row["created_at"].timestamp() if row["created_at"] else 0,
+                "text": {},
+            }
+            for field, value in (
+                ("name", row["name"]),
+                ("category", row["category_name"]),
+                ("description", row["description"]),
+            ):
+                tokens = tokenize(value)
+                doc["text"][field] = " ".join(tokens)
+                for token in set(tokens):
+                    self.postings[field].setdefault(token, set()).add(row["id"])
+            self.docs[row["id"]] = doc
+            self.by_category.setdefault(row["category_id"], []).append(row["id"])
+
+        self.vocabulary = sorted({t for field in self.postings.values() for t in field})
+        for term in self.vocabulary:
+            for gram in _trigrams(term):
+                self.trigrams.setdefault(gram, set()).add(term)
+        for ids in self.by_category.values():
+            ids.sort(key=self._recency, reverse=True)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def stock_of(self, doc_id):
+        return self.docs[doc_id]["stock"] if doc_id in self.docs else 0
+
+    def category_of(self, doc_id):
+        return self.docs[doc_id]["category_id"] if doc_id in self.docs else None
+
+    def _recency(self, doc_id):
+        return (self.docs[doc_id]["created"], doc_id)
+
+    def _expand(self, phrase, tokens):
+        """(term, weight) pairs for the query, including alias expansions."""
+        terms = {t: 1.0 for t in tokens if len(t) >= MIN_QUERY_TOKEN_LENGTH}
+        for key in [phrase, *tokens]:
+            for alias in ALIASES.get(key, []):
+                for token in tokenize(alias):
+                    if len(token) >= MIN_QUERY_TOKEN_LENGTH and token not in terms:
+                        terms[token] = ALIAS_FACTOR
+        return terms
+
+    def _matching_terms(self, term):
+        """Vocabulary terms matching `term` with their match factor."""
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches[candidate] = 1.0 if candidate == term else PREFIX_FACTOR
+        if matches:
+            return matches
+
+        grams = _trigrams(term)
+        overlap = {}
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        for candidate, shared in overlap.items():
+            similarity = shared / len(grams | _trigrams(candidate))
+            if similarity >= MIN_FUZZY_SIMILARITY:
+                matches[candidate] = FUZZY_FACTOR * similarity
+        return matches
+
+    def _score(self, query):
+        tokens = tokenize(query)
+        phrase = " ".join(tokens)
+        scores = {}
+
+        if phrase:
+            for doc_id, doc in self.docs.items():
+                for field, weight in FIELD_WEIGHTS.items():
+                    if phrase in doc["text"][field]:
+                        scores[doc_id] = scores.get(doc_id, 0) + PHRASE_BONUS * weight / FIELD_WEIGHTS["name"]
+                if doc["text"]["name"] == phrase:
+                    scores[doc_id] += EXACT_NAME_BONUS
+
+        for term, term_weight in self._expand(phrase, tokens).items():
+            best = {}
+            for candidate, factor in self._matching_terms(term).items():
+                for field, weight in FIELD_WEIGHTS.items():
+                    for doc_id in self.postings[field].get(candidate, ()):
+                        contribution = term_weight * factor * weight
+                        if contribution > best.get(doc_id, 0):
+                            best[doc_id] = contribution
+            for doc_id, contribution in best.items():
+                scores[doc_id] = scores.get(doc_id, 0) + contribution
+        return scores
+
+    def search(self, query="", limit=None, in_stock=False, exclude_ids=(), category_id=None):
+        """
+        Ranked item ids for `query`. An empty query matches every item and
+        returns the newest first.
+        """
+        if category_id is not None:
+            candidates = self.by_category.get(category_id, [])
+        else:
+            candidates = self.docs.keys()
+
+        if tokenize(query):
+            scores = self._score(query)
+            candidates = [doc_id for doc_id in candidates if doc_id in scores]
+        else:
+            scores = {}
+
+        exclude_ids = set(exclude_ids or ())
+        ranked = sorted(
+            (
+                doc_id for doc_id in candidates
+                if doc_id not in exclude_ids and (not in_stock or self.docs[doc_id]["stock"] > 0)
+            ),
+            key=lambda doc_id: (scores.get(doc_id, 0), *self._recency(doc_id)),
+            reverse=True,
+        )
+        return ranked[:limit] if limit else ranked
+
+
+def build_index(version=None):
+    rows = SamagriItem.objects.filter(is_active=True).values(
+        "id", "name", "description", "category_id", "stock_quantity", "created_at",
+        category_name=F("category__name"),
+    )
+    return SamagriSearchIndex(rows, version=version)
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _shared_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def get_search_index():
+    """The process-wide index, rebuilt when the catalog version changes."""
+    global _index, _checked_at
+    now = time.monotonic()
+    index = _index
+    if index is not None and now - _checked_at < VERSION_CHECK_SECONDS:
+        return index
+
+    with _lock:
+        version = _shared_version()
+        if _index is None or _index.version != version:
+            _index = build_index(version)
+        _checked_at = now
+        return _index
+
+
+def mark_stale():
+    """Drop this process's copy; the next lookup rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def bump_version():
+    """Tell every process to rebuild on its next lookup."""
+    cache.add(VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
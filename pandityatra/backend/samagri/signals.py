@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import SamagriCategory, SamagriItem
+from .search_index import bump_version, mark_stale
+
+
+# Search index invalidation: drop the local copy now, tell other workers after commit
+@receiver(post_save, sender=SamagriItem)
+@receiver(post_delete, sender=SamagriItem)
+@receiver(post_save, sender=SamagriCategory)
+@receiver(post_delete, sender=SamagriCategory)
+def invalidate_search_index(sender, instance, **kwargs):
+    mark_stale()
+    transaction.on_commit(bump_version)
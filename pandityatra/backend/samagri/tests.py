@@ -5,6 +5,8 @@ from rest_framework import status
 from django.contrib.auth import get_user_model
 from vendors.models import Vendor
 from .models import SamagriItem, SamagriCategory, ShopOrder, ShopOrderItem
+from .search_index import get_search_index
+from ai.tools import _resolve_samagri_batch, search_samagri
 
 User = get_user_model()
 
@@ -84,3 +86,45 @@ class ShopFlowTestCase(APITestCase):
         # Check original order
         order.refresh_from_db()
         self.assertEqual(order.status, 'SHIPPED')
+
+
+class SamagriSearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.category = SamagriCategory.objects.create(name='Lamps', slug='lamps')
+        self.other = SamagriCategory.objects.create(name='Incense', slug='incense')
+        self.diya = SamagriItem.objects.create(
+            name='Brass Diya', category=self.category, price=150, stock_quantity=0,
+            description='Traditional oil lamp'
+        )
+        self.clay = SamagriItem.objects.create(
+            name='Clay Diya Set', category=self.category, price=80, stock_quantity=20
+        )
+        self.agarbatti = SamagriItem.objects.create(
+            name='Sandalwood Agarbatti', category=self.other, price=60, stock_quantity=15
+        )
+
+    def test_ranked_prefix_fuzzy_and_devanagari_matching(self):
+        index = get_search_index()
+        self.assertEqual(index.search('brass diya')[0], self.diya.id)
+        self.assertEqual(index.search('sandal')[0], self.agarbatti.id)
+        self.assertEqual(index.search('agarbati')[0], self.agarbatti.id)
+        self.assertEqual(index.search('अगरबत्ती')[0], self.agarbatti.id)
+        self.assertEqual(index.search('incense sticks')[0], self.agarbatti.id)
+        self.assertEqual(index.search('diya', in_stock=True), [self.clay.id])
+        self.assertEqual(index.search('zzqx'), [])
+
+    def test_index_refreshes_on_item_save(self):
+        self.assertEqual(get_search_index().search('camphor'), [])
+        camphor = SamagriItem.objects.create(name='Camphor Tablets', category=self.other, price=40, stock_quantity=5)
+        self.assertEqual(get_search_index().search('camphor'), [camphor.id])
+
+        camphor.is_active = False
+        camphor.save()
+        self.assertEqual(get_search_index().search('camphor'), [])
+
+    def test_ai_tools_use_index(self):
+        result = search_samagri(None, 'diyo', limit=5)
+        self.assertEqual({p['id'] for p in result.data['products']}, {self.diya.id, self.clay.id})
+
+        [(item, reason, alternative)] = _resolve_samagri_batch([('Brass Diya', None)])
+        self.assertEqual((item, reason, alternative), (self.diya, 'out_of_stock', self.clay))
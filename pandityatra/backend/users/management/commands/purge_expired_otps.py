@@ -0,0 +1,18 @@
+"""
+Management command to remove expired OTP state.
+Run with: python manage.py purge_expired_otps
+"""
+from django.core.management.base import BaseCommand
+
+from users.otp_store import get_otp_store
+
+
+class Command(BaseCommand):
+    help = 'Delete expired OTP codes and lapsed lockouts from the OTP store'
+
+    def handle(self, *args, **options):
+        store = get_otp_store()
+        removed = store.purge_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {removed} expired OTP entries ({store.__class__.__name__})"
+        ))
@@ -134,3 +134,19 @@ class SiteContent(models.Model):
 
     def __str__(self):
         return f"{self.get_key_display()} — {self.value[:50]}"
+
+
+class OTPRecord(models.Model):
+    """
+    Database-backed OTP state (fallback for users.otp_store when no shared cache
+    is configured). One row per phone/email identifier.
+    """
+    identifier = models.CharField(max_length=255, unique=True)
+    code = models.CharField(max_length=10, blank=True, default='')
+    expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_until = models.DateTimeField(blank=True, null=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"OTP for {self.identifier}"
@@ -0,0 +1,182 @@
+"""
+OTP Store - Shared storage for OTP codes, failed attempts and lockouts.
+
+Two backends are available:
+- CacheOTPStore: uses the Django cache (Redis in production). Entries carry
+  their own TTL and attempt counters use atomic cache.incr.
+- DatabaseOTPStore: one OTPRecord row per identifier, updated with F()
+  expressions. Expired rows are removed by purge_expired() / the
+  purge_expired_otps management command.
+
+Select with settings.OTP_STORE_BACKEND ('cache' or 'db'). By default the cache
+is used only when a shared Redis cache is configured (CACHE_REDIS_URL);
+otherwise the database is used so every worker sees the same OTPs.
+"""
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Expired codes are kept a little longer so users get "expired" instead of
+# "not requested" when they type a stale code.
+EXPIRED_CODE_GRACE_SECONDS = 600
+
+
+class BaseOTPStore(ABC):
+    """Interface used by users.otp_utils. Times are UNIX timestamps."""
+
+    @abstractmethod
+    def get_locked_until(self, key):
+        """Timestamp until which `key` is locked, or 0."""
+
+    @abstractmethod
+    def get_code(self, key):
+        """(code, expires_at) for `key`, or None if no OTP is stored."""
+
+    @abstractmethod
+    def save_code(self, key, code, expires_at):
+        """Store a new code, keeping attempts and lockout state."""
+
+    @abstractmethod
+    def delete_code(self, key):
+        """Forget the stored code for `key`."""
+
+    @abstractmethod
+    def register_failure(self, key, max_attempts, lockout_seconds):
+        """
+        Atomically count a failed attempt.
+        Returns (attempts, locked). When attempts reach max_attempts the key is
+        locked for lockout_seconds and the counter starts over.
+        """
+
+    @abstractmethod
+    def reset_attempts(self, key):
+        """Clear the failed attempt counter for `key`."""
+
+    def purge_expired(self):
+        """Remove expired state. Returns the number of entries removed."""
+        return 0
+
+
+class CacheOTPStore(BaseOTPStore):
+    prefix = "otp_store"
+
+    def _key(self, key, part):
+        return f"{self.prefix}:{part}:{key}"
+
+    def get_locked_until(self, key):
+        return cache.get(self._key(key, 'locked'), 0)
+
+    def get_code(self, key):
+        data = cache.get(self._key(key, 'code'))
+        if not data:
+            return None
+        return data['code'], data['expires_at']
+
+    def save_code(self, key, code, expires_at):
+        ttl = max(int(expires_at - time.time()), 1) + EXPIRED_CODE_GRACE_SECONDS
+        cache.set(self._key(key, 'code'), {'code': code, 'expires_at': expires_at}, timeout=ttl)
+
+    def delete_code(self, key):
+        cache.delete(self._key(key, 'code'))
+
+    def register_failure(self, key, max_attempts, lockout_seconds):
+        attempts_key = self._key(key, 'attempts')
+        # add() is a no-op if the counter exists; incr() is atomic on Redis
+        cache.add(attempts_key, 0, timeout=lockout_seconds)
+        try:
+            attempts = cache.incr(attempts_key)
+        except ValueError:
+            # Counter expired between add() and incr()
+            cache.set(attempts_key, 1, timeout=lockout_seconds)
+            attempts = 1
+
+        if attempts >= max_attempts:
+            cache.set(self._key(key, 'locked'), time.time() + lockout_seconds, timeout=lockout_seconds)
+            cache.delete(attempts_key)
+            return attempts, True
+        return attempts, False
+
+    def reset_attempts(self, key):
+        cache.delete(self._key(key, 'attempts'))
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class DatabaseOTPStore(BaseOTPStore):
+
+    @property
+    def model(self):
+        from .models import OTPRecord
+        return OTPRecord
+
+    def get_locked_until(self, key):
+        locked_until = (
+            self.model.objects.filter(identifier=key)
+            .values_list('locked_until', flat=True)
+            .first()
+        )
+        return locked_until.timestamp() if locked_until else 0
+
+    def get_code(self, key):
+        row = (
+            self.model.objects.filter(identifier=key)
+            .exclude(code='')
+            .values_list('code', 'expires_at')
+            .first()
+        )
+        if not row:
+            return None
+        code, expires_at = row
+        return code, expires_at.timestamp() if expires_at else 0
+
+    def save_code(self, key, code, expires_at):
+        self.model.objects.update_or_create(
+            identifier=key,
+            defaults={'code': code, 'expires_at': _to_datetime(expires_at)},
+        )
+
+    def delete_code(self, key):
+        self.model.objects.filter(identifier=key).update(code='', expires_at=None)
+
+    def register_failure(self, key, max_attempts, lockout_seconds):
+        with transaction.atomic():
+            updated = self.model.objects.filter(identifier=key).update(attempts=F('attempts') + 1)
+            if not updated:
+                self.model.objects.create(identifier=key, attempts=1)
+            record = self.model.objects.select_for_update().get(identifier=key)
+            attempts = record.attempts
+            if attempts >= max_attempts:
+                record.locked_until = timezone.now() + timedelta(seconds=lockout_seconds)
+                record.attempts = 0
+                record.save(update_fields=['locked_until', 'attempts', 'updated_at'])
+                return attempts, True
+        return attempts, False
+
+    def reset_attempts(self, key):
+        self.model.objects.filter(identifier=key).update(attempts=0)
+
+    def purge_expired(self):
+        now = timezone.now()
+        grace_cutoff = now - timedelta(seconds=EXPIRED_CODE_GRACE_SECONDS)
+        deleted, _ = self.model.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__lt=grace_cutoff),
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        ).delete()
+        return deleted
+
+
+def get_otp_store():
+    """Return the configured OTP store backend."""
+    default_backend = 'cache' if getattr(settings, 'CACHE_REDIS_URL', '') else 'db'
+    backend = getattr(settings, 'OTP_STORE_BACKEND', '') or default_backend
+    if backend == 'cache':
+        return CacheOTPStore()
+    return DatabaseOTPStore()
@@ -5,11 +5,12 @@ from django.core.mail import send_mail
 from django.conf import settings
 import logging
 
+from .otp_store import get_otp_store
+
 logger = logging.getLogger(__name__)
 
-# In-memory store for OTPs: {phone_number: {"code": "123456", "expires_at": timestamp, "attempts": 0, "locked_until": timestamp}}
-# NOTE: In a production app, this would be stored in a Redis cache or a database table.
-OTP_STORE = {}
+# OTP codes, attempt counters and lockouts live in a shared store (cache or DB)
+# so any worker can verify an OTP issued by another. See users/otp_store.py.
 
 # Set the expiration time for the OTP (e.g., 5 minutes)
 OTP_EXPIRATION_MINUTES = 5
@@ -35,28 +36,22 @@ def send_local_otp(phone_number=None, email=None):
     if not key:
         return None, "No identifier provided."
 
+    store = get_otp_store()
+
     # Check for lockout
     current_time = time.time()
-    if key in OTP_STORE:
-        locked_until = OTP_STORE[key].get('locked_until', 0)
-        if current_time < locked_until:
-            wait_mins = int((locked_until - current_time) / 60)
-            return None, f"Too many failed attempts. Account is locked. Please try again in {wait_mins} minutes."
+    locked_until = store.get_locked_until(key)
+    if current_time < locked_until:
+        wait_mins = int((locked_until - current_time) / 60)
+        return None, f"Too many failed attempts. Account is locked. Please try again in {wait_mins} minutes."
 
     otp_code = generate_otp()
     
     # Calculate expiration time
     expiration_time = datetime.now() + timedelta(minutes=OTP_EXPIRATION_MINUTES)
     
-    # Store OTP
-    # Keep attempts and lockout status if user exists
-    existing_data = OTP_STORE.get(key, {})
-    OTP_STORE[key] = {
-        "code": otp_code,
-        "expires_at": expiration_time.timestamp(),
-        "attempts": existing_data.get('attempts', 0),
-        "locked_until": existing_data.get('locked_until', 0)
-    }
+    # Store OTP (attempts and lockout status are kept by the store)
+    store.save_code(key, otp_code, expiration_time.timestamp())
     
     if email:
         # Send via Email Task (Mailjet + Celery)
@@ -115,41 +110,41 @@ def verify_local_otp(phone_number, otp_code, remove_after_verify=True):
     """
     key = phone_number
     current_time = time.time()
+    store = get_otp_store()
 
     # 1. Check if the key (phone/email) has a stored OTP
-    if key not in OTP_STORE:
+    stored = store.get_code(key)
+    if stored is None:
         return False, "OTP not requested or has expired."
 
-    stored_data = OTP_STORE[key]
+    stored_code, expires_at = stored
 
     # 2. Check for lockout
-    if current_time < stored_data.get('locked_until', 0):
-        wait_mins = int((stored_data['locked_until'] - current_time) / 60)
+    locked_until = store.get_locked_until(key)
+    if current_time < locked_until:
+        wait_mins = int((locked_until - current_time) / 60)
         return False, f"Account is temporarily locked due to too many failed attempts. Try again in {wait_mins} minutes."
 
     # 3. Check for expiration
-    if current_time > stored_data['expires_at']:
+    if current_time > expires_at:
         # Don't delete yet, might need attempt count
         return False, "OTP has expired. Please request a new one."
     
     # 4. Check if the code matches
-    if stored_data['code'] != otp_code:
-        # Increment attempts
-        stored_data['attempts'] = stored_data.get('attempts', 0) + 1
+    if stored_code != otp_code:
+        # Increment attempts (atomic in the store; resets after a lockout)
+        attempts, locked = store.register_failure(key, MAX_OTP_ATTEMPTS, LOCKOUT_DURATION_SECONDS)
         
-        if stored_data['attempts'] >= MAX_OTP_ATTEMPTS:
-            stored_data['locked_until'] = current_time + LOCKOUT_DURATION_SECONDS
-            stored_data['attempts'] = 0 # Reset attempts for next lockout cycle
+        if locked:
             return False, "Too many failed attempts. Account locked for 1 hour."
             
-        remaining = MAX_OTP_ATTEMPTS - stored_data['attempts']
+        remaining = MAX_OTP_ATTEMPTS - attempts
         return False, f"Invalid OTP code. {remaining} attempts remaining."
 
     # 5. Success: Remove the OTP (one-time use) if requested and return True
     if remove_after_verify:
-        del OTP_STORE[key]
-    else:
-        # If not removing, at least reset attempts
-        stored_data['attempts'] = 0
+        store.delete_code(key)
+    # Either way, reset attempts
+    store.reset_attempts(key)
         
-    return True, "OTP verified successfully."
\ No newline at end of file
+    return True, "OTP verified successfully."
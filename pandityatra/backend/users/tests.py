@@ -44,3 +44,75 @@ class CustomerFlowTestCase(APITestCase):
         url = reverse('profile')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class OTPStoreTestCase(TestCase):
+    """Runs the OTP flow against both store backends."""
+
+    def _run_flow(self):
+        from users.otp_utils import send_local_otp, verify_local_otp, MAX_OTP_ATTEMPTS
+
+        key = '9811111111'
+        code, error = send_local_otp(phone_number=key)
+        self.assertIsNone(error)
+
+        for _ in range(MAX_OTP_ATTEMPTS - 1):
+            ok, message = verify_local_otp(key, '000000' if code != '000000' else '111111')
+            self.assertFalse(ok)
+            self.assertIn('attempts remaining', message)
+
+        ok, _ = verify_local_otp(key, code)
+        self.assertTrue(ok)
+        ok, message = verify_local_otp(key, code)
+        self.assertFalse(ok)
+        self.assertEqual(message, "OTP not requested or has expired.")
+
+        # Lockout after MAX_OTP_ATTEMPTS failures blocks new OTPs
+        code, _ = send_local_otp(phone_number=key)
+        for _ in range(MAX_OTP_ATTEMPTS):
+            ok, message = verify_local_otp(key, 'wrong')
+        self.assertIn('locked', message)
+        code, error = send_local_otp(phone_number=key)
+        self.assertIsNone(code)
+        self.assertIn('locked', error)
+
+    def test_cache_store_flow(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+
+        cache.clear()
+        with override_settings(OTP_STORE_BACKEND='cache'):
+            self._run_flow()
+
+    def test_db_store_flow(self):
+        from django.test import override_settings
+
+        with override_settings(OTP_STORE_BACKEND='db'):
+            self._run_flow()
+
+    def test_incomplete_store_fails_on_instantiation(self):
+        from users.otp_store import BaseOTPStore
+
+        class CodesOnlyStore(BaseOTPStore):
+            def get_code(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            CodesOnlyStore()
+
+    def test_db_store_purge_expired(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from users.models import OTPRecord
+        from users.otp_store import DatabaseOTPStore
+
+        OTPRecord.objects.create(identifier='old', code='123456', expires_at=timezone.now() - timedelta(hours=1))
+        OTPRecord.objects.create(identifier='fresh', code='123456', expires_at=timezone.now() + timedelta(minutes=5))
+        OTPRecord.objects.create(
+            identifier='locked', code='', locked_until=timezone.now() + timedelta(minutes=30)
+        )
+
+        self.assertEqual(DatabaseOTPStore().purge_expired(), 1)
+        self.assertEqual(
+            set(OTPRecord.objects.values_list('identifier', flat=True)), {'fresh', 'locked'}
+        )
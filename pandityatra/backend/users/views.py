@@ -477,14 +477,12 @@ class ProfileView(APIView):
         return Response({"detail": "Account deleted successfully."}, status=status.HTTP_200_OK)
 
 
-from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
 from vendors.models import Vendor
-from samagri.models import SamagriItem, ShopOrder
+from samagri.models import SamagriItem
 from .serializers import UserSerializer
-from bookings.models import Booking
-from payments.models import Payment
+from adminpanel import rollups
 from adminpanel.models import PaymentErrorLog
 from pandits.models import PanditUser
 
@@ -505,44 +503,29 @@ class AdminStatsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Time ranges for growth calculation
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_month_end = start_of_month - timedelta(seconds=1)
-        last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        total_users = User.objects.count()
-        total_pandits = PanditUser.objects.count()
-        total_vendors = Vendor.objects.count()
-        total_bookings = Booking.objects.count()
-        total_shop_orders = ShopOrder.objects.count()
-        
+        # Everything time-based comes from the daily rollups (adminpanel/rollups.py)
+        today = timezone.localdate()
+        start_of_month = today.replace(day=1)
+        last_month_end = start_of_month - timedelta(days=1)
+        last_month_start = last_month_end.replace(day=1)
+
+        metrics = [
+            'users_joined', 'pandits_joined', 'vendors_joined', 'bookings_created',
+            'shop_orders_created', 'payments_completed', 'shop_revenue',
+        ]
+        all_time = rollups.totals(metrics)
+        this_month = rollups.totals(metrics, start=start_of_month)
+        last_month = rollups.totals(metrics, start=last_month_start, end=last_month_end)
+
+        total_users = all_time['users_joined']['count']
+        total_pandits = all_time['pandits_joined']['count']
+        total_vendors = all_time['vendors_joined']['count']
+        total_bookings = all_time['bookings_created']['count']
+        total_shop_orders = all_time['shop_orders_created']['count']
+
         # Revenue (Completed payments from bookings + PAID shop orders)
-        booking_revenue_this_month = Payment.objects.filter(
-            status='COMPLETED', 
-            created_at__gte=start_of_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        shop_revenue_this_month = ShopOrder.objects.filter(
-            status__in=['PAID', 'SHIPPED', 'DELIVERED'],
-            created_at__gte=start_of_month
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        revenue_this_month = float(booking_revenue_this_month) + float(shop_revenue_this_month)
-        
-        booking_revenue_last_month = Payment.objects.filter(
-            status='COMPLETED', 
-            created_at__gte=last_month_start,
-            created_at__lte=last_month_end
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        shop_revenue_last_month = ShopOrder.objects.filter(
-            status__in=['PAID', 'SHIPPED', 'DELIVERED'],
-            created_at__gte=last_month_start,
-            created_at__lte=last_month_end
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        revenue_last_month = float(booking_revenue_last_month) + float(shop_revenue_last_month)
+        revenue_this_month = float(this_month['payments_completed']['amount']) + float(this_month['shop_revenue']['amount'])
+        revenue_last_month = float(last_month['payments_completed']['amount']) + float(last_month['shop_revenue']['amount'])
 
         # Growth Calculations
         def calc_growth(current, previous):
@@ -550,39 +533,21 @@ class AdminStatsView(APIView):
                 return 100 if current > 0 else 0
             return round(((current - previous) / previous) * 100, 1)
 
-        # Stats Calculations (MTI ensures these are User records too)
-        users_last_month = User.objects.filter(date_joined__lt=start_of_month).count()
-        users_this_month_new = User.objects.filter(date_joined__gte=start_of_month).count()
-        users_prev_month_new = User.objects.filter(date_joined__gte=last_month_start, date_joined__lte=last_month_end).count()
-        user_growth = calc_growth(users_this_month_new, users_prev_month_new)
-
-        pandits_this_month_new = PanditUser.objects.filter(date_joined__gte=start_of_month).count()
-        pandits_prev_month_new = PanditUser.objects.filter(date_joined__gte=last_month_start, date_joined__lte=last_month_end).count()
-        pandit_growth = calc_growth(pandits_this_month_new, pandits_prev_month_new)
-
-        vendors_this_month_new = Vendor.objects.filter(date_joined__gte=start_of_month).count()
-        vendors_prev_month_new = Vendor.objects.filter(date_joined__gte=last_month_start, date_joined__lte=last_month_end).count()
-        vendor_growth = calc_growth(vendors_this_month_new, vendors_prev_month_new)
-
-        bookings_this_month = Booking.objects.filter(created_at__gte=start_of_month).count()
-        bookings_prev_month = Booking.objects.filter(created_at__gte=last_month_start, created_at__lte=last_month_end).count()
-        booking_growth = calc_growth(bookings_this_month, bookings_prev_month)
+        def month_growth(metric):
+            return calc_growth(this_month[metric]['count'], last_month[metric]['count'])
 
-        revenue_growth = calc_growth(float(revenue_this_month), float(revenue_last_month))
+        user_growth = month_growth('users_joined')
+        pandit_growth = month_growth('pandits_joined')
+        vendor_growth = month_growth('vendors_joined')
+        booking_growth = month_growth('bookings_created')
+        revenue_growth = calc_growth(revenue_this_month, revenue_last_month)
+        shop_order_growth = month_growth('shop_orders_created')
 
-        shop_orders_this_month = ShopOrder.objects.filter(created_at__gte=start_of_month).count()
-        shop_orders_last_month = ShopOrder.objects.filter(created_at__gte=last_month_start, created_at__lte=last_month_end).count()
-        shop_order_growth = calc_growth(shop_orders_this_month, shop_orders_last_month)
-
-        # Insightful counts
+        # Insightful counts (current state over small filtered sets)
         pending_verifications = PanditUser.objects.filter(is_verified=False).count()
         pending_vendors = Vendor.objects.filter(is_verified=False).count()
         low_stock_count = SamagriItem.objects.filter(stock_quantity__lte=5).count()
-        
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        todays_pujas_count = Booking.objects.filter(booking_date=now.date()).count()
-        
+        todays_pujas_count = rollups.totals(['bookings_scheduled'], start=today, end=today)['bookings_scheduled']['count']
         error_logs_count = PaymentErrorLog.objects.filter(resolved=False).count()
 
         return Response({
@@ -7,11 +7,12 @@ from django.conf import settings
 from django.utils import timezone
 
 from chat.models import ChatMessage
+from chat.presence import PresenceMixin
 from notifications.services import notify_incoming_video_call
 from .models import VideoParticipant, VideoRoom
 
 
-class VideoSignalingConsumer(AsyncWebsocketConsumer):
+class VideoSignalingConsumer(PresenceMixin, AsyncWebsocketConsumer):
     """
     WebRTC signaling consumer.
 
@@ -26,6 +27,10 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
       - chat
       - leave
       - heartbeat
+      - typing
+
+    Who is in the call comes from chat.presence; VideoParticipant rows are
+    only written when a user first joins or comes back after leaving.
     """
 
     async def connect(self):
@@ -51,11 +56,15 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
-        await self._upsert_participant(self.room.id)
+        booking = self.room.booking
+        self.presence_group = self.group_name
+        self.presence_peers = {booking.user_id, booking.pandit_id} - {self.user.id, None}
+        # Reconnects of a user still online in the room need no write
+        joined, online = await self.presence_join(on_join=self._upsert_participant)
         # await self._notify_incoming_call(self.room.id) # Already handled or redundant here
 
         # Check if both participants are present to start recording
-        status_info = await self._get_room_status_info(self.room.id)
+        status_info = self._get_room_status_info(len(online))
         
         await self.send(
             text_data=json.dumps(
@@ -125,7 +134,7 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
 
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
-        if hasattr(self, "room") and self.room and self.user and self.user.is_authenticated:
+        if hasattr(self, "presence_group") and await self.presence_leave():
             await self._mark_participant_left(self.room.id)
 
     async def receive(self, text_data):
@@ -145,11 +154,17 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
             "chat",
             "leave",
             "heartbeat",
+            "typing",
         }:
             await self._send_error("Unsupported signaling type")
             return
 
+        if message_type == "typing":
+            await self.presence_typing(payload.get("is_typing", True))
+            return
+
         if message_type == "heartbeat":
+            await self.presence_heartbeat(on_join=self._upsert_participant)
             await self.send(
                 text_data=json.dumps(
                     {
@@ -246,9 +261,8 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
 
         return bool(is_customer or is_pandit or is_admin)
 
-    @database_sync_to_async
-    def _upsert_participant(self, room_id: int):
-        room = VideoRoom.objects.select_related("booking", "booking__pandit").get(id=room_id)
+    def _upsert_participant(self):
+        room = self.room
 
         role = "customer"
         is_host = False
@@ -256,14 +270,15 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
             role = "pandit"
             is_host = True
 
-        participant, _ = VideoParticipant.objects.get_or_create(
+        participant, created = VideoParticipant.objects.get_or_create(
             room=room,
             user=self.user,
             defaults={"role": role, "is_host": is_host},
         )
 
-        participant.left_at = None
-        participant.save(update_fields=["left_at"])
+        if not created and participant.left_at is not None:
+            participant.left_at = None
+            participant.save(update_fields=["left_at"])
 
     @database_sync_to_async
     def _notify_incoming_call(self, room_id: int):
@@ -306,11 +321,8 @@ class VideoSignalingConsumer(AsyncWebsocketConsumer):
             "timestamp": chat.timestamp.isoformat(),
         }
 
-    @database_sync_to_async
-    def _get_room_status_info(self, room_id: int):
-        room = VideoRoom.objects.select_related("booking__user", "booking__pandit").get(id=room_id)
-        active_participants = VideoParticipant.objects.filter(room_id=room_id, left_at__isnull=True)
-        count = active_participants.count()
+    def _get_room_status_info(self, count: int):
+        room = self.room
         
         peer_name = "Pandit" if self.user.role == 'user' else "Customer"
         # Try to get actual name
@@ -0,0 +1,47 @@
+"""
+Management command to run the periodic video jobs (reminders, timeouts,
+Daily.co recordings) in one long-running process.
+Run with: python manage.py run_video_jobs [--once] [--only send_video_reminders ...]
+"""
+import json
+import signal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from video.services.job_runner import JobRunner, jobs_from_settings
+
+
+class Command(BaseCommand):
+    help = "Run send_video_reminders, check_video_timeouts and fetch_daily_recordings on their VIDEO_JOBS intervals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run each job once, print its metrics and exit")
+        parser.add_argument("--only", action="append", default=[], help="Job name to run, repeatable")
+        parser.add_argument("--tick", type=float, default=1.0, help="Seconds between scheduler checks")
+
+    def handle(self, *args, **options):
+        jobs = jobs_from_settings()
+        if options["only"]:
+            unknown = set(options["only"]) - {job.name for job in jobs}
+            if unknown:
+                raise CommandError(f"Unknown video job(s): {', '.join(sorted(unknown))}")
+            jobs = [job for job in jobs if job.name in options["only"]]
+
+        runner = JobRunner(jobs, tick=options["tick"])
+        if options["once"]:
+            metrics = runner.run_once()
+            runner.shutdown()
+            self.stdout.write(json.dumps(metrics, indent=2, default=str))
+            return
+
+        try:
+            runner.check_leader_lock()
+        except ImproperlyConfigured as e:
+            runner.shutdown()
+            raise CommandError(str(e))
+
+        signal.signal(signal.SIGTERM, runner.stop)
+        signal.signal(signal.SIGINT, runner.stop)
+        self.stdout.write(self.style.SUCCESS(f"Video job runner started as {runner.owner}"))
+        runner.run_forever()
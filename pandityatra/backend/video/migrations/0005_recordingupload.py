@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0004_videoroom_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.CharField(max_length=64)),
+                ('total_chunks', models.PositiveIntegerField()),
+                ('extension', models.CharField(default='webm', max_length=8)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('assembling', 'Assembling'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('bytes_total', models.BigIntegerField(default=0)),
+                ('bytes_done', models.BigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, default='', max_length=64)),
+                ('file_path', models.CharField(max_length=255)),
+                ('recording_url', models.URLField()),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recording_uploads', to='video.videoroom')),
+            ],
+            options={
+                'unique_together': {('room', 'upload_id')},
+            },
+        ),
+    ]
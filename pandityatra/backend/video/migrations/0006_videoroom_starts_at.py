@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:50
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_starts_at(apps, schema_editor):
+    VideoRoom = apps.get_model('video', 'VideoRoom')
+    rooms = list(VideoRoom.objects.filter(starts_at__isnull=True).select_related('booking'))
+    for room in rooms:
+        booking = room.booking
+        if booking.booking_date and booking.booking_time:
+            room.starts_at = timezone.make_aware(datetime.combine(booking.booking_date, booking.booking_time))
+    VideoRoom.objects.bulk_update([r for r in rooms if r.starts_at], ['starts_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_panditslotbitmap'),
+        ('video', '0005_recordingupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoroom',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='videoroom',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True), ('status', 'scheduled')), fields=['starts_at'], name='videoroom_reminder_due_idx'),
+        ),
+        migrations.RunPython(backfill_starts_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_panditslotbitmap'),
+        ('video', '0006_videoroom_starts_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videoroom',
+            index=models.Index(condition=models.Q(('status', 'ended'), _negated=True), fields=['starts_at'], name='videoroom_open_start_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0007_videoroom_open_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='daily', max_length=20, unique=True)),
+                ('high_water_ts', models.BigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -26,10 +26,28 @@ class VideoRoom(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Booking date + time as an aware datetime, kept in sync by video/signals.py
+    starts_at = models.DateTimeField(null=True, blank=True)
     reminder_sent_at = models.DateTimeField(null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
     recording_url = models.URLField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Reminders still to send, by start time (see video/services/reminders.py)
+            models.Index(
+                fields=["starts_at"],
+                condition=models.Q(reminder_sent_at__isnull=True, status="scheduled"),
+                name="videoroom_reminder_due_idx",
+            ),
+            # Open rooms by start time (see video/services/timeouts.py)
+            models.Index(
+                fields=["starts_at"],
+                condition=~models.Q(status="ended"),
+                name="videoroom_open_start_idx",
+            ),
+        ]
+
 
 class VideoParticipant(models.Model):
     room = models.ForeignKey(
@@ -58,4 +76,62 @@ class VideoParticipant(models.Model):
     left_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        unique_together = ("room", "user")
\ No newline at end of file
+        unique_together = ("room", "user")
+
+class RecordingUpload(models.Model):
+    """
+    A chunked recording upload and its background finalize job
+    (see video/services/recording_assembler.py).
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("assembling", "Assembling"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    room = models.ForeignKey(
+        VideoRoom,
+        on_delete=models.CASCADE,
+        related_name="recording_uploads"
+    )
+    upload_id = models.CharField(max_length=64)
+    total_chunks = models.PositiveIntegerField()
+    extension = models.CharField(max_length=8, default="webm")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_done = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    # Relative to MEDIA_ROOT, and the public URL it will be served from
+    file_path = models.CharField(max_length=255)
+    recording_url = models.URLField()
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("room", "upload_id")
+
+    @property
+    def progress(self):
+        if not self.bytes_total:
+            return 100 if self.status == "completed" else 0
+        return int(self.bytes_done * 100 / self.bytes_total)
+
+
+class RecordingSyncState(models.Model):
+    """
+    How far a recordings sync with the video provider has got
+    (see video/services/recordings_sync.py).
+    """
+    provider = models.CharField(max_length=20, unique=True, default="daily")
+    # Recordings that started at or before this (epoch seconds) are already synced
+    high_water_ts = models.BigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.provider} recordings synced to {self.high_water_ts}"
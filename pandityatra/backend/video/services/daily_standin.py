@@ -0,0 +1,85 @@
+"""
+Daily Stand-in - A local fake of the Daily.co recordings API.
+
+Serves GET /v1/recordings with Daily's paging (newest first, `limit`,
+`starting_after`) from an in-memory list, so the recordings sync can be
+exercised in tests and local development without a Daily account:
+
+    with DailyStandIn(recordings) as standin:
+        with override_settings(DAILY_API_BASE_URL=standin.base_url):
+            sync_recordings()
+
+`requests_served` counts the list calls made, and `add()` appends new
+recordings while it runs.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class DailyStandIn:
+    def __init__(self, recordings=(), host="127.0.0.1", port=0):
+        self.recordings = list(recordings)
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def add(self, *recordings):
+        with self._lock:
+            self.recordings.extend(recordings)
+
+    def page(self, limit=100, starting_after=None):
+        with self._lock:
+            self.requests_served += 1
+            ordered = sorted(self.recordings, key=lambda r: (r["start_ts"], r["id"]), reverse=True)
+        if starting_after:
+            ids = [r["id"] for r in ordered]
+            ordered = ordered[ids.index(starting_after) + 1:] if starting_after in ids else []
+        return {"total_count": len(self.recordings), "data": ordered[:limit]}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/") != "/v1/recordings":
+                    self.send_error(404)
+                    return
+                query = parse_qs(url.query)
+                body = json.dumps(standin.page(
+                    limit=int(query.get("limit", ["100"])[0]),
+                    starting_after=query.get("starting_after", [None])[0],
+                )).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="daily-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
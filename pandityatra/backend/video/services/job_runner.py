@@ -0,0 +1,241 @@
+"""
+Video Job Runner - Periodic video maintenance commands in one long-running process.
+
+`python manage.py run_video_jobs` hosts send_video_reminders,
+check_video_timeouts and fetch_daily_recordings (VIDEO_JOBS, in seconds) so
+they no longer pay a Django cold start per run. Each job runs on its own
+worker thread, which keeps its database connection open between runs
+(CONN_MAX_AGE), and a job is never started while its previous run is still
+going. Runs are scheduled from when they were due rather than when the
+previous one finished, so an overrun is followed straight away by the next
+run instead of skipping a window. A few seconds of jitter
+(VIDEO_JOBS_JITTER_SECONDS) keep the jobs from hitting the database together.
+
+Only one runner executes jobs at a time: the leader holds a cache lock that it
+renews every tick. The other replicas wait and take over once it expires, so
+scaling the service or overlapping deploys cannot send a reminder twice. The
+lock is only shared when the cache is (CACHE_REDIS_URL), so with DEBUG off the
+runner refuses to start on a per-process cache such as LocMemCache.
+
+Per-job metrics (runs, failures, overruns, last/average/max duration, last
+error) are logged after every run and published in the cache under
+METRICS_KEY.
+"""
+import io
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import close_old_connections
+
+from core.cache import cache_is_shared
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "video_jobs:leader"
+METRICS_KEY = "video_jobs:metrics"
+
+DEFAULT_JOBS = {
+    "send_video_reminders": 60,
+    "check_video_timeouts": 60,
+    "fetch_daily_recordings": 900,
+}
+
+
+class Job:
+    """A callable run every `interval` seconds, with its run metrics."""
+
+    def __init__(self, name, target, interval, jitter=0.0):
+        self.name = name
+        self.target = target
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.next_run = 0.0
+        self.future = None
+        self.overrunning = False
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_started_at = None
+        self.last_error = ""
+
+    @classmethod
+    def command(cls, name, interval, jitter=0.0):
+        def run():
+            out = io.StringIO()
+            call_command(name, stdout=out, stderr=out)
+            return out.getvalue().strip()
+        return cls(name, run, interval, jitter)
+
+    @property
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+    def schedule_next(self, due):
+        # From when the run was due, so slow runs do not drift the schedule
+        self.next_run = due + self.interval + random.uniform(0, self.jitter)
+
+    def metrics(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "running": self.running,
+            "last_started_at": self.last_started_at,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration,
+            "last_error": self.last_error,
+        }
+
+
+def jobs_from_settings():
+    intervals = getattr(settings, "VIDEO_JOBS", None) or DEFAULT_JOBS
+    jitter = float(getattr(settings, "VIDEO_JOBS_JITTER_SECONDS", 5))
+    return [Job.command(name, interval, jitter) for name, interval in intervals.items()]
+
+
+class JobRunner:
+    def __init__(self, jobs, tick=1.0, leader_ttl=None):
+        self.jobs = list(jobs)
+        self.tick = tick
+        self.leader_ttl = int(leader_ttl or getattr(settings, "VIDEO_JOBS_LEADER_TTL", 30))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stop_event = threading.Event()
+        self.is_leader = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.jobs)), thread_name_prefix="video-job")
+
+    # Leader lock
+
+    def acquire_leadership(self):
+        """Take or renew the leader lock. Returns True while this runner holds it."""
+        if cache.add(LEADER_KEY, self.owner, timeout=self.leader_ttl):
+            held = True
+        elif cache.get(LEADER_KEY) == self.owner:
+            held = cache.touch(LEADER_KEY, timeout=self.leader_ttl)
+        else:
+            held = False
+
+        if held != self.is_leader:
+            logger.info("Video job runner %s %s leadership", self.owner, "took" if held else "lost")
+            if held:
+                # A new leader does not know when the last one ran the jobs
+                now = time.monotonic()
+                for job in self.jobs:
+                    job.next_run = now + random.uniform(0, job.jitter)
+        self.is_leader = held
+        return held
+
+    def release_leadership(self):
+        if cache.get(LEADER_KEY) == self.owner:
+            cache.delete(LEADER_KEY)
+        self.is_leader = False
+
+    # Running jobs
+
+    def _execute(self, job):
+        close_old_connections()
+        started = time.monotonic()
+        job.last_started_at = time.time()
+        try:
+            output = job.target()
+            job.last_error = ""
+            if output:
+                logger.info("Video job %s: %s", job.name, output)
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.exception("Video job %s failed", job.name)
+        finally:
+            duration = time.monotonic() - started
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            close_old_connections()
+            logger.info(
+                "Video job %s finished in %.2fs (runs=%s failures=%s overruns=%s)",
+                job.name, duration, job.runs, job.failures, job.overruns,
+            )
+            self.publish_metrics()
+
+    def run_pending(self, now=None):
+        """Start every due job that is not still running. Returns the jobs started."""
+        now = time.monotonic() if now is None else now
+        started = []
+        for job in self.jobs:
+            if now < job.next_run:
+                continue
+            if job.running:
+                # Counted once per overrun; the job starts again as soon as it finishes
+                if not job.overrunning:
+                    job.overruns += 1
+                    job.overrunning = True
+                    logger.warning("Video job %s is overrunning its %ss interval", job.name, job.interval)
+                continue
+            job.overrunning = False
+            # Keep to the schedule unless a whole interval or more was missed
+            job.schedule_next(job.next_run if now - job.next_run < job.interval else now)
+            job.future = self._executor.submit(self._execute, job)
+            started.append(job)
+        return started
+
+    def run_once(self):
+        """Run every job once and wait for them, e.g. from cron or tests."""
+        futures = [self._executor.submit(self._execute, job) for job in self.jobs]
+        for future in futures:
+            future.result()
+        return self.metrics()
+
+    def check_leader_lock(self):
+        if cache_is_shared():
+            return
+        if not settings.DEBUG:
+            logger.error("Video job runner needs a shared cache for its leader lock; set CACHE_REDIS_URL")
+            raise ImproperlyConfigured(
+                "run_video_jobs needs a shared cache (CACHE_REDIS_URL) so only one runner is leader."
+            )
+        logger.warning("Video job runner is using a per-process cache; run only one runner")
+
+    def run_forever(self):
+        self.check_leader_lock()
+        logger.info("Video job runner %s started with jobs: %s", self.owner, ", ".join(j.name for j in self.jobs))
+        try:
+            while not self.stop_event.is_set():
+                if self.acquire_leadership():
+                    self.run_pending()
+                self.stop_event.wait(self.tick)
+        finally:
+            self.shutdown()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.release_leadership()
+        self.publish_metrics()
+
+    # Metrics
+
+    def metrics(self):
+        return {job.name: job.metrics() for job in self.jobs}
+
+    def publish_metrics(self):
+        try:
+            cache.set(METRICS_KEY, {"owner": self.owner, "jobs": self.metrics()}, timeout=None)
+        except Exception as e:
+            logger.warning("Could not publish video job metrics: %s", e)
@@ -0,0 +1,260 @@
+"""
+Recording Assembler - Chunk storage and background finalize for recording uploads.
+
+Chunks are written to MEDIA_ROOT/recordings/chunks/<room>/<upload_id>/ as
+<index>.part next to a <index>.sha256 digest, through a temporary file and a
+rename so a chunk is either fully received or absent. Clients can list the
+received chunks to resume an interrupted upload.
+
+Finalizing runs outside the request (RECORDING_FINALIZE_DISPATCH: celery,
+thread or inline, like notifications.push). Chunk offsets are known up front
+from their sizes, so RECORDING_ASSEMBLY_WORKERS threads copy chunks into the
+preallocated output in parallel with copy_file_range/sendfile (kernel-side,
+no copy through Python), while one more thread streams the chunks through
+SHA-256 in order. Progress is saved on the RecordingUpload row.
+
+A queued or assembling upload whose row has not changed for
+RECORDING_FINALIZE_STALE_SECONDS is taken as lost (e.g. its worker died) and
+can be finalized again; an upload already completed is never rebuilt.
+"""
+import errno
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from notifications.services import notify_recording_ready_review
+from video.models import RecordingUpload
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+HASH_BUFFER_SIZE = 1024 * 1024
+PROGRESS_STEP = 0.05  # save progress every 5% of the bytes
+
+
+class ChecksumMismatch(ValueError):
+    pass
+
+
+def valid_upload_id(upload_id) -> bool:
+    return bool(UPLOAD_ID_RE.match(str(upload_id or "")))
+
+
+def is_stale(upload: RecordingUpload) -> bool:
+    """True when a queued or assembling upload has made no progress for too long."""
+    if upload.status not in ("queued", "assembling"):
+        return False
+    stale_after = float(getattr(settings, "RECORDING_FINALIZE_STALE_SECONDS", 600))
+    return (timezone.now() - upload.updated_at).total_seconds() > stale_after
+
+
+def chunks_dir(room_id: int, upload_id: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / "recordings" / "chunks" / str(room_id) / upload_id
+
+
+def chunk_path(directory: Path, index: int) -> Path:
+    return directory / f"{index:08d}.part"
+
+
+def store_chunk(directory: Path, index: int, uploaded_file, expected_sha256: str = "") -> dict:
+    """
+    Write one chunk, hashing it on the way. Raises ChecksumMismatch (and
+    keeps nothing) when `expected_sha256` is given and does not match.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    final = chunk_path(directory, index)
+    tmp = final.with_suffix(".tmp")
+    digest = hashlib.sha256()
+    size = 0
+    with tmp.open("wb") as f:
+        for part in uploaded_file.chunks():
+            digest.update(part)
+            f.write(part)
+            size += len(part)
+
+    sha256 = digest.hexdigest()
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        tmp.unlink(missing_ok=True)
+        raise ChecksumMismatch(f"Chunk {index} checksum mismatch")
+
+    final.with_suffix(".sha256").write_text(sha256)
+    os.replace(tmp, final)
+    return {"index": index, "size": size, "sha256": sha256}
+
+
+def received_chunks(directory: Path) -> list:
+    """The fully received chunks of an upload, by index."""
+    if not directory.exists():
+        return []
+    received = []
+    for path in sorted(directory.glob("*.part")):
+        digest_path = path.with_suffix(".sha256")
+        received.append({
+            "index": int(path.stem),
+            "size": path.stat().st_size,
+            "sha256": digest_path.read_text() if digest_path.exists() else "",
+        })
+    return received
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, count: int) -> int:
+    """Copy up to `count` bytes between the fds' current positions, in the kernel where possible."""
+    unsupported = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP)
+    if hasattr(os, "copy_file_range"):
+        try:
+            return os.copy_file_range(src_fd, dst_fd, count)
+        except OSError as e:
+            if e.errno not in unsupported:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            return os.sendfile(dst_fd, src_fd, None, count)
+        except OSError as e:
+            if e.errno not in unsupported:
+                raise
+    data = os.read(src_fd, min(count, HASH_BUFFER_SIZE))
+    return os.write(dst_fd, data)
+
+
+def _copy_chunk(src: Path, dst: Path, offset: int, size: int) -> int:
+    src_fd = os.open(src, os.O_RDONLY)
+    dst_fd = os.open(dst, os.O_WRONLY)
+    try:
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        remaining = size
+        while remaining:
+            copied = _kernel_copy(src_fd, dst_fd, remaining)
+            if not copied:
+                raise OSError(f"{src.name} ended {remaining} bytes early")
+            remaining -= copied
+    finally:
+        os.close(src_fd)
+        os.close(dst_fd)
+    return size
+
+
+def _hash_chunks(paths) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with path.open("rb") as f:
+            while block := f.read(HASH_BUFFER_SIZE):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def assemble(upload_pk: int) -> RecordingUpload:
+    """Build the final file for an upload and attach it to the room and booking."""
+    upload = RecordingUpload.objects.select_related("room__booking").get(pk=upload_pk)
+    if upload.status == "completed":
+        # A re-queued finalize that raced the original run
+        return upload
+    directory = chunks_dir(upload.room_id, upload.upload_id)
+    paths = [chunk_path(directory, i) for i in range(upload.total_chunks)]
+    output = Path(settings.MEDIA_ROOT) / upload.file_path
+
+    try:
+        sizes = [p.stat().st_size for p in paths]
+        offsets = [sum(sizes[:i]) for i in range(len(sizes))]
+        upload.status, upload.bytes_total, upload.bytes_done, upload.error = "assembling", sum(sizes), 0, ""
+        upload.save(update_fields=["status", "bytes_total", "bytes_done", "error", "updated_at"])
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open("wb") as f:
+            f.truncate(upload.bytes_total)
+
+        workers = max(1, int(getattr(settings, "RECORDING_ASSEMBLY_WORKERS", 4)))
+        with ThreadPoolExecutor(max_workers=workers + 1) as pool:
+            hashing = pool.submit(_hash_chunks, paths)
+            copies = [
+                pool.submit(_copy_chunk, path, output, offset, size)
+                for path, offset, size in zip(paths, offsets, sizes)
+            ]
+            saved_at = 0
+            for future in as_completed(copies):
+                upload.bytes_done += future.result()
+                if upload.bytes_done - saved_at >= upload.bytes_total * PROGRESS_STEP:
+                    # updated_at shows the job is alive (see is_stale)
+                    RecordingUpload.objects.filter(pk=upload.pk).update(
+                        bytes_done=upload.bytes_done, updated_at=timezone.now()
+                    )
+                    saved_at = upload.bytes_done
+            upload.sha256 = hashing.result()
+    except Exception as e:
+        logger.exception("Recording finalize failed for upload %s", upload.pk)
+        upload.status, upload.error = "failed", str(e)
+        upload.save(update_fields=["status", "error", "updated_at"])
+        output.unlink(missing_ok=True)
+        return upload
+
+    room = upload.room
+    booking = room.booking
+    with transaction.atomic():
+        upload.status, upload.completed_at = "completed", timezone.now()
+        upload.save(update_fields=["status", "bytes_done", "sha256", "completed_at", "updated_at"])
+        room.recording_url = upload.recording_url
+        room.save(update_fields=["recording_url"])
+        booking.recording_url = room.recording_url
+        booking.recording_available = True
+        booking.save(update_fields=["recording_url", "recording_available"])
+        notify_recording_ready_review(booking)
+
+    try:
+        shutil.rmtree(directory)
+        # also cleanup parent if empty
+        if directory.parent.exists() and not any(directory.parent.iterdir()):
+            directory.parent.rmdir()
+    except OSError:
+        logger.warning("Failed to clean up recording chunks for room=%s upload_id=%s", room.id, upload.upload_id)
+    return upload
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recording")
+    return _executor
+
+
+def _assemble_in_worker(upload_pk: int):
+    try:
+        assemble(upload_pk)
+    finally:
+        close_old_connections()
+
+
+def _dispatch_mode():
+    mode = getattr(settings, "RECORDING_FINALIZE_DISPATCH", None)
+    if mode:
+        return mode
+    return "thread" if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False) else "celery"
+
+
+def dispatch_finalize(upload_pk: int):
+    mode = _dispatch_mode()
+    if mode == "inline":
+        assemble(upload_pk)
+    elif mode == "thread":
+        _get_executor().submit(_assemble_in_worker, upload_pk)
+    else:
+        from video.tasks import finalize_recording_task
+        finalize_recording_task.delay(upload_pk)
+
+
+def enqueue_finalize(upload: RecordingUpload):
+    """Assemble `upload` in the background once the current transaction commits."""
+    transaction.on_commit(lambda: dispatch_finalize(upload.pk))
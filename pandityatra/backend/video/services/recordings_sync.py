@@ -0,0 +1,128 @@
+"""
+Recordings Sync - Incremental import of Daily.co recordings for fetch_daily_recordings.
+
+Daily lists recordings newest first, a page at a time (`limit`, and
+`starting_after` the last id of the previous page). The sync stops paging as
+soon as it reaches a recording that started at or before the stored high-water
+mark (RecordingSyncState), so a run reads only the recordings made since the
+last one plus at most one page. Recordings that are still in progress hold the
+mark back, so they are read again until they finish.
+
+The finished recordings are matched to rooms by room_name in one query.
+Rooms that have no recording yet get its download URL, written with a single
+bulk_update.
+
+Requests go through one pooled requests.Session with connect/read timeouts
+and retries on rate limits and 5xx responses. DAILY_API_BASE_URL can point at
+a local stand-in (video/services/daily_standin.py).
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from video.models import RecordingSyncState, VideoRoom
+
+logger = logging.getLogger(__name__)
+
+PAGE_LIMIT = 100
+FINISHED_STATUSES = {"finished", "completed"}
+IN_PROGRESS_STATUSES = {"in-progress"}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide Daily API session, with a connection pool and retries."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                retries = Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=("GET",),
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _base_url():
+    return getattr(settings, "DAILY_API_BASE_URL", "https://api.daily.co/v1").rstrip("/")
+
+
+def _timeout():
+    return (
+        float(getattr(settings, "DAILY_API_CONNECT_TIMEOUT", 3.05)),
+        float(getattr(settings, "DAILY_API_READ_TIMEOUT", 15)),
+    )
+
+
+def iter_recordings_since(high_water_ts, session=None, page_limit=PAGE_LIMIT):
+    """Yield recordings newest first, stopping at the first one started at or before `high_water_ts`."""
+    session = session or get_session()
+    headers = {"Authorization": f"Bearer {getattr(settings, 'DAILY_API_KEY', '')}"}
+    params = {"limit": page_limit}
+    while True:
+        response = session.get(f"{_base_url()}/recordings", params=params, headers=headers, timeout=_timeout())
+        response.raise_for_status()
+        page = response.json().get("data", [])
+        for recording in page:
+            if int(recording.get("start_ts") or 0) <= high_water_ts:
+                return
+            yield recording
+        if len(page) < page_limit:
+            return
+        params["starting_after"] = page[-1]["id"]
+
+
+def _next_high_water(current, recordings):
+    """Up to the newest recording read, but before any that may still change."""
+    if not recordings:
+        return current
+    starts = [int(r.get("start_ts") or 0) for r in recordings]
+    pending = [ts for r, ts in zip(recordings, starts) if r.get("status") in IN_PROGRESS_STATUSES]
+    mark = min(pending) - 1 if pending else max(starts)
+    return max(current, mark)
+
+
+def sync_recordings(provider="daily", session=None):
+    """
+    Import the recordings made since the last sync. Returns (rooms updated,
+    recordings read).
+    """
+    state, _ = RecordingSyncState.objects.get_or_create(provider=provider)
+    recordings = list(iter_recordings_since(state.high_water_ts, session=session))
+
+    # Newest first, so the latest finished recording of a room wins
+    urls = {}
+    for recording in recordings:
+        room_name, url = recording.get("room_name"), recording.get("download_url")
+        if room_name and url and recording.get("status") in FINISHED_STATUSES:
+            urls.setdefault(room_name, url)
+
+    rooms = list(
+        VideoRoom.objects.filter(room_name__in=urls)
+        .filter(Q(recording_url__isnull=True) | Q(recording_url=""))
+        .only("id", "room_name", "recording_url")
+    )
+    for room in rooms:
+        room.recording_url = urls[room.room_name]
+    VideoRoom.objects.bulk_update(rooms, ["recording_url"], batch_size=500)
+
+    state.high_water_ts = _next_high_water(state.high_water_ts, recordings)
+    state.last_synced_at = timezone.now()
+    state.save(update_fields=["high_water_ts", "last_synced_at", "updated_at"])
+    logger.info("Daily recordings sync read %s recordings, updated %s rooms", len(recordings), len(rooms))
+    return len(rooms), len(recordings)
@@ -0,0 +1,87 @@
+"""
+Video Reminders - Due-time queue for the pre-session reminders.
+
+Every VideoRoom stores its session start as `starts_at` (set when the room is
+created and kept in sync with the booking by video/signals.py), and a partial
+index covers the rooms whose reminder is still pending. A run of
+send_video_reminders therefore reads only the rooms starting within the next
+REMINDER_WINDOW instead of every scheduled room.
+
+Due rooms are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so overlapping
+runs never remind twice. All their notifications are inserted with one
+bulk_create, and after commit the emails go out over a single SMTP
+connection.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from notifications.email_utils import send_room_reminder_emails
+from notifications.services import notify_puja_room_reminders
+from video.models import VideoRoom
+
+logger = logging.getLogger(__name__)
+
+# Broad rather than exact so an irregular scheduler does not skip a session
+REMINDER_WINDOW = timedelta(minutes=20)
+BATCH_SIZE = 200
+
+
+def session_start(booking):
+    """The booking's start as an aware datetime, or None without a date and time."""
+    booking_date, booking_time = booking.booking_date, booking.booking_time
+    # Unsaved or just-created bookings may still hold the strings they were given
+    if isinstance(booking_date, str):
+        booking_date = parse_date(booking_date)
+    if isinstance(booking_time, str):
+        booking_time = parse_time(booking_time)
+    if not booking_date or not booking_time:
+        return None
+    return timezone.make_aware(
+        datetime.combine(booking_date, booking_time),
+        timezone.get_current_timezone(),
+    )
+
+
+def due_rooms(now=None):
+    """Rooms of paid, accepted online bookings starting within REMINDER_WINDOW and not reminded yet."""
+    now = now or timezone.now()
+    return (
+        VideoRoom.objects.filter(
+            reminder_sent_at__isnull=True,
+            status="scheduled",
+            starts_at__gte=now,
+            starts_at__lte=now + REMINDER_WINDOW,
+            booking__service_location="ONLINE",
+            booking__status="ACCEPTED",
+            booking__payment_status=True,
+        )
+        .order_by("starts_at")
+    )
+
+
+def send_due_reminders(now=None, batch_size=BATCH_SIZE):
+    """Remind everyone with a session starting soon. Returns the number of rooms reminded."""
+    now = now or timezone.now()
+    sent = 0
+    while True:
+        with transaction.atomic():
+            rooms = list(
+                due_rooms(now)
+                .select_for_update(skip_locked=True, of=("self",))
+                .select_related("booking", "booking__user", "booking__pandit")[:batch_size]
+            )
+            if not rooms:
+                break
+            bookings = [room.booking for room in rooms]
+            notify_puja_room_reminders(bookings)
+            VideoRoom.objects.filter(id__in=[room.id for room in rooms]).update(reminder_sent_at=timezone.now())
+            transaction.on_commit(lambda bookings=bookings: send_room_reminder_emails(bookings))
+        sent += len(rooms)
+        logger.info("Sent video reminders for %s rooms", len(rooms))
+        if len(rooms) < batch_size:
+            break
+    return sent
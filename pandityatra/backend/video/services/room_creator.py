@@ -4,6 +4,7 @@ from django.utils.text import slugify
 from video.models import VideoRoom
 from notifications.email_utils import send_room_ready_email
 from notifications.services import notify_puja_room_ready
+from video.services.reminders import session_start
 
 
 def _build_internal_room_name(booking):
@@ -32,7 +33,8 @@ def ensure_video_room_for_booking(booking):
         provider="webrtc",
         room_name=room_name,
         room_url=room_url,
-        status="scheduled"
+        status="scheduled",
+        starts_at=session_start(booking),
     )
 
     # Update Booking fields (legacy fields retained for compatibility)
@@ -0,0 +1,108 @@
+"""
+Video Timeouts - Set-based missed-call detection for check_video_timeouts.
+
+A session is missed when one party has waited JOIN_WINDOW alone in the room
+(the other party is notified as missing), or when nobody has joined
+NO_SHOW_GRACE after the start. One query finds those rooms. It reads the
+rooms that are still open and started within LOOKBACK (using the indexed
+VideoRoom.starts_at), and annotates their active participant count and how
+long the first of them has waited. The rooms and bookings are then ended
+and marked MISSED with one UPDATE each.
+
+Queryset updates skip the Booking save signals. After commit this module
+does what those signals would have done: refresh the pandit slot bitmaps,
+the admin booking rollups and the pandit dashboards. The missed-call
+notifications are sent after commit as well.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStatus
+from bookings.signals import refresh_after_bulk_update
+from notifications.services import notify_missed_video_puja
+from video.models import VideoRoom
+
+logger = logging.getLogger(__name__)
+
+JOIN_WINDOW = timedelta(minutes=8)
+NO_SHOW_GRACE = timedelta(minutes=15)
+# Rooms older than this are left alone; the job runs every minute, so a
+# session is decided long before it falls out of the window
+LOOKBACK = timedelta(hours=24)
+
+
+def missed_rooms(now=None):
+    """
+    Open rooms whose session was missed, annotated with `active` (participants
+    still in the room) and `waiting_user_id` (the one waiting alone, if any).
+    """
+    now = now or timezone.now()
+    in_room = Q(participants__left_at__isnull=True)
+    return (
+        VideoRoom.objects.exclude(status="ended")
+        .filter(starts_at__gte=now - LOOKBACK, starts_at__lt=now - JOIN_WINDOW)
+        .annotate(
+            active=Count("participants", filter=in_room),
+            waiting_since=Min("participants__joined_at", filter=in_room),
+            waiting_user_id=Min("participants__user_id", filter=in_room),
+        )
+        .filter(
+            Q(active=1, waiting_since__lt=now - JOIN_WINDOW)
+            | Q(active=0, starts_at__lt=now - NO_SHOW_GRACE)
+        )
+        .select_related("booking", "booking__user", "booking__pandit")
+    )
+
+
+def end_missed_rooms(now=None):
+    """
+    End every missed session and mark its booking MISSED.
+    Returns the rooms ended, each with `missing_role` set ('customer',
+    'pandit', or None when neither party joined).
+    """
+    now = now or timezone.now()
+    candidates = {room.id: room for room in missed_rooms(now)}
+    if not candidates:
+        return []
+
+    with transaction.atomic():
+        # Row locks cannot be taken by the aggregate query itself
+        locked = set(
+            VideoRoom.objects.select_for_update(skip_locked=True)
+            .filter(id__in=candidates)
+            .exclude(status="ended")
+            .values_list("id", flat=True)
+        )
+        rooms = [room for room_id, room in candidates.items() if room_id in locked]
+        if not rooms:
+            return []
+        for room in rooms:
+            if room.active:
+                room.missing_role = "customer" if room.waiting_user_id == room.booking.pandit_id else "pandit"
+            else:
+                room.missing_role = None
+
+        VideoRoom.objects.filter(id__in=[room.id for room in rooms]).update(status="ended", ended_at=now)
+        Booking.objects.filter(id__in=[room.booking_id for room in rooms]).update(status=BookingStatus.MISSED)
+        for room in rooms:
+            room.status, room.ended_at = "ended", now
+            room.booking.status = BookingStatus.MISSED
+
+        bookings = [room.booking for room in rooms]
+        transaction.on_commit(lambda: refresh_after_bulk_update(bookings))
+        transaction.on_commit(lambda: _notify(rooms))
+    return rooms
+
+
+def _notify(rooms):
+    for room in rooms:
+        if room.missing_role is None:
+            continue
+        try:
+            notify_missed_video_puja(room.booking, room.missing_role)
+        except Exception as e:
+            logger.error(f"Could not notify missed video puja for booking {room.booking_id}: {e}")
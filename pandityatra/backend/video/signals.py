@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from bookings.models import Booking
+from .models import VideoRoom
+from .services.reminders import session_start
+
+SCHEDULE_FIELDS = {"booking_date", "booking_time"}
+
+
+@receiver(post_save, sender=Booking)
+def sync_room_start(sender, instance, created, update_fields=None, **kwargs):
+    """Keep VideoRoom.starts_at, which the reminder queue is indexed on, in step with the booking."""
+    if created or (update_fields is not None and not SCHEDULE_FIELDS.intersection(update_fields)):
+        return
+    starts_at = session_start(instance)
+    VideoRoom.objects.filter(booking=instance).exclude(starts_at=starts_at).update(starts_at=starts_at)
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+
+@shared_task(name="video.tasks.finalize_recording_task")
+def finalize_recording_task(upload_pk):
+    """
+    Assemble the chunks of a RecordingUpload into the final recording
+    """
+    from .services.recording_assembler import assemble
+    return assemble(upload_pk).status
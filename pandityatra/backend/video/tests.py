@@ -1,10 +1,19 @@
 import asyncio
+import hashlib
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
 from datetime import timedelta
 from unittest.mock import patch
 
 from asgiref.sync import async_to_sync
 from channels.testing import WebsocketCommunicator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.cache import cache
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -14,7 +23,11 @@ from bookings.models import Booking
 from pandits.models import PanditUser
 from services.models import Puja, PujaCategory
 from users.models import User
-from video.models import VideoRoom
+from notifications.models import Notification
+from video.models import RecordingSyncState, RecordingUpload, VideoParticipant, VideoRoom
+from video.services import recording_assembler
+from video.services.daily_standin import DailyStandIn
+from video.services.job_runner import LEADER_KEY, METRICS_KEY, Job, JobRunner
 from video.services.room_creator import ensure_video_room_for_booking
 
 
@@ -29,16 +42,31 @@ class VideoTestDataMixin:
         )
 
     def create_pandit(self, username: str = "pandit"):
-        pandit_user = self.create_user(username=username, role="pandit")
-        pandit = Pandit.objects.create(
-            user=pandit_user,
+        # PanditUser is the User subclass that carries the pandit profile, so
+        # the account and the pandit are the same row
+        pandit = PanditUser.objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password="Pass@12345",
+            full_name=username.title(),
+            role="pandit",
             expertise="Vedic Puja",
             language="Nepali",
             experience_years=5,
             is_verified=True,
             verification_status="APPROVED",
         )
-        return pandit_user, pandit
+        return pandit, pandit
+
+    def create_online_room(self, user, pandit, minutes=0, **booking_fields):
+        """A paid, accepted online booking starting `minutes` from now, and its video room."""
+        start = timezone.localtime(timezone.now()) + timedelta(minutes=minutes)
+        fields = {"status": "ACCEPTED", "payment_status": True, **booking_fields}
+        booking = Booking.objects.create(
+            user=user, pandit=pandit, service_name="Griha Puja", service_location="ONLINE",
+            booking_date=start.date(), booking_time=start.time().replace(microsecond=0), **fields
+        )
+        return ensure_video_room_for_booking(booking)
 
     def create_booking(self, user, pandit, *, status="ACCEPTED", payment_status=True, when_minutes=5):
         start = timezone.localtime(timezone.now()) + timedelta(minutes=when_minutes)
@@ -242,10 +270,11 @@ class VideoReminderCommandTests(VideoTestDataMixin, TestCase):
         )
         self.room = ensure_video_room_for_booking(self.booking)
 
-    @patch("video.management.commands.send_video_reminders.send_room_reminder_email")
-    @patch("video.management.commands.send_video_reminders.notify_puja_room_reminder")
+    @patch("video.services.reminders.send_room_reminder_emails")
+    @patch("video.services.reminders.notify_puja_room_reminders")
     def test_reminder_command_sends_once_and_marks_room(self, notify_mock, email_mock):
-        call_command("send_video_reminders")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("send_video_reminders")
 
         self.room.refresh_from_db()
         self.assertIsNotNone(self.room.reminder_sent_at)
@@ -255,7 +284,8 @@ class VideoReminderCommandTests(VideoTestDataMixin, TestCase):
         notify_mock.reset_mock()
         email_mock.reset_mock()
 
-        call_command("send_video_reminders")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("send_video_reminders")
         notify_mock.assert_not_called()
         email_mock.assert_not_called()
 
@@ -525,4 +555,289 @@ class FrontendWebSocketContractDiagnosticTest(VideoTestDataMixin, TransactionTes
         await ws_valid.disconnect()
 
     def test_frontend_ws_contract_diagnostic(self):
-        async_to_sync(self._run_diagnostic)()
\ No newline at end of file
+        async_to_sync(self._run_diagnostic)()
+
+
+class RecordingUploadTests(VideoTestDataMixin, TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        settings_override = override_settings(MEDIA_ROOT=media.name, RECORDING_FINALIZE_DISPATCH="inline")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.customer = self.create_user("reccust")
+        _, pandit = self.create_pandit("recpandit")
+        self.room = self.create_online_room(self.customer, pandit)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+        self.base = f"/api/video/rooms/{self.room.id}"
+        self.chunks = [bytes([n]) * (1000 + n) for n in range(3)]
+
+    def _upload(self, index, data, checksum=None):
+        payload = {
+            "upload_id": "rec-1",
+            "chunk_index": index,
+            "total_chunks": len(self.chunks),
+            "chunk": SimpleUploadedFile(f"chunk-{index}.webm", data),
+        }
+        if checksum:
+            payload["checksum"] = checksum
+        return self.client.post(f"{self.base}/upload-recording-chunk/", payload, format="multipart")
+
+    def test_resumable_upload_and_background_finalize(self):
+        bad = self._upload(1, self.chunks[1], checksum="0" * 64)
+        self.assertEqual(bad.status_code, 400)
+        for index in (0, 2):
+            self.assertEqual(self._upload(index, self.chunks[index], hashlib.sha256(self.chunks[index]).hexdigest()).status_code, 202)
+
+        received = self.client.get(f"{self.base}/upload-recording-chunk/", {"upload_id": "rec-1"}).data
+        self.assertEqual([c["index"] for c in received["received"]], [0, 2])
+        missing = self.client.post(f"{self.base}/finalize-recording/", {"upload_id": "rec-1", "total_chunks": 3})
+        self.assertEqual(missing.data["missing"], ["00000001.part"])
+
+        self._upload(1, self.chunks[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{self.base}/finalize-recording/", {"upload_id": "rec-1", "total_chunks": 3})
+        self.assertEqual(response.status_code, 202)
+
+        status = self.client.get(response.data["status_url"]).data
+        whole = b"".join(self.chunks)
+        self.assertEqual((status["status"], status["progress"]), ("completed", 100))
+        self.assertEqual(status["sha256"], hashlib.sha256(whole).hexdigest())
+        upload = RecordingUpload.objects.get(upload_id="rec-1")
+        self.assertEqual((self.media_root / upload.file_path).read_bytes(), whole)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.recording_url, status["recording_url"])
+        self.assertFalse((self.media_root / "recordings" / "chunks" / str(self.room.id)).exists())
+
+        # Finalizing again reports the finished job
+        again = self.client.post(f"{self.base}/finalize-recording/", {"upload_id": "rec-1", "total_chunks": 3})
+        self.assertEqual((again.status_code, again.data["status"]), (200, "completed"))
+
+    def test_stale_finalize_is_queued_again(self):
+        for index, data in enumerate(self.chunks):
+            self._upload(index, data)
+        # A finalize whose worker died before assembling anything
+        upload = RecordingUpload.objects.create(
+            room=self.room, upload_id="rec-1", total_chunks=3, status="queued",
+            file_path=f"recordings/video_room_{self.room.id}_stale.webm",
+            recording_url="http://testserver/media/stale.webm",
+        )
+
+        fresh = self.client.post(f"{self.base}/finalize-recording/", {"upload_id": "rec-1", "total_chunks": 3})
+        self.assertEqual((fresh.status_code, fresh.data["status"]), (202, "queued"))
+
+        RecordingUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            retried = self.client.post(f"{self.base}/finalize-recording/", {"upload_id": "rec-1", "total_chunks": 3})
+        self.assertEqual(retried.status_code, 202)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+
+        # A late duplicate run leaves the finished upload alone
+        with patch("video.services.recording_assembler._copy_chunk") as copy:
+            self.assertEqual(recording_assembler.assemble(upload.pk).status, "completed")
+        copy.assert_not_called()
+
+    def test_upload_id_cannot_escape_chunk_directory(self):
+        response = self.client.get(f"{self.base}/upload-recording-chunk/", {"upload_id": "../../etc"})
+        self.assertEqual(response.status_code, 400)
+
+
+class VideoJobRunnerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_only_one_runner_holds_leadership(self):
+        first, second = JobRunner([]), JobRunner([])
+        self.assertTrue(first.acquire_leadership())
+        self.assertFalse(second.acquire_leadership())
+        self.assertTrue(first.acquire_leadership())
+
+        first.shutdown()
+        self.assertIsNone(cache.get(LEADER_KEY))
+        self.assertTrue(second.acquire_leadership())
+        second.shutdown()
+
+    def test_overrunning_job_is_not_started_twice(self):
+        release = threading.Event()
+        slow = Job("slow", lambda: release.wait(5), interval=10)
+        runner = JobRunner([slow])
+
+        self.assertEqual(runner.run_pending(now=100), [slow])
+        self.assertEqual(slow.next_run, 110)
+        self.assertEqual(runner.run_pending(now=111), [])
+        self.assertEqual(runner.run_pending(now=112), [])
+        self.assertEqual(slow.overruns, 1)
+
+        release.set()
+        slow.future.result()
+        # Due again straight away and still on its original schedule
+        self.assertEqual(runner.run_pending(now=113), [slow])
+        self.assertEqual(slow.next_run, 120)
+        runner.shutdown()
+
+    def test_run_once_records_metrics(self):
+        def broken():
+            raise RuntimeError("daily.co down")
+
+        runner = JobRunner([Job("ok", lambda: "done", 60), Job("broken", broken, 60)])
+        metrics = runner.run_once()
+        runner.shutdown()
+
+        self.assertEqual((metrics["ok"]["runs"], metrics["ok"]["failures"]), (1, 0))
+        self.assertEqual((metrics["broken"]["runs"], metrics["broken"]["failures"]), (1, 1))
+        self.assertEqual(metrics["broken"]["last_error"], "daily.co down")
+        self.assertIn("ok", cache.get(METRICS_KEY)["jobs"])
+
+    def test_command_rejects_unknown_jobs(self):
+        with self.assertRaises(CommandError):
+            call_command("run_video_jobs", "--once", "--only", "nope")
+
+    @override_settings(DEBUG=False)
+    def test_refuses_to_lead_on_a_per_process_cache(self):
+        # The test cache is LocMemCache, which other replicas cannot see
+        with self.assertRaises(CommandError):
+            call_command("run_video_jobs", "--only", "send_video_reminders")
+        self.assertIsNone(cache.get(LEADER_KEY))
+
+
+class VideoReminderQueueTests(VideoTestDataMixin, TestCase):
+    def setUp(self):
+        self.customer = self.create_user("qcust")
+        _, self.pandit = self.create_pandit("qpandit")
+
+    def _room(self, minutes, **booking_fields):
+        return self.create_online_room(self.customer, self.pandit, minutes, **booking_fields)
+
+    def test_only_due_rooms_are_reminded_in_one_batch(self):
+        due = [self._room(5), self._room(15)]
+        later = self._room(90)
+        unpaid = self._room(5, payment_status=False)
+        Notification.objects.all().delete()
+        mail.outbox = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("send_video_reminders", stdout=StringIO())
+
+        reminded = set(VideoRoom.objects.filter(reminder_sent_at__isnull=False).values_list("id", flat=True))
+        self.assertEqual(reminded, {room.id for room in due})
+        self.assertNotIn(later.id, reminded)
+        self.assertNotIn(unpaid.id, reminded)
+        self.assertEqual(Notification.objects.filter(notification_type="PUJA_ROOM_READY").count(), 4)
+        self.assertEqual(len(mail.outbox), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("send_video_reminders", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_room_start_follows_booking_changes(self):
+        room = self._room(90)
+        booking = room.booking
+        moved = timezone.localtime(room.starts_at) - timedelta(minutes=80)
+        booking.booking_date, booking.booking_time = moved.date(), moved.time()
+        booking.save(update_fields=["booking_date", "booking_time"])
+
+        room.refresh_from_db()
+        self.assertEqual(room.starts_at, moved)
+
+
+class VideoTimeoutCheckTests(VideoTestDataMixin, TestCase):
+    def setUp(self):
+        self.customer = self.create_user("tcust")
+        _, self.pandit = self.create_pandit("tpandit")
+
+    def _room(self, minutes_ago):
+        return self.create_online_room(self.customer, self.pandit, -minutes_ago)
+
+    def _join(self, room, user, minutes_ago):
+        participant = VideoParticipant.objects.create(room=room, user=user, role="user")
+        VideoParticipant.objects.filter(pk=participant.pk).update(
+            joined_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+
+    def test_missed_sessions_are_ended_in_bulk(self):
+        pandit_waiting = self._room(12)
+        self._join(pandit_waiting, self.pandit, 10)
+        nobody = self._room(20)
+        in_progress = self._room(20)
+        self._join(in_progress, self.customer, 15)
+        self._join(in_progress, self.pandit, 15)
+        just_started = self._room(5)
+        stale = self._room(60 * 48)
+        Notification.objects.all().delete()
+
+        # Find, lock, two UPDATEs, and the savepoint pair around them
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(6):
+            call_command("check_video_timeouts", stdout=StringIO())
+
+        ended = set(VideoRoom.objects.filter(status="ended").values_list("id", flat=True))
+        self.assertEqual(ended, {pandit_waiting.id, nobody.id})
+        missed = set(Booking.objects.filter(status="MISSED").values_list("id", flat=True))
+        self.assertEqual(missed, {pandit_waiting.booking_id, nobody.booking_id})
+        for room in (in_progress, just_started, stale):
+            room.refresh_from_db()
+            self.assertNotEqual(room.status, "ended")
+        # Only the session someone waited in notifies; the customer is the one missing
+        self.assertEqual(
+            set(Notification.objects.values_list("booking_id", "title")),
+            {
+                (pandit_waiting.booking_id, "You missed your Puja session 🙏"),
+                (pandit_waiting.booking_id, f"{self.customer.full_name} did not join"),
+            },
+        )
+
+
+class DailyRecordingsSyncTests(VideoTestDataMixin, TestCase):
+    def setUp(self):
+        customer = self.create_user("scust")
+        _, pandit = self.create_pandit("spandit")
+        self.rooms = [self.create_online_room(customer, pandit, status="COMPLETED") for _ in range(3)]
+
+        # 150 recordings of other rooms, then one per room
+        self.recordings = [self._recording(f"old-{n}", f"elsewhere-{n}", 1000 + n) for n in range(150)]
+        self.recordings += [self._recording(f"rec-{n}", room.room_name, 2000 + n) for n, room in enumerate(self.rooms[:2])]
+        self.standin = DailyStandIn(self.recordings).start()
+        self.addCleanup(self.standin.stop)
+        settings_override = override_settings(DAILY_API_BASE_URL=self.standin.base_url, DAILY_API_KEY="test")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _recording(self, rec_id, room_name, start_ts, status="finished"):
+        return {
+            "id": rec_id,
+            "room_name": room_name,
+            "start_ts": start_ts,
+            "status": status,
+            "download_url": f"https://recordings.example.com/{rec_id}.mp4",
+        }
+
+    def _sync(self):
+        out = StringIO()
+        call_command("fetch_daily_recordings", stdout=out)
+        return out.getvalue()
+
+    def test_incremental_sync_reads_only_new_recordings(self):
+        self.assertIn("Fetched and saved 2 new recordings (152 read)", self._sync())
+        self.assertEqual(self.standin.requests_served, 2)
+        urls = dict(VideoRoom.objects.values_list("room_name", "recording_url"))
+        self.assertEqual(urls[self.rooms[0].room_name], "https://recordings.example.com/rec-0.mp4")
+        self.assertIsNone(urls[self.rooms[2].room_name])
+        self.assertEqual(RecordingSyncState.objects.get().high_water_ts, 2001)
+
+        # Nothing new: one page request that stops at the high-water mark
+        self.standin.requests_served = 0
+        self.assertIn("Fetched and saved 0 new recordings (0 read)", self._sync())
+        self.assertEqual(self.standin.requests_served, 1)
+
+        # A recording still in progress is read again until it finishes
+        pending = self._recording("rec-2", self.rooms[2].room_name, 3000, status="in-progress")
+        self.standin.add(pending)
+        self.assertIn("saved 0 new recordings (1 read)", self._sync())
+        pending["status"] = "finished"
+        self.assertIn("saved 1 new recordings (1 read)", self._sync())
+        self.rooms[2].refresh_from_db()
+        self.assertEqual(self.rooms[2].recording_url, "https://recordings.example.com/rec-2.mp4")
+        self.assertEqual(RecordingSyncState.objects.get().high_water_ts, 3000)
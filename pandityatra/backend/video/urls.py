@@ -12,6 +12,7 @@ urlpatterns = [
     path("rooms/<str:room_id>/upload-recording/", views.upload_recording),
     path("rooms/<str:room_id>/upload-recording-chunk/", views.upload_recording_chunk),
     path("rooms/<str:room_id>/finalize-recording/", views.finalize_recording_upload),
+    path("rooms/<str:room_id>/recording-uploads/<str:upload_id>/", views.recording_upload_status),
     path("rooms/<str:room_id>/start/", views.start_room),
     path("rooms/<str:room_id>/end/", views.end_room),
     path("<str:room_id>/validate/", views.validate_room_access),
@@ -1,7 +1,5 @@
 import logging
-import shutil
 from datetime import datetime, timedelta, timezone as dt_timezone
-from pathlib import Path
 
 from rest_framework.decorators import api_view, permission_classes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
@@ -13,7 +11,7 @@ from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
 
-from .models import VideoRoom, VideoParticipant
+from .models import RecordingUpload, VideoRoom, VideoParticipant
 from .serializers import VideoRoomDetailSerializer, VideoRoomUpdateSerializer
 from .permissions import can_access_booking
 from notifications.email_utils import send_recording_ready_email
@@ -21,16 +19,11 @@ from notifications.services import notify_recording_ready_review
 from bookings.models import Booking
 from .utils import daily_service
 from .services.room_creator import ensure_video_room_for_booking
+from .services import recording_assembler
 
 logger = logging.getLogger(__name__)
 
 
-def _recording_chunks_dir(room_id: int, upload_id: str) -> Path:
-    base = Path(settings.MEDIA_ROOT) / "recordings" / "chunks" / str(room_id) / upload_id
-    base.mkdir(parents=True, exist_ok=True)
-    return base
-
-
 def _safe_ext(ext: str) -> str:
     cleaned = (ext or "webm").lower().strip().replace(".", "")
     return cleaned if cleaned in {"webm", "mp4", "mkv"} else "webm"
@@ -249,21 +242,30 @@ def upload_recording(request, room_id):
     return Response({"success": True, "recording_url": room.recording_url})
 
 
-@api_view(["POST"])
+@api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
 def upload_recording_chunk(request, room_id):
     """
     Upload recording chunks from MediaRecorder.
-    Expects multipart/form-data with:
+    POST expects multipart/form-data with:
       - upload_id
       - chunk_index
       - total_chunks
       - chunk (file)
+      - checksum (optional, sha256 hex of the chunk)
+    GET ?upload_id=... lists the chunks received so far, to resume an upload.
     """
     room = _resolve_room_or_404(room_id)
     if not can_access_booking(request.user, room.booking):
         return Response({"error": "Not authorized"}, status=403)
 
+    if request.method == "GET":
+        upload_id = request.query_params.get("upload_id")
+        if not recording_assembler.valid_upload_id(upload_id):
+            return Response({"error": "A valid upload_id is required"}, status=400)
+        received = recording_assembler.received_chunks(recording_assembler.chunks_dir(room.id, upload_id))
+        return Response({"upload_id": upload_id, "received": received, "received_count": len(received)})
+
     upload_id = request.data.get("upload_id")
     chunk_index = request.data.get("chunk_index")
     total_chunks = request.data.get("total_chunks")
@@ -274,6 +276,8 @@ def upload_recording_chunk(request, room_id):
             {"error": "upload_id, chunk_index, total_chunks and chunk file are required"},
             status=400,
         )
+    if not recording_assembler.valid_upload_id(upload_id):
+        return Response({"error": "upload_id may only contain letters, digits, '-' and '_'"}, status=400)
 
     try:
         chunk_index = int(chunk_index)
@@ -283,12 +287,15 @@ def upload_recording_chunk(request, room_id):
     except ValueError:
         return Response({"error": "chunk_index and total_chunks must be integers"}, status=400)
 
-    chunks_dir = _recording_chunks_dir(room.id, str(upload_id))
-    chunk_path = chunks_dir / f"{chunk_index:08d}.part"
-
-    with chunk_path.open("wb") as f:
-        for part in chunk_file.chunks():
-            f.write(part)
+    try:
+        chunk = recording_assembler.store_chunk(
+            recording_assembler.chunks_dir(room.id, str(upload_id)),
+            chunk_index,
+            chunk_file,
+            expected_sha256=request.data.get("checksum", ""),
+        )
+    except recording_assembler.ChecksumMismatch as e:
+        return Response({"error": str(e), "chunk_index": chunk_index}, status=400)
 
     return Response(
         {
@@ -296,16 +303,33 @@ def upload_recording_chunk(request, room_id):
             "upload_id": str(upload_id),
             "chunk_index": chunk_index,
             "total_chunks": total_chunks,
+            "size": chunk["size"],
+            "sha256": chunk["sha256"],
         },
         status=202,
     )
 
 
+def _recording_upload_payload(upload):
+    return {
+        "upload_id": upload.upload_id,
+        "status": upload.status,
+        "progress": upload.progress,
+        "bytes_done": upload.bytes_done,
+        "bytes_total": upload.bytes_total,
+        "sha256": upload.sha256 or None,
+        "recording_url": upload.recording_url if upload.status == "completed" else None,
+        "error": upload.error or None,
+        "status_url": f"/api/video/rooms/{upload.room_id}/recording-uploads/{upload.upload_id}/",
+    }
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def finalize_recording_upload(request, room_id):
     """
-    Merge uploaded chunks into final media file and attach to room + booking.
+    Queue merging of the uploaded chunks into the final media file; the room
+    and booking get the recording once it is done. Poll status_url for progress.
     Expects JSON body:
       - upload_id
       - total_chunks
@@ -321,6 +345,8 @@ def finalize_recording_upload(request, room_id):
 
     if not upload_id or total_chunks is None:
         return Response({"error": "upload_id and total_chunks are required"}, status=400)
+    if not recording_assembler.valid_upload_id(upload_id):
+        return Response({"error": "upload_id may only contain letters, digits, '-' and '_'"}, status=400)
 
     try:
         total_chunks = int(total_chunks)
@@ -329,8 +355,14 @@ def finalize_recording_upload(request, room_id):
     except ValueError:
         return Response({"error": "total_chunks must be an integer"}, status=400)
 
-    chunks_dir = _recording_chunks_dir(room.id, str(upload_id))
-    expected_files = [chunks_dir / f"{i:08d}.part" for i in range(total_chunks)]
+    existing = RecordingUpload.objects.filter(room=room, upload_id=upload_id).first()
+    if existing and existing.status != "failed" and not recording_assembler.is_stale(existing):
+        # Finalize is idempotent: report the job already queued or done (a
+        # failed or stale one is queued again)
+        return Response(_recording_upload_payload(existing), status=200 if existing.status == "completed" else 202)
+
+    chunks_dir = recording_assembler.chunks_dir(room.id, str(upload_id))
+    expected_files = [recording_assembler.chunk_path(chunks_dir, i) for i in range(total_chunks)]
     missing = [str(p.name) for p in expected_files if not p.exists()]
     if missing:
         return Response(
@@ -343,34 +375,33 @@ def finalize_recording_upload(request, room_id):
         )
 
     final_filename = f"recordings/video_room_{room.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}.{extension}"
-    final_absolute = Path(settings.MEDIA_ROOT) / final_filename
-    final_absolute.parent.mkdir(parents=True, exist_ok=True)
+    upload, _ = RecordingUpload.objects.update_or_create(
+        room=room,
+        upload_id=upload_id,
+        defaults={
+            "total_chunks": total_chunks,
+            "extension": extension,
+            "status": "queued",
+            "bytes_done": 0,
+            "error": "",
+            "file_path": final_filename,
+            "recording_url": request.build_absolute_uri(settings.MEDIA_URL + final_filename),
+        },
+    )
+    recording_assembler.enqueue_finalize(upload)
 
-    with final_absolute.open("wb") as out_file:
-        for p in expected_files:
-            with p.open("rb") as c:
-                shutil.copyfileobj(c, out_file)
+    return Response(_recording_upload_payload(upload), status=202)
 
-    room.recording_url = request.build_absolute_uri(settings.MEDIA_URL + final_filename)
-    room.save(update_fields=["recording_url"])
 
-    booking = room.booking
-    booking.recording_url = room.recording_url
-    booking.recording_available = True
-    booking.save(update_fields=["recording_url", "recording_available"])
-    notify_recording_ready_review(booking)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def recording_upload_status(request, room_id, upload_id):
+    room = _resolve_room_or_404(room_id)
+    if not can_access_booking(request.user, room.booking):
+        return Response({"error": "Not authorized"}, status=403)
 
-    # Cleanup temporary chunk files
-    try:
-        shutil.rmtree(chunks_dir)
-        # also cleanup parent if empty
-        parent_dir = chunks_dir.parent
-        if parent_dir.exists() and not any(parent_dir.iterdir()):
-            parent_dir.rmdir()
-    except OSError:
-        logger.warning("Failed to clean up recording chunks for room=%s upload_id=%s", room.id, upload_id)
-
-    return Response({"success": True, "recording_url": room.recording_url}, status=201)
+    upload = get_object_or_404(RecordingUpload, room=room, upload_id=upload_id)
+    return Response(_recording_upload_payload(upload))
 
 
 @extend_schema(summary="Video: Validate Room Access")